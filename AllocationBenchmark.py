@@ -0,0 +1,71 @@
+import argparse
+import os
+import time
+import tracemalloc
+from typing import Dict, List
+
+import main
+from LogManager import setup_logging
+
+
+def measure(func, repeat: int) -> Dict[str, float]:
+    """
+    Run func repeatedly under tracemalloc.
+
+    Returns:
+        Peak traced memory above the starting point, memory still held
+        afterwards (in KiB) and the mean time per run in milliseconds
+    """
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    kept = [func() for _ in range(repeat)]
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return {
+        "peak_kib": (peak - base) / 1024,
+        "retained_kib": (current - base) / 1024,
+        "ms_per_run": elapsed * 1000 / repeat,
+    }
+
+
+def analyze_folder(analyzer: "main.MinecraftCrashAnalyzer", folder: str) -> str:
+    analyzer.collect_logs(folder)
+    analyzer.prepare_logs()
+    return analyzer.analyze()
+
+
+def lookup_all(database) -> List[object]:
+    # 渲染结果和管理界面会反复查询的三类模型
+    result = []
+    for reason_id in database.crash_reasons:
+        result.append(database.get_crash_reason(reason_id))
+        result.extend(database.get_detection_rules_for_crash(reason_id))
+        result.extend(database.get_promoters_for_crash(reason_id))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure memory allocated by crash analysis and database lookups")
+    parser.add_argument("logs", nargs="*", help="Log folders to analyze")
+    parser.add_argument("--repeat", type=int, default=50, help="Runs per measurement")
+    args = parser.parse_args()
+
+    setup_logging("WARNING")
+    analyzer = main.MinecraftCrashAnalyzer()
+    # 先运行一次，规则编译和缓存不计入测量
+    lookup_all(analyzer.crashdb)
+    for folder in args.logs:
+        analyze_folder(analyzer, folder)
+
+    rows = [("database lookups", measure(lambda: lookup_all(analyzer.crashdb), args.repeat))]
+    for folder in args.logs:
+        rows.append((os.path.basename(os.path.normpath(folder)),
+                     measure(lambda: analyze_folder(analyzer, folder), args.repeat)))
+
+    print(f"{'case':<24}{'peak KiB':>12}{'retained KiB':>15}{'ms/run':>10}")
+    for name, result in rows:
+        print(f"{name:<24}{result['peak_kib']:>12.1f}{result['retained_kib']:>15.1f}{result['ms_per_run']:>10.3f}")
@@ -0,0 +1,64 @@
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from SlotsDataclass import frozen_dataclass
+
+# 出现这些原因时视为没有得到有效结论
+INCONCLUSIVE_REASONS = frozenset({"UNKNOWN", "NO_ANALYSIS_FILES"})
+
+
+@frozen_dataclass
+class ReasonResult:
+    id: str                     # 崩溃原因ID（数据库原因）或 Special_CrashReason 的名称
+    name: str                   # 显示名称
+    special: bool
+    details: Tuple[str, ...] = ()
+    omitted: int = 0            # 超出上限未列出的详情条数
+    truncated: bool = False     # 达到扫描上限提前停止，实际未列出的条数可能更多
+
+
+@frozen_dataclass
+class FiredRule:
+    rule_id: str
+    reason: str
+    file_type: Optional[str]    # 命中位置所在文件的 FileType，未知时为 None
+    byte_offset: int = -1       # 在该文件（换行统一为 \n 后）中的 UTF-8 字节偏移，未知时为 -1
+
+
+@dataclass
+class AnalysisResult:
+    """
+    Structured outcome of one analysis.
+
+    The user-facing text, the bot reply and the JSON lines written by the
+    CLI are all produced from this object.
+    """
+    text: str                                                   # 渲染后的分析结果
+    reasons: List[ReasonResult] = field(default_factory=list)   # 按发现顺序
+    fired_rules: List[FiredRule] = field(default_factory=list)
+    files: Dict[str, str] = field(default_factory=dict)         # FileType -> 使用的文件路径
+    timings_ms: Dict[str, float] = field(default_factory=dict)  # 各阶段耗时
+    rule_set_version: int = 0
+    contributors: List[str] = field(default_factory=list)
+
+    @property
+    def conclusive(self) -> bool:
+        """True if at least one crash reason was identified"""
+        return bool(self.reasons) and not any(reason.id in INCONCLUSIVE_REASONS for reason in self.reasons)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["conclusive"] = self.conclusive
+        return data
+
+    def to_json(self) -> str:
+        """One line of JSON, suitable for JSONL output"""
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    def report(self) -> str:
+        """Plain-text report with the result, the detected reasons and the contributors"""
+        return "--- Analysis Result ---" + "\n" + self.text + "\n" + "--- Detected Crash Reasons ---" + "\n" + \
+            "\n".join(f"- {reason.id}: {reason.name}" for reason in self.reasons) + \
+            "\n\n" + "--- Analysis Contributor ---" + "\n" + \
+            f"This analysis item(s) was contributed by: {', '.join(self.contributors)}"
@@ -0,0 +1,142 @@
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Tuple
+
+import main
+from RuleEngine import RuleSetManager
+
+# 作为单个日志文件分析的扩展名，与机器人接受的文件一致
+LOG_EXTENSIONS = (".log", ".txt")
+
+# 工作进程中的规则集；fork 启动时直接继承父进程已加载的版本，否则从规则包读取
+_rule_sets: Optional[RuleSetManager] = None
+
+
+def find_bundles(paths: Iterable[str]) -> List[str]:
+    """
+    Expand the command line arguments into crash bundles.
+
+    A directory stands for the bundles inside it (sub-folders, zips and log
+    files); any other path is a bundle itself.
+    """
+    bundles = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                child = os.path.join(path, name)
+                if os.path.isdir(child) or name.lower().endswith((".zip",) + LOG_EXTENSIONS):
+                    bundles.append(child)
+        else:
+            bundles.append(path)
+    return bundles
+
+
+@contextmanager
+def bundle_folder(bundle: str):
+    """Yield a folder with the logs of a bundle, extracting zips and single files the way the bot does"""
+    if os.path.isdir(bundle):
+        yield bundle
+        return
+    with tempfile.TemporaryDirectory(prefix="crash_bundle_") as folder:
+        if bundle.lower().endswith(".zip"):
+            with zipfile.ZipFile(bundle) as archive:
+                archive.extractall(folder)
+        else:
+            shutil.copy(bundle, folder)
+        yield folder
+
+
+def _init_worker(database_folder: Optional[str]) -> None:
+    global _rule_sets
+    _rule_sets = main.rule_sets_for(database_folder)
+    _rule_sets.current()
+
+
+def analyze_bundle(bundle: str) -> Tuple[str, Optional[dict], float, Optional[str]]:
+    """
+    Analyze one bundle in a worker.
+
+    Returns:
+        (bundle, result dict or None, latency in seconds, error message or None)
+    """
+    started = time.perf_counter()
+    try:
+        with bundle_folder(bundle) as folder:
+            analyzer = main.MinecraftCrashAnalyzer(rule_sets=_rule_sets)
+            # 批量分析不写入规则统计，避免多个进程同时写 rule_stats.db
+            analyzer.stats = None
+            if analyzer.collect_logs(folder):
+                analyzer.prepare_logs()
+            result = analyzer.analyze_result().to_dict()
+        return bundle, result, time.perf_counter() - started, None
+    except Exception as e:
+        return bundle, None, time.perf_counter() - started, repr(e)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def format_summary(count: int, errors: int, elapsed: float, latencies: List[float], reasons: Counter) -> str:
+    latencies = sorted(latencies)
+    lines = [
+        f"Analyzed {count} bundles in {elapsed:.2f} s ({count / elapsed if elapsed else 0:.1f} bundles/s), {errors} errors",
+        "Latency ms: " + ", ".join(f"{name} {percentile(latencies, fraction) * 1000:.1f}"
+                                   for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))),
+        "Reasons:",
+    ]
+    lines.extend(f"  {reason}: {reason_count}" for reason, reason_count in reasons.most_common())
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Analyze many crash bundles in parallel and write JSON lines")
+    parser.add_argument("paths", nargs="+",
+                        help="Bundles (folders, zips or log files), or directories containing bundles")
+    parser.add_argument("--out", default=None, help="Write the JSON lines to this file instead of stdout")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=8, help="Bundles handed to a worker at a time")
+    parser.add_argument("--folder", default=None, help="Database folder; defaults to the configured one")
+    args = parser.parse_args()
+
+    bundles = find_bundles(args.paths)
+    # 先在父进程中加载（必要时重建）规则包，工作进程不再各自编译规则
+    main.rule_sets_for(args.folder).current()
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    latencies = []
+    reasons = Counter()
+    errors = 0
+    started = time.perf_counter()
+    try:
+        with multiprocessing.Pool(max(1, args.jobs), initializer=_init_worker, initargs=(args.folder,)) as pool:
+            for bundle, result, latency, error in pool.imap_unordered(analyze_bundle, bundles, args.chunksize):
+                latencies.append(latency)
+                record = {"bundle": bundle, "latency_ms": round(latency * 1000, 3)}
+                if error:
+                    errors += 1
+                    record["error"] = error
+                else:
+                    record.update(result)
+                    reasons.update(reason["id"] for reason in result["reasons"])
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(format_summary(len(bundles), errors, time.perf_counter() - started, latencies, reasons), file=sys.stderr)
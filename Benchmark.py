@@ -0,0 +1,319 @@
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from flashtext import KeywordProcessor
+
+import main
+from LogManager import setup_logging
+
+# 生成数据的格式版本，生成器变化时递增，旧数据会被重新生成
+DATA_FORMAT = 1
+MANIFEST_FILE_NAME = "manifest.json"
+MB = 1024 * 1024
+
+_THREADS = ["Render thread", "Server thread", "main", "Worker-Main-3", "modloading-worker-0", "IO-Worker-12"]
+_LEVELS = ["INFO"] * 12 + ["DEBUG"] * 4 + ["WARN"] * 2 + ["ERROR"]
+_LOGGERS = ["net.minecraft.client.Minecraft", "net.minecraftforge.fml.ModLoader", "mixin", "FabricLoader",
+            "net.minecraft.server.MinecraftServer", "com.mojang.blaze3d.systems.RenderSystem", "create/Registrate"]
+_MESSAGES = [
+    "Loading {n} mods",
+    "Reloading ResourceManager: vanilla, mod_resources, file/pack{n}.zip",
+    "Loaded {n} recipes",
+    "Preparing spawn area: {n}%",
+    "Found non-pack entry 'mods/mod{n}.jar', ignoring",
+    "Can't keep up! Is the server overloaded? Running {n}ms or {n} ticks behind",
+    "Registering {n} blocks for mod{n}",
+    "Created: {n}x{n}x0 minecraft:textures/atlas/blocks.png-atlas",
+    "Narrator library successfully loaded",
+    "Sound engine started",
+    "Time elapsed: {n} ms",
+    "Mixing mod{n}.mixins.json:MixinEntity from mod mod{n} into net.minecraft.world.entity.Entity",
+]
+_STACK = [
+    "\tat net.minecraft.world.level.Level.tickBlockEntities(Level.java:{n})",
+    "\tat net.minecraft.server.MinecraftServer.tickChildren(MinecraftServer.java:{n})",
+    "\tat net.minecraftforge.eventbus.EventBus.post(EventBus.java:{n})",
+    "\tat java.base/java.lang.Thread.run(Thread.java:{n})",
+]
+
+
+def filler_lines(rng: random.Random, size: int) -> List[str]:
+    """Ordinary log lines (about size bytes) without any crash signature"""
+    lines = []
+    total = 0
+    seconds = rng.randrange(86400)
+    while total < size:
+        seconds += rng.randrange(3)
+        n = rng.randrange(10000)
+        message = rng.choice(_MESSAGES).format(n=n)
+        line = (f"[{seconds // 3600 % 24:02}:{seconds // 60 % 60:02}:{seconds % 60:02}] "
+                f"[{rng.choice(_THREADS)}/{rng.choice(_LEVELS)}] [{rng.choice(_LOGGERS)}]: {message}")
+        if rng.random() < 0.02:
+            line += "\n" + "\n".join(rng.choice(_STACK).format(n=rng.randrange(2000)) for _ in range(rng.randrange(2, 12)))
+        lines.append(line)
+        total += len(line) + 1
+    return lines
+
+
+def write_lines(path: str, rng: random.Random, size: int, head: str = "", tail: str = "") -> None:
+    # 分块写入，生成数百 MB 的日志时不占用同样多的内存
+    with open(path, "w", encoding="utf-8") as file:
+        if head:
+            file.write(head + "\n")
+        remaining = size
+        while remaining > 0:
+            chunk = "\n".join(filler_lines(rng, min(remaining, 4 * MB))) + "\n"
+            file.write(chunk)
+            remaining -= len(chunk)
+        if tail:
+            file.write(tail + "\n")
+
+
+def _crash_report(rng: random.Random, description: str, exception: str, extra: str = "") -> str:
+    stack = "\n".join(rng.choice(_STACK).format(n=rng.randrange(2000)) for _ in range(rng.randrange(8, 30)))
+    return (f"---- Minecraft Crash Report ----\n// Who set us up the TNT?\n\nTime: 2024-08-22 16:48:05\n"
+            f"Description: {description}\n\n{exception}\n{stack}\n\n"
+            f"A detailed walkthrough of the error, its code path and all known details is as follows:\n"
+            f"---------------------------------------------------------------------------------------\n\n"
+            f"-- Head --\nThread: Render thread\nStacktrace:\n{stack}\n{extra}\n"
+            f"-- System Details --\nDetails:\n\tMinecraft Version: 1.20.1\n\tJava Version: 17.0.8, Microsoft\n")
+
+
+def _forge_crash_report(folder: str, rng: random.Random, size: int, hit: bool) -> None:
+    extra = ("-- Block being ticked --\nDetails:\n\tBlock: Block{minecraft:chest}[facing=north]\n"
+             "\tBlock location: World: (10,64,-20), Section: (at 10,0,12 in 0,4,-2)\n") if hit else ""
+    with open(os.path.join(folder, "crash-2024-08-22_16.48.05-client.txt"), "w", encoding="utf-8") as file:
+        file.write(_crash_report(rng, "Ticking block entity", "java.lang.IllegalStateException: Ticking", extra))
+    write_lines(os.path.join(folder, "latest.log"), rng, size)
+
+
+def _fabric_crash_report(folder: str, rng: random.Random, size: int, hit: bool) -> None:
+    tail = ("net.fabricmc.loader.impl.FormattedException: Some of your mods are incompatible with the game or each other!\n"
+            "A potential solution has been determined:\n\t - Install fabric-api, version 0.5 or later.\n"
+            "\t - Remove mod 'sodium'.\n") if hit else ""
+    write_lines(os.path.join(folder, "latest.log"), rng, size, head="[main/INFO]: Loading Minecraft 1.20.1 with Fabric Loader 0.14.21",
+                tail=tail)
+
+
+def _latest_log(folder: str, rng: random.Random, size: int, hit: bool) -> None:
+    tail = "java.lang.OutOfMemoryError: Java heap space" if hit else ""
+    write_lines(os.path.join(folder, "latest.log"), rng, size, tail=tail)
+
+
+def _debug_log(folder: str, rng: random.Random, size: int, hit: bool) -> None:
+    write_lines(os.path.join(folder, "latest.log"), rng, max(size // 4, 1))
+    tail = "Mixin apply failed mymod.mixins.json:MixinFoo from mod coolmod] from xyz" if hit else ""
+    write_lines(os.path.join(folder, "debug.log"), rng, size, tail=tail)
+
+
+def _hs_err(folder: str, rng: random.Random, size: int, hit: bool) -> None:
+    frame = "C  [atio6axx.dll+0x1a2b3c]" if hit else "V  [jvm.dll+0x3c4d5e]"
+    with open(os.path.join(folder, "hs_err_pid12345.log"), "w", encoding="utf-8") as file:
+        file.write("#\n# A fatal error has been detected by the Java Runtime Environment:\n#\n"
+                   "#  EXCEPTION_ACCESS_VIOLATION (0xc0000005) at pc=0x00007ffb, pid=12345, tid=6789\n#\n"
+                   f"# Problematic frame:\n# {frame}\n#\n" +
+                   "\n".join(filler_lines(rng, min(size, 2 * MB))) + "\n")
+    write_lines(os.path.join(folder, "latest.log"), rng, max(size // 8, 1))
+
+
+def _pcl_bundle(folder: str, rng: random.Random, size: int, hit: bool) -> None:
+    tail = ("Missing or unsupported mandatory dependencies:\n"
+            "\tMod ID: 'geckolib', Requested by: 'mymod', Expected range: '[4.0,)', Actual version: '[MISSING]'\n") if hit else ""
+    write_lines(os.path.join(folder, "游戏崩溃前的输出.txt"), rng, size, tail=tail)
+    write_lines(os.path.join(folder, "PCL 启动器日志.txt"), rng, min(size, MB))
+    with open(os.path.join(folder, "环境与启动信息.txt"), "w", encoding="utf-8") as file:
+        file.write("PCL 版本：2.8.0\n游戏版本：1.20.1\nJava：17.0.8\n")
+
+
+def _hmcl_bundle(folder: str, rng: random.Random, size: int, hit: bool) -> None:
+    tail = "Could not reserve enough space for 1048576KB object heap" if hit else ""
+    write_lines(os.path.join(folder, "minecraft.txt"), rng, size, head="以下为游戏输出的最后一段内容：", tail=tail)
+    write_lines(os.path.join(folder, "hmcl.log"), rng, min(size, MB))
+
+
+# 场景名 -> 生成函数(文件夹, 随机数, 主日志大小, 是否包含崩溃特征)
+SCENARIOS: Dict[str, Callable[[str, random.Random, int, bool], None]] = {
+    "forge_crash_report": _forge_crash_report,
+    "fabric_crash_report": _fabric_crash_report,
+    "latest_log": _latest_log,
+    "debug_log": _debug_log,
+    "hs_err": _hs_err,
+    "pcl_bundle": _pcl_bundle,
+    "hmcl_bundle": _hmcl_bundle,
+}
+
+
+def generate(data_dir: str, sizes_mb: List[float], seed: int = 1) -> List[str]:
+    """
+    Write every scenario at every size, with and without the crash signature.
+
+    The output only depends on the arguments, so two machines benchmark the
+    same inputs. Existing data with the same parameters is reused.
+
+    Returns:
+        Case folder names
+    """
+    manifest_path = os.path.join(data_dir, MANIFEST_FILE_NAME)
+    manifest = {"format": DATA_FORMAT, "sizes_mb": sizes_mb, "seed": seed}
+    cases = [f"{scenario}-{size:g}mb-{'hit' if hit else 'miss'}"
+             for scenario in SCENARIOS for size in sizes_mb for hit in (True, False)]
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as file:
+            if json.load(file) == {**manifest, "cases": cases}:
+                return cases
+    except (OSError, ValueError):
+        pass
+
+    for scenario, write in SCENARIOS.items():
+        for size in sizes_mb:
+            for hit in (True, False):
+                folder = os.path.join(data_dir, f"{scenario}-{size:g}mb-{'hit' if hit else 'miss'}")
+                os.makedirs(folder, exist_ok=True)
+                for name in os.listdir(folder):
+                    os.remove(os.path.join(folder, name))
+                write(folder, random.Random(f"{seed}:{scenario}:{size}:{hit}"), int(size * MB), hit)
+    with open(manifest_path, "w", encoding="utf-8") as file:
+        json.dump({**manifest, "cases": cases}, file, ensure_ascii=False, indent=2)
+    return cases
+
+
+def run_case(folder: str, repeat: int) -> Dict[str, float]:
+    """
+    Time one case; every value is the median over the repeats in milliseconds.
+
+    collect_logs and prepare_logs are timed around the calls, the analyze
+    stages come from MinecraftCrashAnalyzer.timings.
+    """
+    samples: Dict[str, List[float]] = {}
+    for _ in range(repeat):
+        analyzer = main.MinecraftCrashAnalyzer()
+        timings = {}
+        started = time.perf_counter()
+        analyzer.collect_logs(folder)
+        timings["collect_logs"] = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        analyzer.prepare_logs()
+        timings["prepare_logs"] = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        analyzer.analyze()
+        timings["analyze"] = (time.perf_counter() - started) * 1000
+        timings.update(analyzer.timings)
+        timings["total"] = timings["collect_logs"] + timings["prepare_logs"] + timings["analyze"]
+        for name, value in timings.items():
+            samples.setdefault(name, []).append(value)
+    return {name: round(statistics.median(values), 3) for name, values in samples.items()}
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float, min_ms: float = 1.0) -> List[str]:
+    """
+    Return one line per metric that got slower than the baseline by more than threshold percent.
+
+    Metrics below min_ms in both runs are ignored, they are dominated by noise.
+    """
+    regressions = []
+    for case, metrics in results.items():
+        for name, value in metrics.items():
+            old = baseline.get(case, {}).get(name)
+            if old is None or max(old, value) < min_ms:
+                continue
+            change = (value - old) / old * 100 if old else float("inf")
+            if change > threshold:
+                regressions.append(f"{case} {name}: {old:.1f} -> {value:.1f} ms (+{change:.0f}%)")
+    return regressions
+
+
+def scan_case(text: str, repeat: int) -> Dict[str, float]:
+    """
+    Time the literal scan of the current rule set against the lookups it replaced.
+
+    The old path checked every special literal with a separate 'in', looked for
+    the loader names in a lower-cased copy and ran flashtext over the log for
+    the exact-match rules. Both paths report the same set of found literals.
+    """
+    rule_set = main.rule_sets_for(None).current()
+    special = [(key, literal, ignore_case) for key, literal, ignore_case in rule_set.scanner.literals()
+               if not key.startswith(("keyword:", "prefilter:"))]
+    keyword_processor = KeywordProcessor()
+    for key, rule_id, _ in rule_set.keyword_rules:
+        keyword_processor.add_keyword(rule_set.database.detection_rules[rule_id]["match"], key)
+
+    def old_path():
+        found = {key for key, literal, ignore_case in special if not ignore_case and literal in text}
+        lowered = text.lower()
+        found.update(key for key, literal, ignore_case in special if ignore_case and literal in lowered)
+        found.update(keyword_processor.extract_keywords(text))
+        return found
+
+    def median_ms(run) -> float:
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            samples.append((time.perf_counter() - started) * 1000)
+        return round(statistics.median(samples), 3)
+
+    return {"literals": len(special) + len(rule_set.keyword_rules),
+            "scan": median_ms(lambda: rule_set.scanner.scan(text)),
+            "in_and_flashtext": median_ms(old_path)}
+
+
+def format_table(results: Dict[str, Dict[str, float]]) -> str:
+    columns = ["collect_logs", "prepare_logs", "scan", "crit1", "keyword", "regex", "stack", "crit3", "render", "total"]
+    lines = [f"{'case':<34}" + "".join(f"{name:>13}" for name in columns)]
+    for case, metrics in results.items():
+        lines.append(f"{case:<34}" + "".join(f"{metrics[name]:>13.2f}" if name in metrics else f"{'-':>13}"
+                                             for name in columns))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark MinecraftCrashAnalyzer on synthetic crash logs")
+    parser.add_argument("command", choices=("generate", "run", "scan"))
+    parser.add_argument("--data", default="benchmark_data", help="Folder for the generated inputs")
+    parser.add_argument("--sizes", default="1,16", help="Comma separated main log sizes in MB, e.g. 1,100,500")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case; the median is reported")
+    parser.add_argument("--cases", default=None, help="Only run cases whose name contains this text")
+    parser.add_argument("--save", default=None, help="Store the results as a baseline file")
+    parser.add_argument("--compare", default=None, help="Baseline file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Slowdown in percent reported as regression")
+    args = parser.parse_args()
+
+    setup_logging("WARNING")
+    case_names = generate(args.data, [float(size) for size in args.sizes.split(",")], args.seed)
+    if args.command == "generate":
+        print(f"Generated {len(case_names)} cases in {args.data}")
+        sys.exit(0)
+
+    # 规则编译不计入测量
+    main.rule_sets_for(None).current()
+    if args.command == "scan":
+        # 只比较字面量扫描：每个大小使用不含崩溃特征的 latest.log
+        for size in args.sizes.split(","):
+            with open(os.path.join(args.data, f"latest_log-{float(size):g}mb-miss", "latest.log"),
+                      "r", encoding="utf-8") as file:
+                result = scan_case(file.read(), args.repeat)
+            print(f"{float(size):g} MB, {result['literals']} literals: LiteralScanner {result['scan']:.1f} ms, "
+                  f"'in' checks + flashtext {result['in_and_flashtext']:.1f} ms")
+        sys.exit(0)
+    results = {case: run_case(os.path.join(args.data, case), args.repeat)
+               for case in case_names if not args.cases or args.cases in case}
+    print(format_table(results))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(results, file, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.save}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            slower = compare(results, json.load(file), args.threshold)
+        print("\n".join(["Regressions:"] + slower) if slower else "No regressions")
+        sys.exit(1 if slower else 0)
@@ -1,8 +1,16 @@
-from dataclasses import dataclass
+import copy
+import hashlib
+import os
+from contextlib import contextmanager
+from dataclasses import replace
 from typing import List, Dict, Optional
-import JsonHandle
+from CrashStorage import BackgroundWriter, CrashStorage, JsonStorage, TABLES
+from LogManager import get_logger
+from SlotsDataclass import frozen_dataclass
 
-@dataclass
+logger = get_logger("database")
+
+@frozen_dataclass
 class Person:
     id: int
     name: str
@@ -14,7 +22,11 @@ class Person:
             "name": self.name
         }
 
-@dataclass
+    @classmethod
+    def from_dict(cls, data: dict) -> "Person":
+        return cls(id=data["id"], name=data["name"])
+
+@frozen_dataclass
 class CrashReason:
     id: str
     name: str
@@ -30,22 +42,27 @@ class CrashReason:
             "priority": self.priority
         }
 
-@dataclass
+    @classmethod
+    def from_dict(cls, data: dict) -> "CrashReason":
+        return cls(id=data["id"], name=data["name"], description=data["description"], priority=data["priority"])
+
+@frozen_dataclass
 class CrashReasonPromoter:
     crash_reason_id: str  # 崩溃原因的ID
     person_id: int        # 关联的人员ID
 
-@dataclass
+@frozen_dataclass
 class RuleContributor:
     rule_id: str          # 规则的ID
     person_id: int        # 关联的人员ID
 
-@dataclass
+@frozen_dataclass
 class DetectionRule:
     id: str
     crash_reason_id: str
     match_type: int       # 匹配类型（0：精确匹配，1：正则匹配）
     match: str            # 匹配内容
+    terminal: bool = False  # 命中后不再评估优先级更低的规则（否则为叠加，继续评估）
 
     # 将对象转换为字典格式
     def dict(self):
@@ -53,16 +70,28 @@ class DetectionRule:
             "id": self.id,
             "crash_reason_id": self.crash_reason_id,
             "match_type": self.match_type,
-            "match": self.match
+            "match": self.match,
+            "terminal": self.terminal
         }
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "DetectionRule":
+        return cls(id=data["id"], crash_reason_id=data["crash_reason_id"], match_type=data["match_type"],
+                   match=data["match"], terminal=bool(data.get("terminal", False)))
+
+# 根据规则内容生成稳定的规则ID：同一条规则无论何时、由谁添加都得到相同的ID
+def stable_rule_id(crash_reason_id: str, match_type: int, match: str) -> str:
+    digest = hashlib.sha1(f"{crash_reason_id}\0{match_type}\0{match}".encode("utf-8")).hexdigest()[:10]
+    return f"rule_{crash_reason_id}_{digest}"
+
 class CrashReasonDatabase:
     def __init__(self,
                  persons_file_path: str = "persons.json",
                  crash_reasons_file_path: str = "crash_reasons.json",
                  detection_rules_file_path: str = "detection_rules.json",
                  crash_promoters_file_path: str = "crash_promoters.json",
-                 rule_contributors_file_path: str = "rule_contributors.json"):
+                 rule_contributors_file_path: str = "rule_contributors.json",
+                 storage: Optional[CrashStorage] = None):
         # 初始化文件路径
         self.persons_file_path = persons_file_path
         self.crash_reasons_file_path = crash_reasons_file_path
@@ -70,6 +99,15 @@ class CrashReasonDatabase:
         self.crash_promoters_file_path = crash_promoters_file_path
         self.rule_contributors_file_path = rule_contributors_file_path
 
+        # 存储后端，未指定时使用上面的 JSON 文件
+        self.storage = storage or JsonStorage({
+            "persons": persons_file_path,
+            "crash_reasons": crash_reasons_file_path,
+            "detection_rules": detection_rules_file_path,
+            "crash_promoters": crash_promoters_file_path,
+            "rule_contributors": rule_contributors_file_path,
+        })
+
         # 初始化数据容器
         self.crash_promoters = {}  # 存储崩溃原因与人员的关联
         self.rule_contributors = {}  # 存储规则与人员的关联
@@ -77,53 +115,227 @@ class CrashReasonDatabase:
         self.crash_reasons = {}  # 存储崩溃原因信息
         self.detection_rules = {}  # 存储检测规则信息
 
+        # 加载时创建一次的不可变模型对象，get_* 方法直接返回这些对象
+        self.person_models: Dict[str, Person] = {}
+        self.crash_reason_models: Dict[str, CrashReason] = {}
+        self.detection_rule_models: Dict[str, DetectionRule] = {}
+
+        # 反向索引，值为按插入顺序排列的键集合（dict 充当有序集合）
+        self.rules_by_crash: Dict[str, Dict[str, None]] = {}  # 崩溃原因ID -> 检测规则ID
+        self.promoters_by_crash: Dict[str, Dict[str, None]] = {}  # 崩溃原因ID -> crash_promoters 中的键
+        self.contributors_by_rule: Dict[str, Dict[str, None]] = {}  # 规则ID -> rule_contributors 中的键
+
+        # 批量修改的嵌套层数与期间被修改的表
+        self._batch_depth = 0
+        self._dirty = set()
+        # 后台写入线程；启用后修改只在发布快照时交给它保存
+        self.writer: Optional[BackgroundWriter] = None
+
+        # 写时复制：已发布的快照与本对象共享各个 dict，修改前先复制，修改完成后发布新版本
+        self.version = 0
+        self._published: Optional["CrashReasonDatabase"] = None
+        self._owned = set()  # 上次发布后已复制、只属于本对象的属性
+        self._write_depth = 0
+        self._modified = False
+
         # 从文件加载数据
         self.load_all()
 
+    # 浅拷贝共享所有数据，之后的修改各自复制，互不影响
+    def __copy__(self) -> "CrashReasonDatabase":
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone._batch_depth = 0
+        clone._dirty = set()
+        clone.writer = None
+        clone._owned = set()
+        clone._write_depth = 0
+        clone._modified = False
+        return clone
+
+    def snapshot(self) -> "CrashReasonDatabase":
+        """
+        Return the latest published version of the database.
+
+        A snapshot is never modified by later writes, so a reader can hold it
+        for a whole analysis without locking. Treat it as read-only.
+        """
+        return self._published
+
+    # 发布当前数据为新的只读快照，读取方只需一次属性读取即可拿到
+    def _publish(self):
+        self._modified = False
+        self._owned = set()
+        self.version += 1
+        snapshot = copy.copy(self)
+        snapshot._published = snapshot
+        self._published = snapshot
+        # 快照中的数据不会再被修改，可以直接交给后台线程写入
+        if self.writer is not None and self._dirty and not self._batch_depth:
+            self.writer.submit({table: getattr(snapshot, table) for table in TABLES if table in self._dirty})
+            self._dirty = set()
+
+    # 修改的作用域：最外层结束时发布一次快照
+    @contextmanager
+    def _publishing(self):
+        self._write_depth += 1
+        try:
+            yield
+        finally:
+            self._write_depth -= 1
+            if self._write_depth == 0 and self._modified:
+                self._publish()
+
+    # 修改数据前调用：复制仍与快照共享的属性
+    @contextmanager
+    def _writing(self, *names: str):
+        with self._publishing():
+            self._modified = True
+            for name in names:
+                if name not in self._owned:
+                    setattr(self, name, dict(getattr(self, name)))
+                    self._owned.add(name)
+            yield
+
+    # 使用指定文件夹中默认文件名的数据文件
+    @classmethod
+    def in_folder(cls, folder: str, storage: Optional[CrashStorage] = None) -> "CrashReasonDatabase":
+        return cls(storage=storage, **{f"{table}_file_path": os.path.join(folder, f"{table}.json") for table in TABLES})
+
     # 加载所有数据
     def load_all(self):
-        self.load_persons()
-        self.load_crash_reasons()
-        self.load_detection_rules()
-        self.load_crash_promoters()
-        self.load_rule_contributors()
-
-    # 加载崩溃原因与人员的关联数据
-    def load_crash_promoters(self) -> bool:
+        with self._publishing():
+            self.load_persons()
+            self.load_crash_reasons()
+            self.load_detection_rules()
+            self.load_crash_promoters()
+            self.load_rule_contributors()
+
+    # 批量修改：期间的保存只记录被修改的表，最外层退出时每张表只写入一次
+    @contextmanager
+    def batch(self):
+        with self._publishing():
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self.writer is None:
+                    self.flush()
+
+    # 处于批量修改中或启用了后台写入时推迟保存
+    def _defer_save(self, table: str) -> bool:
+        if self._batch_depth or self.writer is not None:
+            self._dirty.add(table)
+            if not self._batch_depth and not self._write_depth:
+                # 在修改作用域之外保存（数据已直接修改），立即发布以交给后台线程
+                self._publish()
+            return True
+        return False
+
+    def start_background_writer(self, delay: float = 0.5) -> BackgroundWriter:
+        """
+        Save changes on a background thread from now on.
+
+        Saves are debounced and coalesced per table; call flush() or
+        stop_background_writer() to wait until everything is written.
+        """
+        if self.writer is None:
+            self.writer = BackgroundWriter(self.storage, delay=delay)
+        return self.writer
+
+    def stop_background_writer(self, timeout: Optional[float] = None) -> bool:
+        """Write the pending changes, stop the thread and save synchronously again"""
+        if self.writer is None:
+            return True
+        ok = self.writer.close(timeout)
+        self.writer = None
+        return ok
+
+    # 写入批量修改期间被修改的表，写入失败的表保留到下一次 flush；启用后台写入时等待其完成
+    def flush(self) -> bool:
+        if self.writer is not None:
+            return self.writer.flush()
+        if not self._dirty:
+            return True
+        tables = {table: getattr(self, table) for table in TABLES if table in self._dirty}
         try:
-            self.crash_promoters = JsonHandle.read_json(self.crash_promoters_file_path)
+            self.storage.save_many(tables)
+            self._dirty.clear()
             return True
         except Exception as e:
-            print(f"加载崩溃原因发现者数据时出错: {e}")
-            self.crash_promoters = {}
+            logger.error("批量保存数据时出错: %s", e)
             return False
 
+    # 根据数据重建反向索引；总是创建新的 dict，浅拷贝出的数据库实例之间不会互相影响
+    @staticmethod
+    def build_index(data: dict, field: str) -> Dict[str, Dict[str, None]]:
+        index = {}
+        for key, record in data.items():
+            index.setdefault(record[field], {})[key] = None
+        return index
+
+    # 索引中的键集合可能与快照共享，修改时替换为新的 dict
+    @staticmethod
+    def _index_add(index: Dict[str, Dict[str, None]], value: str, key: str):
+        index[value] = {**index.get(value, {}), key: None}
+
+    @staticmethod
+    def _index_remove(index: Dict[str, Dict[str, None]], value: str, key: str):
+        keys = index.get(value)
+        if keys is not None and key in keys:
+            keys = {k: None for k in keys if k != key}
+            if keys:
+                index[value] = keys
+            else:
+                del index[value]
+
+    # 加载崩溃原因与人员的关联数据
+    def load_crash_promoters(self) -> bool:
+        with self._writing():
+            try:
+                self.crash_promoters = self.storage.load("crash_promoters")
+                self.promoters_by_crash = self.build_index(self.crash_promoters, "crash_reason_id")
+                return True
+            except Exception as e:
+                logger.error("加载崩溃原因发现者数据时出错: %s", e)
+                self.crash_promoters = {}
+                self.promoters_by_crash = {}
+                return False
+
     # 加载规则与人员的关联数据
     def load_rule_contributors(self) -> bool:
-        try:
-            self.rule_contributors = JsonHandle.read_json(self.rule_contributors_file_path)
-            return True
-        except Exception as e:
-            print(f"加载规则贡献者数据时出错: {e}")
-            self.rule_contributors = {}
-            return False
+        with self._writing():
+            try:
+                self.rule_contributors = self.storage.load("rule_contributors")
+                self.contributors_by_rule = self.build_index(self.rule_contributors, "rule_id")
+                return True
+            except Exception as e:
+                logger.error("加载规则贡献者数据时出错: %s", e)
+                self.rule_contributors = {}
+                self.contributors_by_rule = {}
+                return False
 
     # 保存崩溃原因与人员的关联数据
     def save_crash_promoters(self) -> bool:
+        if self._defer_save("crash_promoters"):
+            return True
         try:
-            JsonHandle.write_json(self.crash_promoters_file_path, self.crash_promoters)
+            self.storage.save("crash_promoters", self.crash_promoters)
             return True
         except Exception as e:
-            print(f"保存崩溃原因发现者数据时出错: {e}")
+            logger.error("保存崩溃原因发现者数据时出错: %s", e)
             return False
 
     # 保存规则与人员的关联数据
     def save_rule_contributors(self) -> bool:
+        if self._defer_save("rule_contributors"):
+            return True
         try:
-            JsonHandle.write_json(self.rule_contributors_file_path, self.rule_contributors)
+            self.storage.save("rule_contributors", self.rule_contributors)
             return True
         except Exception as e:
-            print(f"保存规则贡献者数据时出错: {e}")
+            logger.error("保存规则贡献者数据时出错: %s", e)
             return False
 
     # 添加崩溃原因与发现者的关联
@@ -131,20 +343,30 @@ class CrashReasonDatabase:
         key = f"{crash_id}_{person_id}"
         if key in self.crash_promoters:
             return True  # 如果已存在，直接返回
-        self.crash_promoters[key] = {
-            "crash_reason_id": crash_id,
-            "person_id": person_id
-        }
-        return self.save_crash_promoters()
+        with self._writing("crash_promoters", "promoters_by_crash"):
+            self.crash_promoters[key] = {
+                "crash_reason_id": crash_id,
+                "person_id": person_id
+            }
+            self._index_add(self.promoters_by_crash, crash_id, key)
+            return self.save_crash_promoters()
+
+    # 删除某个崩溃原因的所有发现者关联
+    def clear_crash_promoters(self, crash_id: str) -> bool:
+        if not self.promoters_by_crash.get(crash_id):
+            return True
+        with self._writing("crash_promoters", "promoters_by_crash"):
+            for key in self.promoters_by_crash.pop(crash_id):
+                del self.crash_promoters[key]
+            return self.save_crash_promoters()
 
     # 获取某个崩溃原因的所有发现者
     def get_promoters_for_crash(self, crash_id: str) -> List[Person]:
         promoters = []
-        for key, relation in self.crash_promoters.items():
-            if relation["crash_reason_id"] == crash_id:
-                person = self.get_person(relation["person_id"])
-                if person:
-                    promoters.append(person)
+        for key in self.promoters_by_crash.get(crash_id, ()):
+            person = self.get_person(self.crash_promoters[key]["person_id"])
+            if person:
+                promoters.append(person)
         return promoters
 
     # 添加规则与贡献者的关联
@@ -152,153 +374,260 @@ class CrashReasonDatabase:
         key = f"{rule_id}_{person_id}"
         if key in self.rule_contributors:
             return True  # 如果已存在，直接返回
-        self.rule_contributors[key] = {
-            "rule_id": rule_id,
-            "person_id": person_id
-        }
-        return self.save_rule_contributors()
+        with self._writing("rule_contributors", "contributors_by_rule"):
+            self.rule_contributors[key] = {
+                "rule_id": rule_id,
+                "person_id": person_id
+            }
+            self._index_add(self.contributors_by_rule, rule_id, key)
+            return self.save_rule_contributors()
+
+    # 删除某个规则的所有贡献者关联
+    def clear_rule_contributors(self, rule_id: str) -> bool:
+        if not self.contributors_by_rule.get(rule_id):
+            return True
+        with self._writing("rule_contributors", "contributors_by_rule"):
+            for key in self.contributors_by_rule.pop(rule_id):
+                del self.rule_contributors[key]
+            return self.save_rule_contributors()
 
     # 获取某个规则的所有贡献者
     def get_contributors_for_rule(self, rule_id: str) -> List[Person]:
         contributors = []
-        for key, relation in self.rule_contributors.items():
-            if relation["rule_id"] == rule_id:
-                person = self.get_person(relation["person_id"])
-                if person:
-                    contributors.append(person)
+        for key in self.contributors_by_rule.get(rule_id, ()):
+            person = self.get_person(self.rule_contributors[key]["person_id"])
+            if person:
+                contributors.append(person)
         return contributors
 
     # 加载人员数据
     def load_persons(self) -> bool:
-        try:
-            self.persons = JsonHandle.read_json(self.persons_file_path)
-            return True
-        except Exception as e:
-            print(f"加载人员数据时出错: {e}")
-            self.persons = {}
-            return False
+        with self._writing():
+            try:
+                self.persons = self.storage.load("persons")
+                self.person_models = {key: Person.from_dict(data) for key, data in self.persons.items()}
+                return True
+            except Exception as e:
+                logger.error("加载人员数据时出错: %s", e)
+                self.persons = {}
+                self.person_models = {}
+                return False
 
     # 加载崩溃原因数据
     def load_crash_reasons(self) -> bool:
-        try:
-            self.crash_reasons = JsonHandle.read_json(self.crash_reasons_file_path)
-            return True
-        except Exception as e:
-            print(f"加载崩溃原因数据时出错: {e}")
-            self.crash_reasons = {}
-            return False
+        with self._writing():
+            try:
+                self.crash_reasons = self.storage.load("crash_reasons")
+                self.crash_reason_models = {key: CrashReason.from_dict(data) for key, data in self.crash_reasons.items()}
+                return True
+            except Exception as e:
+                logger.error("加载崩溃原因数据时出错: %s", e)
+                self.crash_reasons = {}
+                self.crash_reason_models = {}
+                return False
 
     # 加载检测规则数据
     def load_detection_rules(self) -> bool:
-        try:
-            self.detection_rules = JsonHandle.read_json(self.detection_rules_file_path)
-            return True
-        except Exception as e:
-            print(f"加载检测规则数据时出错: {e}")
-            self.detection_rules = {}
-            return False
+        with self._writing():
+            try:
+                self.detection_rules = self.storage.load("detection_rules")
+                self.rules_by_crash = self.build_index(self.detection_rules, "crash_reason_id")
+                self.detection_rule_models = {key: DetectionRule.from_dict({**data, "id": key})
+                                              for key, data in self.detection_rules.items()}
+                return True
+            except Exception as e:
+                logger.error("加载检测规则数据时出错: %s", e)
+                self.detection_rules = {}
+                self.rules_by_crash = {}
+                self.detection_rule_models = {}
+                return False
 
     # 保存人员数据
     def save_persons(self) -> bool:
+        if self._defer_save("persons"):
+            return True
         try:
-            JsonHandle.write_json(self.persons_file_path, self.persons)
+            self.storage.save("persons", self.persons)
             return True
         except Exception as e:
-            print(f"保存人员数据时出错: {e}")
+            logger.error("保存人员数据时出错: %s", e)
             return False
 
     # 保存崩溃原因数据
     def save_crash_reasons(self) -> bool:
+        if self._defer_save("crash_reasons"):
+            return True
         try:
-            JsonHandle.write_json(self.crash_reasons_file_path, self.crash_reasons)
+            self.storage.save("crash_reasons", self.crash_reasons)
             return True
         except Exception as e:
-            print(f"保存崩溃原因数据时出错: {e}")
+            logger.error("保存崩溃原因数据时出错: %s", e)
             return False
 
     # 保存检测规则数据
     def save_detection_rules(self) -> bool:
+        if self._defer_save("detection_rules"):
+            return True
         try:
-            JsonHandle.write_json(self.detection_rules_file_path, self.detection_rules)
+            self.storage.save("detection_rules", self.detection_rules)
             return True
         except Exception as e:
-            print(f"保存检测规则数据时出错: {e}")
+            logger.error("保存检测规则数据时出错: %s", e)
             return False
 
     # 添加人员
     def add_person(self, person: Person) -> bool:
         if str(person.id) in self.persons:
-            print(f"ID为{person.id}的人员已存在。")
+            logger.warning("ID为%s的人员已存在。", person.id)
             return False
-        self.persons[str(person.id)] = person.dict()
-        return self.save_persons()
+        with self._writing("persons", "person_models"):
+            self.persons[str(person.id)] = person.dict()
+            self.person_models[str(person.id)] = person
+            return self.save_persons()
 
     # 根据ID获取人员信息
     def get_person(self, person_id: int) -> Optional[Person]:
-        str_id = str(person_id)
-        if str_id not in self.persons:
-            print(f"未找到ID为{person_id}的人员。")
-            return None
-        person_data = self.persons[str_id]
-        return Person(
-            id=person_data["id"],
-            name=person_data["name"]
-        )
+        person = self.person_models.get(str(person_id))
+        if person is None:
+            logger.debug("未找到ID为%s的人员。", person_id)
+        return person
 
     # 添加崩溃原因
     def add_crash_reason(self, crash_reason: CrashReason) -> bool:
         if crash_reason.id in self.crash_reasons:
-            print(f"ID为{crash_reason.id}的崩溃原因已存在。")
+            logger.warning("ID为%s的崩溃原因已存在。", crash_reason.id)
             return False
-        self.crash_reasons[crash_reason.id] = crash_reason.dict()
-        return self.save_crash_reasons()
+        with self._writing("crash_reasons", "crash_reason_models"):
+            self.crash_reasons[crash_reason.id] = crash_reason.dict()
+            self.crash_reason_models[crash_reason.id] = crash_reason
+            return self.save_crash_reasons()
 
     # 更新崩溃原因
     def update_crash_reason(self, crash_reason: CrashReason) -> bool:
         if crash_reason.id not in self.crash_reasons:
-            print(f"ID为{crash_reason.id}的崩溃原因不存在。")
+            logger.warning("ID为%s的崩溃原因不存在。", crash_reason.id)
             return False
-        self.crash_reasons[crash_reason.id] = crash_reason.dict()
-        return self.save_crash_reasons()
+        with self._writing("crash_reasons", "crash_reason_models"):
+            self.crash_reasons[crash_reason.id] = crash_reason.dict()
+            self.crash_reason_models[crash_reason.id] = crash_reason
+            return self.save_crash_reasons()
+
+    # 删除崩溃原因及其检测规则（连同规则的贡献者关联）和发现者关联
+    def delete_crash_reason(self, crash_reason_id: str) -> bool:
+        if crash_reason_id not in self.crash_reasons:
+            logger.warning("ID为%s的崩溃原因不存在。", crash_reason_id)
+            return False
+        # 全部在同一个版本中删除，每张表只保存一次；规则不会留在已删除的原因下继续参与匹配
+        with self._writing("crash_reasons", "crash_reason_models"):
+            with self.batch():
+                for rule_id in list(self.rules_by_crash.get(crash_reason_id, ())):
+                    self.delete_detection_rule(rule_id)
+                    self.clear_rule_contributors(rule_id)
+                del self.crash_reasons[crash_reason_id]
+                del self.crash_reason_models[crash_reason_id]
+                self.save_crash_reasons()
+                self.clear_crash_promoters(crash_reason_id)
+            # 外层批量修改或后台写入负责保存；否则 batch 结束时已写入，失败的表仍留在 _dirty 中
+            return bool(self._batch_depth or self.writer is not None or not self._dirty)
 
     # 根据ID获取崩溃原因
     def get_crash_reason(self, crash_reason_id: str) -> Optional[CrashReason]:
-        if crash_reason_id not in self.crash_reasons:
-            print(f"未找到ID为{crash_reason_id}的崩溃原因。")
-            return None
-        data = self.crash_reasons[crash_reason_id]
-        return CrashReason(
-            id=data["id"],
-            name=data["name"],
-            description=data["description"],
-            priority=data["priority"]
-        )
+        crash_reason = self.crash_reason_models.get(crash_reason_id)
+        if crash_reason is None:
+            logger.debug("未找到ID为%s的崩溃原因。", crash_reason_id)
+        return crash_reason
 
     # 添加检测规则
     def add_detection_rule(self, rule: DetectionRule) -> bool:
         # 确保崩溃原因存在
         if not self.get_crash_reason(rule.crash_reason_id):
-            print(f"ID为{rule.crash_reason_id}的崩溃原因不存在。")
+            logger.warning("ID为%s的崩溃原因不存在。", rule.crash_reason_id)
             return False
 
         if rule.id in self.detection_rules:
-            print(f"ID为{rule.id}的检测规则已存在。")
+            logger.warning("ID为%s的检测规则已存在。", rule.id)
+            return False
+        with self._writing("detection_rules", "detection_rule_models", "rules_by_crash"):
+            self.detection_rules[rule.id] = rule.dict()
+            self.detection_rule_models[rule.id] = rule
+            self._index_add(self.rules_by_crash, rule.crash_reason_id, rule.id)
+            return self.save_detection_rules()
+
+    # 更新检测规则
+    def update_detection_rule(self, rule: DetectionRule) -> bool:
+        if rule.id not in self.detection_rules:
+            logger.warning("ID为%s的检测规则不存在。", rule.id)
+            return False
+        with self._writing("detection_rules", "detection_rule_models", "rules_by_crash"):
+            old_crash_reason_id = self.detection_rules[rule.id]["crash_reason_id"]
+            if old_crash_reason_id != rule.crash_reason_id:
+                self._index_remove(self.rules_by_crash, old_crash_reason_id, rule.id)
+                self._index_add(self.rules_by_crash, rule.crash_reason_id, rule.id)
+            # 记录本身也可能被快照引用，替换而不是原地修改
+            self.detection_rules[rule.id] = {**self.detection_rules[rule.id], **rule.dict()}
+            self.detection_rule_models[rule.id] = rule
+            return self.save_detection_rules()
+
+    # 修改检测规则的内容。ID 由内容派生，内容变化时规则换用新ID（保持在原因中的位置），贡献者关联随之转移
+    def change_detection_rule(self, rule_id: str, crash_reason_id: str, match_type: int, match: str) -> Optional[str]:
+        """
+        Change what a detection rule matches, re-keying it to the stable ID of its new content.
+
+        Returns:
+            The rule's ID after the change, or None if the rule or the reason does not
+            exist or another rule already has the new content
+        """
+        old = self.detection_rule_models.get(rule_id)
+        if old is None:
+            logger.warning("ID为%s的检测规则不存在。", rule_id)
+            return None
+        if not self.get_crash_reason(crash_reason_id):
+            logger.warning("ID为%s的崩溃原因不存在。", crash_reason_id)
+            return None
+        if (old.crash_reason_id, old.match_type, old.match) == (crash_reason_id, match_type, match):
+            return rule_id
+        new_id = stable_rule_id(crash_reason_id, match_type, match)
+        rule = replace(old, id=new_id, crash_reason_id=crash_reason_id, match_type=match_type, match=match)
+        if new_id == rule_id:
+            return rule_id if self.update_detection_rule(rule) else None
+        if new_id in self.detection_rules:
+            logger.warning("ID为%s的检测规则已存在。", new_id)
+            return None
+
+        person_ids = [self.rule_contributors[key]["person_id"] for key in self.contributors_by_rule.get(rule_id, ())]
+        with self._writing("detection_rules", "detection_rule_models", "rules_by_crash"), self.batch():
+            # 记录和模型按原来的顺序换成新键
+            self.detection_rules = {(new_id if key == rule_id else key):
+                                    ({**data, **rule.dict()} if key == rule_id else data)
+                                    for key, data in self.detection_rules.items()}
+            self.detection_rule_models = {(new_id if key == rule_id else key): (rule if key == rule_id else model)
+                                          for key, model in self.detection_rule_models.items()}
+            if old.crash_reason_id == crash_reason_id:
+                self.rules_by_crash[crash_reason_id] = {(new_id if key == rule_id else key): None
+                                                        for key in self.rules_by_crash[crash_reason_id]}
+            else:
+                self._index_remove(self.rules_by_crash, old.crash_reason_id, rule_id)
+                self._index_add(self.rules_by_crash, crash_reason_id, new_id)
+            self.save_detection_rules()
+            self.clear_rule_contributors(rule_id)
+            for person_id in person_ids:
+                self.add_rule_contributor(new_id, person_id)
+        return new_id
+
+    # 删除检测规则
+    def delete_detection_rule(self, rule_id: str) -> bool:
+        if rule_id not in self.detection_rules:
+            logger.warning("ID为%s的检测规则不存在。", rule_id)
             return False
-        self.detection_rules[rule.id] = rule.dict()
-        return self.save_detection_rules()
+        with self._writing("detection_rules", "detection_rule_models", "rules_by_crash"):
+            rule_data = self.detection_rules.pop(rule_id)
+            del self.detection_rule_models[rule_id]
+            self._index_remove(self.rules_by_crash, rule_data["crash_reason_id"], rule_id)
+            return self.save_detection_rules()
 
     # 获取某个崩溃原因的所有检测规则
     def get_detection_rules_for_crash(self, crash_reason_id: str) -> List[DetectionRule]:
-        rules = []
-        for rule_id, rule_data in self.detection_rules.items():
-            if rule_data["crash_reason_id"] == crash_reason_id:
-                rules.append(DetectionRule(
-                    id=rule_id,
-                    crash_reason_id=rule_data["crash_reason_id"],
-                    match_type=rule_data["match_type"],
-                    match=rule_data["match"]
-                ))
-        return rules
+        return [self.detection_rule_models[rule_id] for rule_id in self.rules_by_crash.get(crash_reason_id, ())]
 
     # 获取崩溃原因及其相关规则和发现者
     def get_crash_with_rules(self, crash_reason_id: str) -> Optional[Dict]:
@@ -0,0 +1,388 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import JsonHandle
+from LogManager import get_logger
+
+logger = get_logger("storage")
+
+# 数据库中的五张表
+TABLES = ("persons", "crash_reasons", "detection_rules", "crash_promoters", "rule_contributors")
+
+
+class CrashStorage:
+    """
+    Storage backend of CrashReasonDatabase.
+
+    Every table is loaded and saved as the same dict layout the JSON files
+    use: {key: record}.
+    """
+
+    def load(self, table: str) -> dict:
+        raise NotImplementedError
+
+    def save(self, table: str, data: dict) -> None:
+        raise NotImplementedError
+
+    def save_many(self, tables: Dict[str, dict]) -> None:
+        """Save several tables at once; backends with transactions write them atomically"""
+        for table, data in tables.items():
+            self.save(table, data)
+
+    def signature(self, table: str):
+        """A value that changes whenever the stored table changes, used to detect edits by other processes"""
+        raise NotImplementedError
+
+    def describe(self, table: str) -> str:
+        """Human readable location of a table"""
+        return table
+
+
+class JsonStorage(CrashStorage):
+    """One pretty-printed JSON file per table (the original layout)"""
+
+    def __init__(self, file_paths: Dict[str, str]):
+        self.file_paths = file_paths
+
+    def load(self, table: str) -> dict:
+        return JsonHandle.read_json(self.file_paths[table])
+
+    def save(self, table: str, data: dict) -> None:
+        JsonHandle.write_json(self.file_paths[table], data)
+
+    def signature(self, table: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.file_paths[table])
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def describe(self, table: str) -> str:
+        return self.file_paths[table]
+
+
+# 每张表的列定义，未列出的字段保存在 extra 列中
+_COLUMNS: Dict[str, List[Tuple[str, str]]] = {
+    "persons": [("id", "INTEGER"), ("name", "TEXT")],
+    "crash_reasons": [("id", "TEXT"), ("name", "TEXT"), ("description", "TEXT"), ("priority", "INTEGER")],
+    "detection_rules": [("id", "TEXT"), ("crash_reason_id", "TEXT"), ("match_type", "INTEGER"), ("match", "TEXT")],
+    "crash_promoters": [("crash_reason_id", "TEXT"), ("person_id", "INTEGER")],
+    "rule_contributors": [("rule_id", "TEXT"), ("person_id", "INTEGER")],
+}
+
+_INDEXES = (
+    ("idx_detection_rules_crash_reason_id", "detection_rules", "crash_reason_id"),
+    ("idx_crash_promoters_crash_reason_id", "crash_promoters", "crash_reason_id"),
+    ("idx_crash_promoters_person_id", "crash_promoters", "person_id"),
+    ("idx_rule_contributors_rule_id", "rule_contributors", "rule_id"),
+    ("idx_rule_contributors_person_id", "rule_contributors", "person_id"),
+)
+
+
+class SqliteStorage(CrashStorage):
+    """
+    All tables in one SQLite database.
+
+    The database runs in WAL mode so the bot can keep reading while the
+    editor writes. A save compares the table with the rows that are stored
+    and only upserts changed records and deletes removed ones, inside one
+    transaction. The stored rows are cached per table together with the
+    table's version, so the comparison only reads the database again after
+    another process wrote to it. Every thread uses its own connection.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # 表 -> (表版本, 键 -> 已保存的行)
+        self._rows: Dict[str, Tuple[Optional[int], Dict[str, tuple]]] = {}
+        conn = self._connect()
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            for table, columns in _COLUMNS.items():
+                column_sql = ", ".join(f'"{name}" {sql_type}' for name, sql_type in columns)
+                conn.execute(f'CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, {column_sql}, extra TEXT)')
+            for index, table, column in _INDEXES:
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {index} ON {table} ("{column}")')
+            # 每张表的修改计数，用于检测其他进程的写入
+            conn.execute("CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+
+    # 连接、锁和行缓存属于当前进程，不随对象一起序列化（例如写入规则包）
+    def __getstate__(self):
+        return {"db_path": self.db_path}
+
+    def __setstate__(self, state):
+        self.db_path = state["db_path"]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._rows = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 的连接不能跨线程使用，每个线程保留一个连接
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, timeout=10)
+        return conn
+
+    def close(self) -> None:
+        """Close the connection of the calling thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @staticmethod
+    def _version(conn: sqlite3.Connection, table: str) -> Optional[int]:
+        row = conn.execute("SELECT version FROM table_versions WHERE name = ?", (table,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _read_rows(conn: sqlite3.Connection, table: str) -> Dict[str, tuple]:
+        column_sql = ", ".join(f'"{name}"' for name, _ in _COLUMNS[table])
+        return {row[0]: row[1:] for row in conn.execute(f"SELECT key, {column_sql}, extra FROM {table} ORDER BY key")}
+
+    @staticmethod
+    def _row(table: str, record: dict) -> tuple:
+        columns = [name for name, _ in _COLUMNS[table]]
+        # 列中的 NULL 表示字段不存在，显式的 null 值另存到 extra 中，读回时保留
+        extra = {name: value for name, value in record.items() if name not in columns or value is None}
+        return (*(record.get(name) for name in columns),
+                json.dumps(extra, ensure_ascii=False, sort_keys=True) if extra else None)
+
+    def load(self, table: str) -> dict:
+        columns = [name for name, _ in _COLUMNS[table]]
+        conn = self._connect()
+        with self._lock, conn:
+            # 版本与数据在同一个读事务中读取
+            conn.execute("BEGIN")
+            version = self._version(conn, table)
+            rows = self._read_rows(conn, table)
+            self._rows[table] = (version, rows)
+
+        data = {}
+        for key, row in rows.items():
+            record = {name: value for name, value in zip(columns, row[:-1]) if value is not None}
+            if row[-1]:
+                record.update(json.loads(row[-1]))
+            data[key] = record
+        return data
+
+    def save(self, table: str, data: dict) -> None:
+        self.save_many({table: data})
+
+    def save_many(self, tables: Dict[str, dict]) -> None:
+        """Bring several tables to the given content in a single transaction, writing only the changed rows"""
+        conn = self._connect()
+        with self._lock:
+            saved = {}
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                for table, data in tables.items():
+                    version = self._version(conn, table)
+                    cached = self._rows.get(table)
+                    old = cached[1] if cached and cached[0] == version else self._read_rows(conn, table)
+                    new = {str(key): self._row(table, record) for key, record in data.items()}
+                    changed = [(key, *row) for key, row in new.items() if old.get(key) != row]
+                    removed = [(key,) for key in old.keys() - new.keys()]
+
+                    if changed:
+                        columns = [name for name, _ in _COLUMNS[table]] + ["extra"]
+                        column_sql = ", ".join(f'"{name}"' for name in columns)
+                        placeholders = ", ".join("?" for _ in range(len(columns) + 1))
+                        updates = ", ".join(f'"{name}" = excluded."{name}"' for name in columns)
+                        conn.executemany(f"INSERT INTO {table} (key, {column_sql}) VALUES ({placeholders}) "
+                                         f"ON CONFLICT(key) DO UPDATE SET {updates}", changed)
+                    if removed:
+                        conn.executemany(f"DELETE FROM {table} WHERE key = ?", removed)
+                    if changed or removed:
+                        conn.execute("INSERT INTO table_versions (name, version) VALUES (?, 1) "
+                                     "ON CONFLICT(name) DO UPDATE SET version = version + 1", (table,))
+                        version = self._version(conn, table)
+                    saved[table] = (version, new)
+            # 事务提交成功后才更新缓存
+            self._rows.update(saved)
+
+    def signature(self, table: str) -> Optional[int]:
+        return self._version(self._connect(), table)
+
+    def describe(self, table: str) -> str:
+        return f"{self.db_path}:{table}"
+
+
+class BackgroundWriter:
+    """
+    Saves tables of a storage on a background thread.
+
+    Submitted tables are coalesced by name (only the newest data of a table is
+    written) and written once no new submission arrived for `delay` seconds,
+    or at the latest `max_delay` seconds after the first pending change. Failed
+    writes stay pending and are retried after `retry_delay` seconds. The
+    submitted dicts must not be modified afterwards; CrashReasonDatabase hands
+    over its published snapshots, which never change.
+    """
+
+    def __init__(self, storage: CrashStorage, delay: float = 0.5, max_delay: float = 5.0, retry_delay: float = 5.0):
+        self.storage = storage
+        self.delay = delay
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self._pending: Dict[str, dict] = {}
+        self._first_change = 0.0
+        self._last_change = 0.0
+        self._retry_at = 0.0
+        self._flush_requested = False
+        self._writing = False
+        self._closed = False
+        self.failed: Dict[str, str] = {}  # 上次写入失败的表 -> 错误信息
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="database-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, tables: Dict[str, dict]) -> None:
+        """Schedule tables for writing, replacing older pending data of the same tables"""
+        if not tables:
+            return
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("The background writer is closed")
+            now = time.monotonic()
+            if not self._pending:
+                self._first_change = now
+            self._pending.update(tables)
+            self._last_change = now
+            self._condition.notify_all()
+
+    def status(self) -> Tuple[int, bool, Dict[str, str]]:
+        """(number of pending tables, whether a write is running, failed tables and their errors)"""
+        with self._condition:
+            return len(self._pending), self._writing, dict(self.failed)
+
+    def _due(self) -> float:
+        # 防抖：最后一次修改后 delay 秒，但最多在第一次修改后 max_delay 秒写入
+        due = min(self._last_change + self.delay, self._first_change + self.max_delay)
+        if self._flush_requested or self._closed:
+            due = 0.0
+        return max(due, self._retry_at)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed and (not self._pending or self.failed):
+                        return
+                    if self._pending:
+                        wait = self._due() - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._condition.wait(wait)
+                    else:
+                        self._condition.wait()
+                tables, self._pending = self._pending, {}
+                self._writing = True
+
+            error = None
+            try:
+                self.storage.save_many(tables)
+            except Exception as e:
+                error = e
+                logger.error("后台保存数据时出错 (%s): %s", ", ".join(tables), e)
+
+            with self._condition:
+                self._writing = False
+                if error is None:
+                    for table in tables:
+                        self.failed.pop(table, None)
+                    self._retry_at = 0.0
+                else:
+                    # 保留失败的表，期间提交的新数据优先
+                    for table, data in tables.items():
+                        self._pending.setdefault(table, data)
+                        self.failed[table] = str(error)
+                    self._retry_at = time.monotonic() + self.retry_delay
+                if not self._pending or error is not None:
+                    self._flush_requested = False
+                self._condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Write the pending tables now and wait for the result.
+
+        Returns:
+            True if nothing is pending and no table failed
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            if self._pending:
+                self._flush_requested = True
+                self._retry_at = 0.0
+                self._condition.notify_all()
+            while self._pending or self._writing:
+                if self._pending and not self._flush_requested:
+                    break   # 写入失败，等待重试
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return not self._pending and not self._writing and not self.failed
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Flush and stop the thread; pending tables that could not be written are logged"""
+        ok = self.flush(timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            if self._pending:
+                logger.error("关闭时仍有未保存的数据: %s", ", ".join(self._pending))
+        self._thread.join(timeout)
+        return ok
+
+
+def create_storage(backend: str = "json", sqlite_path: Optional[str] = None,
+                   file_paths: Optional[Dict[str, str]] = None) -> Optional[CrashStorage]:
+    """
+    Create the storage backend named in the configuration.
+
+    Args:
+        backend: "json" or "sqlite"
+        sqlite_path: Database file for the SQLite backend
+        file_paths: JSON file per table for the JSON backend; None keeps CrashReasonDatabase's defaults
+
+    Returns:
+        The storage, or None for the default JSON files
+    """
+    if backend == "sqlite":
+        return SqliteStorage(sqlite_path or "crash_database.db")
+    if backend != "json":
+        raise ValueError(f"Unknown database backend '{backend}'")
+    return JsonStorage(file_paths) if file_paths else None
+
+
+def import_json(json_storage: JsonStorage, sqlite_storage: SqliteStorage) -> Dict[str, int]:
+    """
+    Copy every table from the JSON files into SQLite in one transaction.
+
+    Returns:
+        Number of records imported per table
+    """
+    tables = {table: json_storage.load(table) for table in TABLES}
+    sqlite_storage.save_many(tables)
+    return {table: len(data) for table, data in tables.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import the JSON crash database into SQLite")
+    parser.add_argument("--db", default="crash_database.db", help="SQLite database to create or overwrite")
+    parser.add_argument("--dir", default=".", help="Folder containing the JSON files")
+    args = parser.parse_args()
+
+    source = JsonStorage({table: os.path.join(args.dir, f"{table}.json") for table in TABLES})
+    counts = import_json(source, SqliteStorage(args.db))
+    for table, count in counts.items():
+        print(f"{table}: {count} records")
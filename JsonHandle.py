@@ -1,5 +1,11 @@
 import json
+import os
 import os.path
+import tempfile
+
+from LogManager import get_logger
+
+logger = get_logger("json")
 
 def new_json(file_path: str):
     """
@@ -22,7 +28,7 @@ def read_json(file_path: str):
         dict: The content of the JSON file as a dictionary.
     """
     if not os.path.exists(file_path):
-        print(f"File {file_path} does not exist. Creating a new one.")
+        logger.warning("File %s does not exist. Creating a new one.", file_path)
         new_json(file_path)
         return {}
 
@@ -31,18 +37,50 @@ def read_json(file_path: str):
         try:
             data = json.load(file)
         except json.JSONDecodeError:
-            print(f"Error decoding JSON from {file_path}. Returning empty dictionary.")
+            logger.warning("Error decoding JSON from %s. Returning empty dictionary.", file_path)
             return {}
     return data
 
 
+def write_atomic(file_path: str, data: bytes):
+    """
+    Replaces a file's content atomically.
+
+    The data is written to a temporary file in the same folder, flushed to
+    disk and then renamed over the target, so readers see either the old or
+    the new content and a crash mid-write never leaves a truncated file.
+    The permissions of an existing file are kept.
+
+    Args:
+        file_path (str): The path to the file.
+        data (bytes): The new content.
+    """
+    folder = os.path.dirname(os.path.abspath(file_path))
+    try:
+        mode = os.stat(file_path).st_mode & 0o777
+    except OSError:
+        mode = 0o644
+    fd, temp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
 def write_json(file_path: str, data: dict):
     """
-    Writes a dictionary to a JSON file.
+    Writes a dictionary to a JSON file atomically (see write_atomic).
 
     Args:
         file_path (str): The path to the JSON file.
         data (dict): The data to write to the JSON file.
     """
-    with open(file_path, 'w', encoding="utf-8") as file:
-        json.dump(data, file, indent=2, ensure_ascii=False, sort_keys=True)
+    text = json.dumps(data, indent=2, ensure_ascii=False, sort_keys=True)
+    write_atomic(file_path, text.encode("utf-8"))
@@ -0,0 +1,210 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# flashtext 使用的单词字符集合，用于模拟其单词边界
+_WORD_CHARS = "A-Za-z0-9_"
+WORD_CHAR_SET = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_")
+
+
+class LiteralHits:
+    """
+    Result of a single LiteralScanner pass: a presence bitmap plus the offset of
+    the first hit of every literal.
+    """
+    __slots__ = ("bitmap", "offsets", "_index")
+
+    def __init__(self, index: Dict[str, int], bitmap: int, offsets: List[int]):
+        self._index = index
+        self.bitmap = bitmap
+        self.offsets = offsets
+
+    def __contains__(self, key: str) -> bool:
+        bit = self._index.get(key)
+        return bit is not None and bool(self.bitmap >> bit & 1)
+
+    def any(self, *keys: str) -> bool:
+        """Return True if at least one of the given literals was found"""
+        return any(key in self for key in keys)
+
+    def offset(self, key: str) -> Optional[int]:
+        """Return the offset of the first hit of a literal, or None if it was not found"""
+        bit = self._index.get(key)
+        if bit is None or self.offsets[bit] < 0:
+            return None
+        return self.offsets[bit]
+
+    def found(self) -> List[str]:
+        """Return the keys of all literals that were found"""
+        return [key for key, bit in self._index.items() if self.bitmap >> bit & 1]
+
+
+def _atoms(char: str, ignore_case: bool) -> List[str]:
+    """Regex pieces that match one character of a literal: the character itself or its case variants"""
+    if ignore_case:
+        variants = sorted({variant for variant in (char, char.lower(), char.upper()) if len(variant) == 1})
+        if len(variants) > 1:
+            return [re.escape(variant) for variant in variants]
+    return [re.escape(char)]
+
+
+def _atom(char: str, ignore_case: bool) -> str:
+    atoms = _atoms(char, ignore_case)
+    return atoms[0] if len(atoms) == 1 else "[" + "".join(atoms) + "]"
+
+
+def literal_pattern(literal: str, ignore_case: bool = False, word_boundary: bool = False) -> re.Pattern:
+    """Pattern that matches a single literal the way LiteralScanner does"""
+    single = "".join(_atom(char, ignore_case) for char in literal)
+    if word_boundary:
+        if literal[0] in WORD_CHAR_SET:
+            single = f"(?<![{_WORD_CHARS}])" + single
+        if literal[-1] in WORD_CHAR_SET:
+            single = single + f"(?![{_WORD_CHARS}])"
+    return re.compile(single)
+
+
+class LiteralScanner:
+    """
+    Multi-literal matcher that reports which literals occur in a text in one pass.
+
+    All literals are merged into a prefix tree and compiled into one regex, so
+    re walks the text once and only follows the branches whose characters
+    match. Case-insensitive literals match both case variants of every
+    character, so no lower-cased copy of the text is needed. Every top-level
+    branch starts with a plain character, which lets re skip positions that
+    cannot start any literal, and word boundaries are checked once a whole
+    literal has matched. After a hit the found literal is dropped from the
+    pattern and the search resumes at the same position, so overlapping
+    literals are still reported and the text is never scanned twice.
+    """
+
+    def __init__(self):
+        self._keys: List[str] = []
+        # (字面量, 是否不区分大小写, 首字符需要单词边界, 尾字符需要单词边界)
+        self._literals: List[Tuple[str, bool, bool, bool]] = []
+        self._index: Dict[str, int] = {}
+        # 剩余字面量的位图 -> (合并后的正则, 捕获组编号 -> 字面量位)
+        self._patterns: Dict[int, Tuple[re.Pattern, List[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __getstate__(self):
+        # 规则包中只保存完整的扫描正则，扫描过程中缓存的子集在使用时重新生成
+        state = self.__dict__.copy()
+        full = (1 << len(self._keys)) - 1
+        state["_patterns"] = {full: self._patterns[full]} if full in self._patterns else {}
+        return state
+
+    def add(self, key: str, literal: str, ignore_case: bool = False, word_boundary: bool = False) -> int:
+        """
+        Register a literal.
+
+        Args:
+            key: Name used to query the scan result
+            literal: Text to look for
+            ignore_case: Match case-insensitively
+            word_boundary: Require non-word characters around the literal, like flashtext does
+
+        Returns:
+            Bit index assigned to the literal
+        """
+        if not literal:
+            raise ValueError(f"Literal for '{key}' is empty")
+        if key in self._index:
+            raise ValueError(f"Literal key '{key}' is already registered")
+
+        bit = len(self._keys)
+        self._keys.append(key)
+        self._literals.append((literal, ignore_case,
+                               word_boundary and literal[0] in WORD_CHAR_SET,
+                               word_boundary and literal[-1] in WORD_CHAR_SET))
+        self._index[key] = bit
+        self._patterns.clear()
+        return bit
+
+    def literals(self) -> List[Tuple[str, str, bool]]:
+        """Return (key, literal, ignore_case) of every registered literal; case-insensitive literals are lower-cased"""
+        return [(key, literal.lower() if ignore_case else literal, ignore_case)
+                for key, (literal, ignore_case, _, _) in zip(self._keys, self._literals)]
+
+    def compile(self) -> None:
+        """Build the pattern of all literals ahead of the first scan (e.g. before the scanner is packed)"""
+        if self._keys:
+            self._pattern_for((1 << len(self._keys)) - 1)
+
+    def _pattern_for(self, remaining: int) -> Tuple[re.Pattern, List[int]]:
+        """Return the merged pattern of the literals whose bit is set in `remaining`"""
+        cached = self._patterns.get(remaining)
+        if cached is not None:
+            return cached
+
+        # 前缀树：节点为 {字符的正则片段: 子节点}，None 键下是在此结束的字面量
+        trie: dict = {}
+        for bit, (literal, ignore_case, _, _) in enumerate(self._literals):
+            if not remaining >> bit & 1:
+                continue
+            # 第一层按大小写拆成普通字符的分支，re 才能用首字符快速跳过无关位置
+            nodes = [trie.setdefault(atom, {}) for atom in _atoms(literal[0], ignore_case)]
+            for char in literal[1:]:
+                atom = _atom(char, ignore_case)
+                nodes = [node.setdefault(atom, {}) for node in nodes]
+            for node in nodes:
+                node.setdefault(None, []).append(bit)
+
+        bits = [-1]     # 捕获组编号从 1 开始
+
+        def emit(node: dict, depth: int) -> str:
+            branches = []
+            for atom, child in node.items():
+                if atom is not None:
+                    branches.append(atom + emit(child, depth + 1))
+                    continue
+                # 每个字面量以一个空捕获组结尾，lastindex 即为命中的字面量
+                for bit in child:
+                    _, _, head, tail = self._literals[bit]
+                    branch = ""
+                    if head:
+                        branch += f"(?<![{_WORD_CHARS}].{{{depth}}})"
+                    if tail:
+                        branch += f"(?![{_WORD_CHARS}])"
+                    bits.append(bit)
+                    branches.append(branch + "()")
+            return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+        cached = (re.compile(emit(trie, 0), re.DOTALL), bits)
+        if len(self._patterns) >= 256:
+            self._patterns.clear()
+        self._patterns[remaining] = cached
+        return cached
+
+    def scan(self, text: Optional[str]) -> LiteralHits:
+        """
+        Scan the text once and report which literals occur in it.
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            LiteralHits with the presence bitmap and first-hit offsets
+        """
+        offsets = [-1] * len(self._keys)
+        bitmap = 0
+        remaining = (1 << len(self._keys)) - 1
+        if not text or not remaining:
+            return LiteralHits(self._index, bitmap, offsets)
+
+        pos = 0
+        while remaining:
+            pattern, bits = self._pattern_for(remaining)
+            match = pattern.search(text, pos)
+            if match is None:
+                break
+            bit = bits[match.lastindex]
+            bitmap |= 1 << bit
+            offsets[bit] = match.start()
+            remaining &= ~(1 << bit)
+            # 同一位置可能还有其他字面量（互为前缀或只是大小写不同），从这里继续
+            pos = match.start()
+
+        return LiteralHits(self._index, bitmap, offsets)
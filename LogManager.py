@@ -0,0 +1,137 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+# 所有模块的日志记录器都挂在这个名字下
+ROOT_LOGGER_NAME = "crashbot"
+
+# 当前任务（一次文件分析）的关联ID，asyncio 任务和线程各自独立
+_job_id: contextvars.ContextVar[str] = contextvars.ContextVar("job_id", default="-")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return the logger of a module, e.g. get_logger("main")"""
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+
+def current_job_id() -> str:
+    return _job_id.get()
+
+
+@contextmanager
+def job_context(job_id: Optional[str] = None):
+    """
+    Tag every log record emitted inside the block with a correlation ID.
+
+    Args:
+        job_id: ID to use; a short random one is generated when omitted
+
+    Yields:
+        The job ID
+    """
+    token = _job_id.set(job_id or uuid.uuid4().hex[:8])
+    try:
+        yield _job_id.get()
+    finally:
+        _job_id.reset(token)
+
+
+class _JobIdFilter(logging.Filter):
+    # 在调用线程中读取关联ID，之后记录才进入队列
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.job_id = _job_id.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    # 标准 QueueHandler.prepare 会在调用线程中完整格式化记录（包括时间和异常堆栈）；
+    # 这里只合并消息参数（参数对象之后可能被修改），其余格式化留给监听线程
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with any `extra` fields passed to the log call"""
+
+    _RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "job_id"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "job": getattr(record, "job_id", "-"),
+            "message": record.getMessage(),
+        }
+        data.update({key: value for key, value in vars(record).items() if key not in self._RESERVED})
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = "INFO", log_file: Optional[str] = None, json_format: bool = False) -> None:
+    """
+    Route all crashbot loggers through a background queue.
+
+    Callers only merge the message arguments and put the record on an
+    in-memory queue; the formatter (timestamp, layout, tracebacks) and the
+    console or file I/O run on the listener thread, so logging never blocks
+    the bot. Calling it again replaces the previous configuration.
+
+    Args:
+        level: Minimum level name, e.g. "DEBUG" or "INFO"
+        log_file: Also append records to this file
+        json_format: Write JSON lines instead of plain text
+    """
+    global _listener
+    shutdown_logging()
+
+    if json_format:
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s %(levelname)-7s [%(job_id)s] %(name)s: %(message)s")
+    # 控制台日志写到 stderr，stdout 只留给结果输出（例如 main.py --json）
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(_JobIdFilter())
+
+    root = logging.getLogger(ROOT_LOGGER_NAME)
+    root.handlers = [queue_handler]
+    root.setLevel(level.upper())
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush the queue and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+# 进程退出前写完队列中剩余的记录
+atexit.register(shutdown_logging)
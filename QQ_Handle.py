@@ -13,6 +13,8 @@ from ncatbot.utils import get_log
 
 import main
 import config_reader
+import Metrics
+from LogManager import get_logger, job_context, setup_logging
 
 cf = config_reader.Config()
 file = None
@@ -23,6 +25,7 @@ qq_id = cf.QQ_number
 # ========== 创建 BotClient ==========
 bot = BotClient()
 _log = get_log()
+logger = get_logger("bot")
 
 
 # ========== 处理消息 ==========
@@ -32,32 +35,45 @@ async def on_group_msg(msg: GroupMessage):
         message_segs = msg.message
         for message_seg in message_segs:
             if message_seg['type'] == "file":
-                print("收到带文件的群消息:", msg)
+                logger.info("收到带文件的群消息: %s", msg)
                 file_id = message_seg["data"]["file_id"]
                 file_respond = await bot.api.get_file(file_id)
                 file_source = file_respond["data"]["url"]
                 file_size = int(message_seg["data"]["file_size"])
-                print("文件的获取url是:", file_source)
+                logger.debug("文件的获取url是: %s", file_source)
                 if file_size < 40 * 1024 * 1024 and file_source.endswith(('.log', '.txt', '.zip')):
                     working_list.append({msg: file_source})
                     await handle_crash_file()
                 else:
-                    print("文件过大或格式不正确，无法处理", file_size,"and", file_source)
+                    Metrics.FAILURES.inc(reason="rejected")
+                    logger.warning("文件过大或格式不正确，无法处理 %s and %s", file_size, file_source)
 
 # 处理崩溃文件
 async def handle_crash_file():
     global working_list
     for file in working_list:
         for msg, file_source in file.items():
-            print("下载文件:", file_source)
-            if await download_file(file_source):
-                # 下载成功后，开始检查崩溃文件
-                print("下载完成，开始检查崩溃文件")
-                result = await start_check()
-                print("检查完成，结果:", result)
-                # 检查完成后，发送结果
-                if result != "NULL":
-                    await msg.reply(text=result, is_file=False)
+            # 同一个文件的下载、分析与回复日志使用同一个关联ID
+            with job_context():
+                logger.info("下载文件: %s", file_source)
+                if await download_file(file_source):
+                    # 下载成功后，开始检查崩溃文件
+                    logger.info("下载完成，开始检查崩溃文件")
+                    try:
+                        result = await start_check()
+                    except Exception as e:
+                        Metrics.FAILURES.inc(reason="analysis")
+                        logger.error("分析崩溃文件时发生错误: %s", e)
+                        continue
+                    logger.info("检查完成，结果: %s", result)
+                    # 检查完成后，发送结果
+                    if result != "NULL":
+                        try:
+                            with Metrics.timer("reply"):
+                                await msg.reply(text=result, is_file=False)
+                        except Exception as e:
+                            Metrics.FAILURES.inc(reason="reply")
+                            logger.error("发送分析结果时发生错误: %s", e)
     working_list = []
 
 # 异步下载和解压文件
@@ -73,22 +89,26 @@ async def download_file(file_source) -> bool:
             return True
         else:
             # 下载文件
-            response = rq.get(file_source)
+            with Metrics.timer("download"):
+                response = rq.get(file_source)
+            Metrics.BYTES.inc(len(response.content), source="download")
             if response.status_code == 200:
                 with open(os.path.join(cache_file, os.path.basename(file_source)), 'wb') as f:
                     f.write(response.content)
-                print("文件下载成功")
+                logger.debug("文件下载成功")
                 # 解压缩文件
                 if file_source.endswith('.zip'):
                     return unzip_file(os.path.join(cache_file, os.path.basename(file_source)), cache_file)
                 else:
-                    print("文件下载成功，文件已保存到缓存文件夹")
+                    logger.debug("文件下载成功，文件已保存到缓存文件夹")
                     return True
             else:
-                print("文件下载失败")
+                Metrics.FAILURES.inc(reason="download")
+                logger.warning("文件下载失败")
                 return False
     except Exception as e:
-        print(f"下载文件时发生错误: {e}")
+        Metrics.FAILURES.inc(reason="download")
+        logger.error("下载文件时发生错误: %s", e)
         return False
 
 # 开始检查崩溃文件
@@ -99,16 +119,22 @@ async def start_check():
 def unzip_file(file, extract_to: str) -> bool:
     """解压缩文件到指定目录"""
     try:
-        with zipfile.ZipFile(file, 'r') as zip_ref:
+        with Metrics.timer("unzip"), zipfile.ZipFile(file, 'r') as zip_ref:
             zip_ref.extractall(extract_to)
-        print(f"解压缩完成，文件已保存到 {extract_to}")
+        logger.debug("解压缩完成，文件已保存到 %s", extract_to)
         return True
     except Exception as e:
-        print(f"解压缩失败: {e}")
+        Metrics.FAILURES.inc(reason="unzip")
+        logger.error("解压缩失败: %s", e)
         return False
 
 if __name__ == "__main__":
+    setup_logging(cf.log_level, cf.log_file)
     try:
+        # 规则文件被修改后无需重启机器人
+        main.RULE_SETS.start_watching()
+        if cf.metrics_port:
+            Metrics.start_metrics_server(cf.metrics_host, cf.metrics_port)
         bot.run(bt_uin=qq_id,ws_uri=cf.ws_uri)  # 这里写 Bot 的 QQ 号
     except Exception as e:
-        print(f"An error occurred: {e}")
+        logger.error("An error occurred: %s", e)
@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+import time
+from typing import Dict, Tuple
+
+import main
+from LogManager import setup_logging
+
+EXPECTED_FILE_NAME = "expected.json"
+
+
+def analyze_case(folder: str) -> dict:
+    """Analyze one crash-log folder and return what the bot would report"""
+    analyzer = main.MinecraftCrashAnalyzer()
+    analyzer.collect_logs(folder)
+    analyzer.prepare_logs()
+    result = analyzer.analyze()
+    return {
+        "result": result,
+        "reasons": {getattr(reason, "name", reason): details for reason, details in analyzer.crash_reasons.items()},
+    }
+
+
+def run_corpus(corpus: str) -> Tuple[Dict[str, dict], float]:
+    """
+    Analyze every sub-folder of the corpus.
+
+    Returns:
+        Outputs by case name and the total analysis time in seconds
+    """
+    outputs = {}
+    elapsed = 0.0
+    for name in sorted(os.listdir(corpus)):
+        folder = os.path.join(corpus, name)
+        if not os.path.isdir(folder):
+            continue
+        started = time.perf_counter()
+        outputs[name] = analyze_case(folder)
+        elapsed += time.perf_counter() - started
+    return outputs, elapsed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record or check the analysis output of a crash-log corpus")
+    parser.add_argument("command", choices=("record", "check"))
+    parser.add_argument("corpus", help="Folder with one sub-folder of logs per case")
+    parser.add_argument("--expected", default=None,
+                        help=f"Expected output file; defaults to {EXPECTED_FILE_NAME} inside the corpus")
+    args = parser.parse_args()
+
+    setup_logging("WARNING")
+    expected_path = args.expected or os.path.join(args.corpus, EXPECTED_FILE_NAME)
+    outputs, elapsed = run_corpus(args.corpus)
+
+    if args.command == "record":
+        with open(expected_path, "w", encoding="utf-8") as file:
+            json.dump(outputs, file, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"Recorded {len(outputs)} cases to {expected_path} ({elapsed * 1000:.1f} ms)")
+        sys.exit(0)
+
+    with open(expected_path, "r", encoding="utf-8") as file:
+        expected = json.load(file)
+    # 经过 JSON 往返，保证与记录的格式一致（例如元组变为列表）
+    outputs = json.loads(json.dumps(outputs, ensure_ascii=False))
+    failed = sorted(name for name in expected.keys() | outputs.keys() if expected.get(name) != outputs.get(name))
+    for name in failed:
+        print(f"--- {name}")
+        print(f"expected: {json.dumps(expected.get(name), ensure_ascii=False)}")
+        print(f"actual:   {json.dumps(outputs.get(name), ensure_ascii=False)}")
+    print(f"{len(outputs) - len(failed)}/{len(outputs)} cases unchanged ({elapsed * 1000:.1f} ms)")
+    sys.exit(1 if failed else 0)
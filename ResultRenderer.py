@@ -0,0 +1,202 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+from CrashDatabase import CrashReasonDatabase
+from SlotsDataclass import frozen_dataclass
+
+NO_REASON_TEXT = "无法确定崩溃原因，请检查完整日志获取更多信息。"
+REASON_SEPARATOR = "\n\n此外，"
+HELP_TEXT = "\n\n如果要寻求帮助，请把错误报告文件发给对方，而不是发送这个窗口的照片或者截图。"
+
+
+def omitted_text(omitted: int, truncated: bool = False) -> str:
+    """Summary line for the matches of a rule that were left out (see RuleEngine.cap_matches)"""
+    return f"……以及另外{'至少' if truncated else ''} {omitted} 项"
+
+
+def _lines(details: List[str]) -> str:
+    return "\n".join(details)
+
+
+def _comma(details: List[str]) -> str:
+    return ", ".join(details)
+
+
+def _single(details: List[str]) -> Optional[str]:
+    # 只有一条信息时才直接展示
+    return details[0] if len(details) == 1 else None
+
+
+def _raw(details: List[str]) -> str:
+    return str(details)
+
+
+# Special_CrashReason 名称 -> (有详情时的模板, 无详情时的文本, 详情的格式化方式)
+# 模板可使用 {details}（格式化后的详情）和 {count}（列出的详情条数）；未列出的特殊原因不输出文字
+# 详情超出上限时，{details} 后另起一行追加 omitted_text 摘要，摘要不是详情，不计入 {count}
+SPECIAL_TEMPLATES: Dict[str, Tuple[Optional[str], str, Optional[Callable[[List[str]], Optional[str]]]]] = {
+    "MOD_MISSING": (
+        "缺少以下依赖Mod:\n{details}\n\n请安装以上缺失的Mod。",
+        "缺少某些依赖Mod，导致游戏崩溃。\n\n请确保安装了所有必需的Mod。",
+        _lines),
+    "MOD_DUPLICATE": (
+        "以下Mod被重复安装:\n{details}\n\n请删除重复的Mod文件，每个Mod只保留一个版本。",
+        "某些Mod被重复安装，导致游戏崩溃。\n\n请检查mods文件夹，确保每个Mod只有一个版本。",
+        _comma),
+    "MOD_SUSPECTED": (
+        "以下Mod可能导致了游戏崩溃:\n{details}\n\n尝试暂时移除以上的{count}个Mod，看看是否可以解决问题。",
+        "某些Mod可能导致了游戏崩溃，但无法确定具体是哪个Mod。\n\n尝试暂时移除部分Mod，看看是否可以解决问题。",
+        _comma),
+    "MOD_CONFIRMED": (
+        "以下Mod导致了游戏崩溃:\n{details}\n\n请更新或移除这些Mod。",
+        "某个Mod导致了游戏崩溃。\n\n请检查并更新你的Mod。",
+        _comma),
+    "MOD_INIT_FAILED": (
+        "以下Mod初始化失败:\n{details}\n\n请尝试更新或重新安装这些Mod。",
+        "某些Mod初始化失败，导致游戏崩溃。\n\n请检查并更新你的Mod。",
+        _comma),
+    "MOD_MIXIN_FAILED": (
+        None,
+        "Mod的Mixin注入失败，导致游戏崩溃。\n\n这通常是由于Mod间的冲突导致的，请尝试更新或移除最近安装的Mod。",
+        None),
+    "FABRIC_ERROR": (
+        "Fabric提供了以下错误信息:\n{details}\n\n请根据上述信息进行对应处理，如果看不懂英文可以使用翻译软件。",
+        "Fabric可能已经提供了错误信息，请根据错误报告中的日志信息进行对应处理，如果看不懂英文可以使用翻译软件。",
+        _single),
+    "FABRIC_SOLUTION": (
+        "Fabric提供了以下解决方案:\n{details}\n\n请根据上述信息进行对应处理，如果看不懂英文可以使用翻译软件。",
+        "Fabric可能已经提供了解决方案，请根据错误报告中的日志信息进行对应处理，如果看不懂英文可以使用翻译软件。",
+        _single),
+    "FORGE_ERROR": (
+        "Forge提供了以下错误信息:\n{details}\n\n请根据上述信息进行对应处理，如果看不懂英文可以使用翻译软件。",
+        "Forge可能已经提供了错误信息，请根据错误报告中的日志信息进行对应处理，如果看不懂英文可以使用翻译软件。",
+        _single),
+    "MIXIN_BOOTSTRAP_MISSING": (
+        None,
+        "MixinBootstrap缺失，导致游戏崩溃。\n\n这通常是由于Mod配置错误导致的，请重新安装Forge或Fabric。",
+        None),
+    "BLOCK_ERROR": (
+        "特定方块导致崩溃:\n{details}\n\n请尝试进入游戏世界的其他区域，或者使用MCEdit等工具删除这个位置的方块。\n更多请查阅https://www.bilibili.com/opus/807799450495877206",
+        "特定方块导致游戏崩溃。\n\n请尝试进入游戏世界的其他区域，或者使用MCEdit等工具编辑存档。",
+        _raw),
+    "ENTITY_ERROR": (
+        "特定实体导致崩溃:\n{details}\n\n请尝试进入游戏世界的其他区域，或者使用MCEdit等工具删除这个实体。",
+        "特定实体导致游戏崩溃。\n\n请尝试进入游戏世界的其他区域，或者使用MCEdit等工具编辑存档。",
+        _raw),
+    "FILE_VALIDATION_ERROR": (
+        None,
+        "部分文件或内容校验失败，导致游戏出现了问题。\n\n请尝试删除游戏（包括Mod）并重新下载，或尝试在重新下载时使用VPN。",
+        None),
+    "MANUAL_DEBUG_CRASH": (
+        None,
+        "这是一个手动触发的调试崩溃，不是真正的游戏错误。",
+        None),
+    "STACK_KEYWORD_FOUND": (
+        "堆栈分析发现潜在问题关键字:\n{details}\n\n这些关键字可能表示相关的Mod或组件出现了问题。",
+        "堆栈分析发现了一些潜在的问题，但无法确定具体原因。",
+        _comma),
+    "NO_ANALYSIS_FILES": (
+        None,
+        "你的游戏出现了一些问题，但未能找到相关记录文件，因此无法进行分析。",
+        None),
+    "UNKNOWN": (
+        None,
+        "未能确定崩溃的具体原因，请查看完整的崩溃日志了解更多信息。",
+        None),
+}
+
+# 出现这些原因时提示用户发送错误报告文件
+HELP_REASONS = frozenset({"FORGE_INCOMPLETE", "FABRIC_ERROR", "MOD_MISSING", "NO_ANALYSIS_FILES"})
+
+
+@frozen_dataclass
+class ReasonFragment:
+    """Pre-rendered text of one database crash reason"""
+    name: str
+    description: str
+    headline: str                   # "崩溃原因：<名称>"
+    description_text: str           # 描述中的 "\\n" 已替换为换行
+    contributors: Tuple[str, ...]   # 发现者名称
+
+
+class ResultRenderer:
+    """
+    Turns detected crash reasons into the result message.
+
+    The fragments of every database reason are built once from a database
+    snapshot, so rendering a result is a few dict lookups and one join.
+    Database reasons are keyed by ID (str); special reasons are
+    Special_CrashReason members, looked up by name.
+    """
+
+    def __init__(self, database: CrashReasonDatabase):
+        self.fragments: Dict[str, ReasonFragment] = {}
+        for reason_id, reason in database.crash_reason_models.items():
+            self.fragments[reason_id] = ReasonFragment(
+                name=reason.name,
+                description=reason.description,
+                headline=f"崩溃原因：{reason.name}",
+                description_text=reason.description.replace("\\n", "\n"),
+                contributors=tuple(person.name for person in database.get_promoters_for_crash(reason_id)),
+            )
+
+    def _reason_text(self, reason, details: List[str], omitted: Tuple[int, bool] = (0, False)) -> Optional[str]:
+        if isinstance(reason, str):
+            fragment = self.fragments.get(reason)
+            if fragment is None:
+                return None
+            if not details:
+                return fragment.headline
+            # 关键词规则的详情就是原因描述，直接使用缓存的文本
+            detail = details[0]
+            text = fragment.description_text if detail == fragment.description else detail.replace("\\n", "\n")
+            return f"{fragment.headline} -{text}"
+
+        template = SPECIAL_TEMPLATES.get(reason.name)
+        if template is None:
+            return None
+        detailed, fallback, format_details = template
+        if detailed and details:
+            formatted = format_details(details)
+            if formatted is not None:
+                if omitted[0]:
+                    formatted += "\n" + omitted_text(*omitted)
+                return detailed.format(details=formatted, count=len(details))
+        return fallback
+
+    def render(self, reasons: Dict[object, List[str]],
+               omitted: Optional[Dict[object, Tuple[int, bool]]] = None) -> str:
+        """
+        Build the user-facing result message.
+
+        Args:
+            reasons: Detected reasons and their details, in detection order
+            omitted: (number of details left out, whether the count is a minimum) of capped reasons
+        """
+        if not reasons:
+            return NO_REASON_TEXT
+        omitted = omitted or {}
+        texts = [text for text in (self._reason_text(reason, details, omitted.get(reason, (0, False)))
+                                   for reason, details in reasons.items()) if text]
+        result = REASON_SEPARATOR.join(texts)
+        if any(not isinstance(reason, str) and reason.name in HELP_REASONS for reason in reasons):
+            result += HELP_TEXT
+        return result
+
+    def reason_name(self, reason) -> str:
+        """Display name of a database reason ID or a Special_CrashReason"""
+        if isinstance(reason, str):
+            fragment = self.fragments.get(reason)
+            return fragment.name if fragment else reason
+        return reason.value[0]
+
+    def contributors(self, reasons: Dict[object, List[str]]) -> List[str]:
+        """Contributors of the detected reasons, without duplicates"""
+        names: Dict[str, None] = {}
+        for reason in reasons:
+            if isinstance(reason, str):
+                fragment = self.fragments.get(reason)
+                if fragment:
+                    names.update(dict.fromkeys(fragment.contributors))
+            else:
+                names[reason.value[1]] = None
+        return list(names)
@@ -0,0 +1,838 @@
+import copy
+import json
+import os
+import re
+import string
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import JsonHandle
+import Metrics
+import RulePack
+from CrashDatabase import CrashReasonDatabase
+from CrashStorage import TABLES, create_storage
+from LiteralScanner import LiteralScanner, LiteralHits
+from LogManager import get_logger
+from ResultRenderer import ResultRenderer
+from RuleStats import RuleStats
+
+logger = get_logger("rules")
+
+# 字面量扫描在规则统计中使用的ID
+LITERAL_SCAN_ID = "__literal_scan__"
+
+# 特殊规则的执行阶段：crit1 在关键词匹配之前，crit3 在堆栈分析之后
+SPECIAL_STAGES = ("crit1", "crit3")
+
+# 每条规则最多报告的不同匹配数（特殊规则的提取器可用 "limit" 单独设置）
+MATCH_LIMIT = 20
+# 每条规则最多检查的匹配数；同一内容被记录成千上万次时不再遍历整个日志
+MATCH_SCAN_LIMIT = 1000
+
+# 正则中会打断字面量的元字符
+_REGEX_META = set(".^$*+?{}[]()|")
+# {m}、{m,}、{,n}、{m,n} 形式的重复量词
+_REGEX_REPEAT = re.compile(r"\{(?:\d+(?:,\d*)?|,\d+)\}")
+_REGEX_ESCAPES = {"t": "\t", "n": "\n", "r": "\r", "f": "\f", "v": "\v"}
+_PLACEHOLDER = re.compile(r"\[\[(\d+|#)\]\]")
+
+
+def try_analyze_mod_name(text: str) -> List[str]:
+    """
+    Extract mod name from text
+
+    Args:
+        text: Text containing mod information
+
+    Returns:
+        List of extracted mod names
+    """
+    if not text:
+        return []
+
+    # Remove common prefixes/suffixes
+    text = re.sub(r'(mods\.|com\.|org\.|net\.|io\.)', '', text)
+
+    # Extract the most likely mod name part
+    parts = text.split('.')
+    if len(parts) > 1:
+        # Try to get the most meaningful part
+        candidates = [p for p in parts if len(p) > 2 and not p.isdigit()]
+        if candidates:
+            return [candidates[0]]
+
+    return [text]
+
+
+def class_java_mapping(class_version: int) -> int:
+    return class_version - 44
+
+
+def _transform_class_java(value: str) -> str:
+    return str(class_java_mapping(int(value)))
+
+
+def _transform_mod_name(value: str) -> str:
+    return try_analyze_mod_name(value.strip())[0]
+
+
+def _transform_strip(value: str) -> str:
+    return value.strip()
+
+
+# 提取器可用的值转换（使用模块级函数，编译结果才能写入规则包）
+TRANSFORMS: Dict[str, Callable[[str], str]] = {
+    "class_java": _transform_class_java,
+    "mod_name": _transform_mod_name,
+    "strip": _transform_strip,
+}
+
+
+def _regex_escape(pattern: str, i: int) -> Tuple[Optional[str], int]:
+    """
+    Decode the escape sequence starting at pattern[i] (a backslash).
+
+    Returns:
+        The literal character it stands for (None for classes, anchors and
+        backreferences) and the index after the escape
+    """
+    nxt = pattern[i + 1]
+    if nxt in _REGEX_ESCAPES:
+        return _REGEX_ESCAPES[nxt], i + 2
+    if nxt in "xuU":
+        digits = {"x": 2, "u": 4, "U": 8}[nxt]
+        code = pattern[i + 2:i + 2 + digits]
+        if len(code) == digits and all(c in string.hexdigits for c in code):
+            return chr(int(code, 16)), i + 2 + digits
+        return None, i + 2
+    if nxt == "N" and pattern.startswith("{", i + 2):
+        end = pattern.find("}", i + 3)
+        if end < 0:
+            return None, len(pattern)
+        try:
+            return unicodedata.lookup(pattern[i + 3:end]), end + 1
+        except KeyError:
+            return None, end + 1
+    if nxt.isdigit():
+        # 与 re 一致：以 0 开头或三位八进制数字是八进制转义，否则是最多两位的反向引用
+        octal = re.match(r"0[0-7]{0,2}|[0-7]{3}", pattern[i + 1:i + 4])
+        if octal:
+            return chr(int(octal.group(), 8)), i + 1 + octal.end()
+        return None, i + (3 if pattern[i + 2:i + 3].isdigit() else 2)
+    if not nxt.isalnum():
+        return nxt, i + 2
+    return None, i + 2
+
+
+def regex_literal(pattern: str) -> Optional[str]:
+    """
+    Return the text a regex matches if it is a plain (possibly escaped) literal, otherwise None.
+
+    Escapes and metacharacters are read the same way as in required_literal,
+    so the importer and the prefilter agree on which patterns are literals.
+    """
+    result = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == "\\":
+            if i + 1 >= len(pattern):
+                return None
+            literal, i = _regex_escape(pattern, i)
+            if literal is None:
+                return None     # \d、\s、\b、反向引用等
+        elif ch == "{" and _REGEX_REPEAT.match(pattern, i) is None:
+            literal = ch
+            i += 1
+        elif ch in _REGEX_META:
+            return None
+        else:
+            literal = ch
+            i += 1
+        result.append(literal)
+    return "".join(result)
+
+
+def required_literal(pattern: str) -> Optional[str]:
+    """
+    Find the longest literal that every match of a regex must contain.
+
+    Only top-level literal runs are considered; patterns with top-level
+    alternation or inline flags have no prefilter.
+
+    Args:
+        pattern: Regex pattern
+
+    Returns:
+        The literal, or None if no safe literal could be found
+    """
+    if pattern.startswith("(?"):
+        return None
+
+    runs = []
+    current = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        literal = None
+        if ch == "\\" and i + 1 < len(pattern):
+            literal, i = _regex_escape(pattern, i)
+            if depth > 0:
+                literal = None
+        elif ch == "[":
+            # 跳过字符类
+            j = i + 1
+            if j < len(pattern) and pattern[j] == "^":
+                j += 1
+            if j < len(pattern) and pattern[j] == "]":
+                j += 1
+            while j < len(pattern) and pattern[j] != "]":
+                j += 2 if pattern[j] == "\\" else 1
+            i = j + 1
+        elif ch == "{":
+            # 整个 {m,n} 量词一起跳过；不构成量词的 { 是普通字符
+            quantifier = _REGEX_REPEAT.match(pattern, i)
+            if quantifier:
+                i = quantifier.end()
+            else:
+                i += 1
+                if depth == 0:
+                    literal = ch
+        elif ch == "(":
+            depth += 1
+            i += 1
+        elif ch == ")":
+            depth -= 1
+            i += 1
+        elif ch == "|":
+            if depth == 0:
+                return None
+            i += 1
+        elif ch in _REGEX_META:
+            i += 1
+        else:
+            i += 1
+            if depth == 0:
+                literal = ch
+
+        # 后面跟着量词时该字符不是必需的
+        quantified = i < len(pattern) and (pattern[i] in "*?" or _REGEX_REPEAT.match(pattern, i) is not None)
+        if literal is not None and not quantified:
+            current.append(literal)
+        else:
+            if current:
+                runs.append("".join(current))
+            current = []
+    if current:
+        runs.append("".join(current))
+
+    runs = [run for run in runs if len(run) >= 3]
+    return max(runs, key=len) if runs else None
+
+
+def fill_template(template: str, values: List[str], ordinal: int = 1) -> str:
+    """Replace [[n]] placeholders with extracted values and [[#]] with the ordinal of the match"""
+    def substitute(match):
+        key = match.group(1)
+        if key == "#":
+            return str(ordinal)
+        index = int(key) - 1
+        return values[index] if index < len(values) else match.group(0)
+    return _PLACEHOLDER.sub(substitute, template)
+
+
+def cap_matches(items: Iterable[Optional[Tuple[Optional[str], str, int]]], limit: int,
+                unique: bool = True) -> Tuple[List[Tuple[Optional[str], str, int]], int, bool]:
+    """
+    Keep the first matches of a rule and count the rest.
+
+    At most MATCH_SCAN_LIMIT items are consumed, so a lazy finditer stops
+    early. Items beyond the limit are only counted; the renderer adds the
+    "……以及另外 N 项" line, so the kept items are always real matches.
+
+    Args:
+        items: (reason override, detail, offset) tuples; None for a match without usable values
+        limit: Maximum number of matches to keep
+        unique: Drop details that were already seen
+
+    Returns:
+        (kept items, number of omitted items, whether the scan stopped early so more may exist)
+    """
+    kept = []
+    seen = set()
+    omitted = 0
+    truncated = False
+    for scanned, item in enumerate(items, start=1):
+        if scanned > MATCH_SCAN_LIMIT:
+            truncated = True
+            break
+        if item is None:
+            continue
+        if unique:
+            if item[1] in seen:
+                continue
+            seen.add(item[1])
+        if len(kept) < limit:
+            kept.append(item)
+        else:
+            omitted += 1
+    return kept, omitted, truncated
+
+
+def regex_details(pattern: re.Pattern, template: str,
+                  text: str) -> Tuple[List[Tuple[Optional[str], str, int]], int, bool]:
+    """
+    Fill the template of a regex rule from its matches in the text.
+
+    Only matches whose groups all matched and fill every placeholder are used;
+    the result is capped like every rule's matches (see cap_matches).
+    """
+    placeholders = template.count("[[")
+    return cap_matches(((None, fill_template(template, list(match.groups())), match.start())
+                        if None not in match.groups() and len(match.groups()) == placeholders else None
+                        for match in pattern.finditer(text)), MATCH_LIMIT)
+
+
+@dataclass
+class RuleMatch:
+    reason: str                 # 崩溃原因ID（数据库规则）或 Special_CrashReason 的名称（特殊规则）
+    rule_id: str
+    details: List[str] = field(default_factory=list)
+    offset: int = -1
+    special: bool = False
+    omitted: int = 0            # 超出上限未列出的详情条数
+    truncated: bool = False     # 达到扫描上限提前停止，实际条数可能更多
+
+
+def _regex_flags(names: List[str]) -> int:
+    flags = 0
+    for name in names or []:
+        flags |= getattr(re, name)
+    return flags
+
+
+class Extractor:
+    """One extraction step of a special rule, compiled from its JSON definition"""
+
+    def __init__(self, data: dict):
+        flags = _regex_flags(data.get("flags"))
+        patterns = data["pattern"]
+        self.patterns = [re.compile(p, flags) for p in (patterns if isinstance(patterns, list) else [patterns])]
+        self.scope = re.compile(data["scope"], flags) if data.get("scope") else None
+        self.mode = data.get("mode", "first")
+        self.replace: List[Tuple[str, str]] = [tuple(pair) for pair in data.get("replace", [])]
+        self.transform = TRANSFORMS[data["transform"]] if data.get("transform") else None
+        self.template = data.get("template", "[[1]]")
+        self.cases = data.get("cases", [])
+        self.unique = data.get("unique", False)
+        self.limit = data.get("limit", MATCH_LIMIT)
+
+    def _values(self, match) -> List[str]:
+        values = list(match.groups()) if match.re.groups else [match.group(0)]
+        result = []
+        for value in values:
+            if value is None:
+                return []
+            for old, new in self.replace:
+                value = value.replace(old, new)
+            if self.transform:
+                value = self.transform(value)
+            result.append(value)
+        return result
+
+    def _case(self, values: List[str]) -> dict:
+        """Pick the first case whose condition holds for the extracted values"""
+        def arg(item):
+            if isinstance(item, int):
+                return values[item - 1] if item - 1 < len(values) else None
+            return item
+
+        for case in self.cases:
+            condition = case.get("if")
+            if not condition:
+                return case
+            op, left, right = condition[0], arg(condition[1]), arg(condition[2])
+            if op == "eq" and left == right:
+                return case
+            if op == "gt" and left is not None and right is not None and float(left) > float(right):
+                return case
+        return {}
+
+    def extract(self, text: str) -> Tuple[List[Tuple[Optional[str], str, int]], int, bool]:
+        """
+        Run the extractor against the text.
+
+        Returns:
+            (reason override, detail, offset) tuples with the omitted count, as cap_matches returns them
+        """
+        base = 0
+        if self.scope:
+            scope_match = self.scope.search(text)
+            if not scope_match:
+                return [], 0, False
+            group = 1 if self.scope.groups else 0
+            base = scope_match.start(group)
+            text = scope_match.group(group)
+
+        if len(self.patterns) > 1:
+            # 多个正则各自取第一个匹配，依次作为 [[1]]、[[2]]……
+            values = []
+            offset = -1
+            for pattern in self.patterns:
+                match = pattern.search(text)
+                if not match:
+                    return [], 0, False
+                values.extend(self._values(match))
+                offset = match.start() if offset < 0 else offset
+            matches = [(values, offset)]
+        elif self.mode == "all":
+            # 惰性求值，达到上限后 cap_matches 停止遍历
+            matches = ((self._values(match), match.start()) for match in self.patterns[0].finditer(text))
+        else:
+            match = self.patterns[0].search(text)
+            matches = [(self._values(match), match.start())] if match else []
+
+        return cap_matches((self._result(values, offset + base, ordinal)
+                            for ordinal, (values, offset) in enumerate(matches, start=1)),
+                           self.limit, self.unique)
+
+    def _result(self, values: List[str], offset: int, ordinal: int) -> Optional[Tuple[Optional[str], str, int]]:
+        if not values:
+            return None
+        case = self._case(values)
+        return case.get("reason"), fill_template(case.get("template", self.template), values, ordinal), offset
+
+
+class SpecialRule:
+    """A declarative replacement for one of the hand-written Special_CrashReason checks"""
+
+    def __init__(self, data: dict):
+        self.id = data["id"]
+        self.stage = data["stage"]
+        self.order = data.get("order", 0)
+        self.reason = data["reason"]
+        self.literals: List[str] = data["literals"]
+        self.stop = data.get("stop", False)
+        self.require_match = data.get("require_match", False)
+        self.extractors = [Extractor(item) for item in data.get("extractors", [])]
+        # 字面量在扫描器中的键
+        self.literal_keys: List[str] = [f"special:{self.id}:{i}" for i in range(len(self.literals))]
+
+    def evaluate(self, text: str, hits: LiteralHits) -> List[RuleMatch]:
+        if not hits.any(*self.literal_keys):
+            return []
+        offset = min(hits.offset(key) for key in self.literal_keys if key in hits)
+
+        for extractor in self.extractors:
+            extracted, omitted, truncated = extractor.extract(text)
+            if not extracted:
+                continue
+            # 按原因分组，保持出现顺序
+            grouped: Dict[str, RuleMatch] = {}
+            for reason, detail, detail_offset in extracted:
+                reason = reason or self.reason
+                if reason not in grouped:
+                    grouped[reason] = RuleMatch(reason, self.id, [], detail_offset, special=True)
+                grouped[reason].details.append(detail)
+            # 未列出的条数记在最后一个列出项的原因上
+            last = grouped[extracted[-1][0] or self.reason]
+            last.omitted, last.truncated = omitted, truncated
+            return list(grouped.values())
+
+        if self.require_match:
+            return []
+        return [RuleMatch(self.reason, self.id, [], offset, special=True)]
+
+
+class CompiledRuleSet:
+    """
+    Every detection rule compiled into one engine.
+
+    All literals needed by the engine (special rule triggers, exact-match
+    rules and the required literals of regex rules) share one LiteralScanner,
+    so a log is scanned once and regexes only run when their prefilter hit.
+    """
+
+    def __init__(self, database: CrashReasonDatabase, special_rules: Dict[str, dict],
+                 aux_literals: Optional[Dict[str, str]] = None, version: int = 0,
+                 previous: Optional["CompiledRuleSet"] = None):
+        self.database = database
+        self.version = version
+        self.scanner = LiteralScanner()
+        self.keyword_rules: List[Tuple[str, str, str]] = []     # (扫描键, 规则ID, 崩溃原因ID)
+        self.regex_rules: List[Tuple[Optional[str], str, str, re.Pattern, str]] = []
+        self.special_rules: Dict[str, List[SpecialRule]] = {stage: [] for stage in SPECIAL_STAGES}
+        self.stop_rules = set()     # 命中后结束所在阶段的特殊规则ID
+        self.descriptions: Dict[str, str] = {}
+        # 数据库规则按崩溃原因的优先级评估；终止规则命中后跳过优先级更低的规则
+        self.reason_order: Dict[str, int] = {}      # 崩溃原因在数据库中的位置，结果按此顺序输出
+        self.reason_priority: Dict[str, int] = {}
+        self.terminal_rules = set()
+
+        # 编译缓存，重新加载时只重新编译内容发生变化的规则
+        self._compiled_regex: Dict[str, Tuple[re.Pattern, Optional[str]]] = {}
+        self._compiled_special: Dict[str, Tuple[str, SpecialRule]] = {}
+        previous_regex = previous._compiled_regex if previous else {}
+        previous_special = previous._compiled_special if previous else {}
+
+        # 辅助字面量（例如加载器名称）按不区分大小写处理
+        for key, literal in (aux_literals or {}).items():
+            self.scanner.add(key, literal, ignore_case=True)
+
+        # 特殊规则
+        for rule_data in sorted(special_rules.values(), key=lambda item: (item.get("order", 0), item["id"])):
+            signature = json.dumps(rule_data, sort_keys=True)
+            cached = previous_special.get(rule_data.get("id"))
+            if cached and cached[0] == signature:
+                rule = cached[1]
+            else:
+                try:
+                    rule = SpecialRule(rule_data)
+                except (KeyError, re.error) as e:
+                    logger.error("Error compiling special rule %s: %s", rule_data.get('id'), e)
+                    continue
+            self._compiled_special[rule.id] = (signature, rule)
+            for key, literal in zip(rule.literal_keys, rule.literals):
+                self.scanner.add(key, literal)
+            self.special_rules[rule.stage].append(rule)
+            if rule.stop:
+                self.stop_rules.add(rule.id)
+
+        # 数据库中的规则，按崩溃原因的顺序
+        for order, (reason_id, reason_data) in enumerate(database.crash_reasons.items()):
+            self.descriptions[reason_id] = reason_data["description"]
+            self.reason_order[reason_id] = order
+            self.reason_priority[reason_id] = reason_data.get("priority", 0)
+            for rule in database.get_detection_rules_for_crash(reason_id):
+                if rule.terminal:
+                    self.terminal_rules.add(rule.id)
+                if rule.match_type == 0:  # Exact match
+                    # 与 flashtext 一致：不区分大小写，且需要单词边界
+                    key = f"keyword:{rule.id}"
+                    self.scanner.add(key, rule.match, ignore_case=True, word_boundary=True)
+                    self.keyword_rules.append((key, rule.id, reason_id))
+                elif rule.match_type == 1:  # Regex match
+                    compiled = previous_regex.get(rule.match)
+                    if compiled is None:
+                        try:
+                            compiled = (re.compile(rule.match, re.DOTALL), required_literal(rule.match))
+                        except re.error as e:
+                            logger.error("Error compiling regex rule %s: %s", rule.id, e)
+                            continue
+                    self._compiled_regex[rule.match] = compiled
+                    pattern, literal = compiled
+                    key = None
+                    if literal:
+                        key = f"prefilter:{rule.id}"
+                        self.scanner.add(key, literal)
+                    self.regex_rules.append((key, rule.id, reason_id, pattern, reason_data["description"]))
+
+        # 稳定排序：同一优先级内保持原来的顺序
+        self.keyword_rules.sort(key=lambda rule: -self.reason_priority[rule[2]])
+        self.regex_rules.sort(key=lambda rule: -self.reason_priority[rule[2]])
+
+        # 提前生成合并所有字面量的扫描正则，规则包中保存编译结果，第一次分析不再需要这一步
+        self.scanner.compile()
+
+        # 结果文本的片段随数据库版本一起生成
+        self.renderer = ResultRenderer(database)
+
+    @classmethod
+    def load(cls, database: CrashReasonDatabase, special_rules_file_path: str = "special_rules.json",
+             aux_literals: Optional[Dict[str, str]] = None) -> "CompiledRuleSet":
+        return cls(database, JsonHandle.read_json(special_rules_file_path), aux_literals)
+
+    def with_database(self, database: CrashReasonDatabase, version: int) -> "CompiledRuleSet":
+        """Return a new version that shares the compiled rules but uses another database (people, promoters)"""
+        rule_set = copy.copy(self)
+        rule_set.database = database
+        rule_set.version = version
+        rule_set.renderer = ResultRenderer(database)
+        return rule_set
+
+    def scan(self, text: str, stats: Optional[RuleStats] = None) -> LiteralHits:
+        """Scan the log once for every literal of every rule"""
+        started = time.perf_counter_ns()
+        hits = self.scanner.scan(text)
+        if stats:
+            stats.record(LITERAL_SCAN_ID, "scan", time.perf_counter_ns() - started, hits.bitmap != 0,
+                         len(text) if text else 0)
+        return hits
+
+    def run_special(self, stage: str, text: str, hits: LiteralHits,
+                    stats: Optional[RuleStats] = None) -> List[RuleMatch]:
+        """Evaluate the special rules of one stage in order, stopping at the first hit of a stop rule"""
+        results = []
+        for rule in self.special_rules[stage]:
+            started = time.perf_counter_ns()
+            try:
+                matches = rule.evaluate(text, hits)
+            except Exception as e:
+                logger.error("Error evaluating special rule %s: %s", rule.id, e)
+                matches = []
+            if stats:
+                scanned = len(text) if rule.extractors and hits.any(*rule.literal_keys) else 0
+                stats.record(rule.id, stage, time.perf_counter_ns() - started, bool(matches), scanned)
+            results.extend(matches)
+            if matches and rule.stop:
+                break
+        return results
+
+    def run_keywords(self, hits: LiteralHits, stats: Optional[RuleStats] = None) -> List[RuleMatch]:
+        """Report every exact-match rule whose literal was found"""
+        results = []
+        found = set()
+        cutoff = None
+        for key, rule_id, reason_id in self.keyword_rules:
+            priority = self.reason_priority[reason_id]
+            if cutoff is not None and priority < cutoff:
+                break
+            hit = key in hits
+            if stats:
+                # 关键词在字面量扫描中已经完成，这里只是位图查询
+                stats.record(rule_id, "keyword", 0, hit)
+            # 同一崩溃原因只报告一次
+            if hit and reason_id not in found:
+                found.add(reason_id)
+                results.append(RuleMatch(reason_id, rule_id, [self.descriptions[reason_id]], hits.offset(key)))
+            if hit and cutoff is None and rule_id in self.terminal_rules:
+                cutoff = priority
+        return self._in_reason_order(results)
+
+    def run_regex(self, text: str, hits: LiteralHits, stats: Optional[RuleStats] = None) -> List[RuleMatch]:
+        """Run the regex rules whose prefilter literal was found and fill their templates"""
+        results = []
+        cutoff = None
+        for key, rule_id, reason_id, pattern, template in self.regex_rules:
+            priority = self.reason_priority[reason_id]
+            if cutoff is not None and priority < cutoff:
+                break
+            if key is not None and key not in hits:
+                if stats:
+                    stats.record(rule_id, "regex", 0, False)
+                continue
+            started = time.perf_counter_ns()
+            kept, omitted, truncated = regex_details(pattern, template, text)
+            details = [detail for _, detail, _ in kept]
+            offset = kept[0][2] if kept else -1
+            if stats:
+                stats.record(rule_id, "regex", time.perf_counter_ns() - started, bool(details), len(text))
+            if details:
+                results.append(RuleMatch(reason_id, rule_id, details, offset, omitted=omitted, truncated=truncated))
+                if cutoff is None and rule_id in self.terminal_rules:
+                    cutoff = priority
+        return self._in_reason_order(results)
+
+    def _in_reason_order(self, results: List[RuleMatch]) -> List[RuleMatch]:
+        # 评估按优先级进行，报告仍按数据库中崩溃原因的顺序（稳定排序保留同一原因内规则的顺序）
+        if len(results) > 1:
+            results.sort(key=lambda match: self.reason_order[match.reason])
+        return results
+
+
+# 数据库表与对应的加载方法
+_DATABASE_TABLES = (
+    ("persons", "load_persons"),
+    ("crash_reasons", "load_crash_reasons"),
+    ("detection_rules", "load_detection_rules"),
+    ("crash_promoters", "load_crash_promoters"),
+    ("rule_contributors", "load_rule_contributors"),
+)
+_SPECIAL_RULES = "special_rules"
+# 会影响编译结果的数据，其余数据变化时只替换数据库
+_COMPILED_SOURCES = {"crash_reasons", "detection_rules", _SPECIAL_RULES}
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class RuleSetManager:
+    """
+    Owns the current CompiledRuleSet and replaces it when rule files change.
+
+    Every reload produces a new, versioned rule set; only the tables whose
+    storage signature changed are re-read, and only rules whose source changed are
+    recompiled. The swap is a single reference assignment, so analyses that
+    already hold the previous version finish on it while new analyses pick up
+    the new one.
+    """
+
+    def __init__(self, database: Optional[CrashReasonDatabase] = None,
+                 special_rules_file_path: str = "special_rules.json",
+                 aux_literals: Optional[Dict[str, str]] = None,
+                 database_factory: Callable[[], CrashReasonDatabase] = CrashReasonDatabase,
+                 pack_path: Optional[str] = None,
+                 pack_sources: Optional[List[str]] = None):
+        self._database = database
+        self._database_factory = database_factory
+        # 预编译规则包及其来源文件；来源内容不变时启动直接读取规则包
+        self.pack_path = pack_path
+        self.pack_sources = pack_sources or []
+        self.special_rules_file_path = special_rules_file_path
+        self.aux_literals = aux_literals
+        self._current: Optional[CompiledRuleSet] = None
+        self._special_rules: Dict[str, dict] = {}
+        self._signatures: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    @classmethod
+    def in_folder(cls, folder: str, database_backend: str = "json", sqlite_path: Optional[str] = None,
+                  aux_literals: Optional[Dict[str, str]] = None) -> "RuleSetManager":
+        """
+        Create the rule set manager of a database folder.
+
+        Args:
+            folder: Folder holding the JSON tables, special_rules.json and rules.pack
+            database_backend: "json" or "sqlite" (config database_backend)
+            sqlite_path: SQLite database file (config sqlite_database_path)
+            aux_literals: Extra literals found in the same scan as the rules
+        """
+        # 规则包的来源是实际存放规则数据的文件
+        if database_backend == "sqlite":
+            pack_sources = [sqlite_path, sqlite_path + "-wal"]
+        else:
+            pack_sources = [os.path.join(folder, f"{table}.json") for table in TABLES]
+        return cls(
+            special_rules_file_path=os.path.join(folder, "special_rules.json"),
+            aux_literals=aux_literals,
+            database_factory=lambda: CrashReasonDatabase.in_folder(
+                folder, create_storage(database_backend, sqlite_path)),
+            pack_path=os.path.join(folder, "rules.pack"),
+            pack_sources=pack_sources)
+
+    def _signatures_of(self, database: CrashReasonDatabase) -> Dict[str, object]:
+        signatures = {table: database.storage.signature(table) for table, _ in _DATABASE_TABLES}
+        signatures[_SPECIAL_RULES] = _file_signature(self.special_rules_file_path)
+        return signatures
+
+    def _describe(self, database: CrashReasonDatabase, source: str) -> str:
+        if source == _SPECIAL_RULES:
+            return self.special_rules_file_path
+        return database.storage.describe(source)
+
+    def _pack_fingerprint(self) -> str:
+        return RulePack.fingerprint(self.pack_sources + [self.special_rules_file_path],
+                                    json.dumps(self.aux_literals or {}, sort_keys=True))
+
+    def _compile_sources(self) -> Tuple[CompiledRuleSet, Dict[str, dict]]:
+        # 规则集固定引用数据库的一个快照，编辑器之后对数据库的修改不会影响它
+        database = (self._database or self._database_factory()).snapshot()
+        special_rules = JsonHandle.read_json(self.special_rules_file_path)
+        return CompiledRuleSet(database, special_rules, self.aux_literals, version=1), special_rules
+
+    def _load_initial(self) -> None:
+        payload = None
+        if self.pack_path:
+            fingerprint = self._pack_fingerprint()
+            payload = RulePack.read_pack(self.pack_path, fingerprint)
+            Metrics.CACHE.inc(cache="rule_pack", result="miss" if payload is None else "hit")
+            if payload is None:
+                payload = self._compile_sources()
+                RulePack.write_pack(self.pack_path, payload, fingerprint)
+        else:
+            payload = self._compile_sources()
+
+        rule_set, self._special_rules = payload
+        self._signatures = self._signatures_of(rule_set.database)
+        self._current = rule_set
+
+    def build_pack(self) -> bool:
+        """Compile the rules from their sources and write the pack file"""
+        if not self.pack_path:
+            raise ValueError("This rule set manager has no pack_path")
+        fingerprint = self._pack_fingerprint()
+        return RulePack.write_pack(self.pack_path, self._compile_sources(), fingerprint)
+
+    def current(self) -> CompiledRuleSet:
+        """
+        Return the newest rule set.
+
+        Without a running watcher the rule files are checked on every call,
+        which costs one stat() (or one SQLite query) per table.
+        """
+        if self._current is None:
+            with self._lock:
+                if self._current is None:
+                    self._load_initial()
+        elif self._watcher is None:
+            self.check_for_changes()
+        return self._current
+
+    def check_for_changes(self) -> bool:
+        """
+        Reload the rule files that changed since the last check.
+
+        Returns:
+            True if a new rule set version was published
+        """
+        with self._lock:
+            if self._current is None:
+                self._load_initial()
+                return True
+
+            old = self._current
+            signatures = self._signatures_of(old.database)
+            changed = {source for source, signature in signatures.items()
+                       if signature != self._signatures.get(source)}
+            if not changed:
+                return False
+            # 文件正在被重写（已截断但尚未写完）时等下一次检查
+            if any(isinstance(signatures[source], tuple) and signatures[source][1] == 0 for source in changed):
+                return False
+
+            # 未变化的数据直接共享，变化的表重新读取
+            database = copy.copy(old.database)
+            for table, loader in _DATABASE_TABLES:
+                if table in changed:
+                    getattr(database, loader)()
+            database = database.snapshot()
+            if _SPECIAL_RULES in changed:
+                self._special_rules = JsonHandle.read_json(self.special_rules_file_path)
+
+            version = old.version + 1
+            Metrics.CACHE.inc(cache="compiled_rules", result="miss" if changed & _COMPILED_SOURCES else "hit")
+            if changed & _COMPILED_SOURCES:
+                new = CompiledRuleSet(database, self._special_rules, self.aux_literals, version=version, previous=old)
+            else:
+                new = old.with_database(database, version)
+
+            self._signatures = signatures
+            self._current = new
+            logger.info("规则已重新加载（版本 %s）: %s", version,
+                        ", ".join(sorted(self._describe(database, source) for source in changed)))
+            return True
+
+    def start_watching(self, interval: float = 1.0) -> None:
+        """Poll the rule files in a background thread"""
+        if self._watcher is not None:
+            return
+        self.current()
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval):
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    logger.error("重新加载规则时出错: %s", e)
+
+        self._watcher = threading.Thread(target=watch, name="rule-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join()
+        self._watcher = None
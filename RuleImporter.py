@@ -0,0 +1,286 @@
+import copy
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import JsonHandle
+from CrashDatabase import CrashReasonDatabase, CrashReason, DetectionRule, Person, stable_rule_id
+from LogManager import get_logger
+from RuleEngine import CompiledRuleSet, regex_literal
+
+logger = get_logger("importer")
+
+# 输入中 match_type 的各种写法
+_MATCH_TYPES = {0: 0, 1: 1, "0": 0, "1": 1, "keyword": 0, "exact": 0, "regex": 1}
+
+
+@dataclass
+class ImportedRule:
+    crash_reason_id: str
+    match_type: int
+    match: str
+    contributors: List[str] = field(default_factory=list)   # 贡献者名称
+    source: str = ""                                        # 在输入中的位置，用于报告
+
+
+@dataclass
+class ImportReport:
+    added: List[str] = field(default_factory=list)                      # 新规则ID
+    duplicates: List[Tuple[str, str]] = field(default_factory=list)     # (来源, 已有规则ID)
+    conflicts: List[Tuple[str, str]] = field(default_factory=list)      # (来源, 其他崩溃原因下的相同规则ID)
+    invalid: List[Tuple[str, str]] = field(default_factory=list)        # (来源, 错误)
+    reasons_added: List[str] = field(default_factory=list)
+    persons_added: List[str] = field(default_factory=list)
+    committed: bool = False
+
+    def summary(self) -> str:
+        lines = [f"Added {len(self.added)} rules, {len(self.reasons_added)} crash reasons, "
+                 f"{len(self.persons_added)} persons"
+                 f"{'' if self.committed else ' (not committed)'}",
+                 f"Skipped {len(self.duplicates)} duplicates, {len(self.conflicts)} conflicts, "
+                 f"{len(self.invalid)} invalid rules"]
+        lines.extend(f"- conflict: {source} matches the same text as {rule_id}" for source, rule_id in self.conflicts)
+        lines.extend(f"- invalid: {source}: {error}" for source, error in self.invalid)
+        return "\n".join(lines)
+
+
+def semantic_key(match_type: int, match: str) -> Tuple[int, str]:
+    """
+    Key under which two rules match exactly the same text.
+
+    Keyword rules match case-insensitively, and regexes without
+    metacharacters are compared by the literal they match (written in one
+    canonical escaping, so a.c and a\\.c stay different).
+    """
+    if match_type == 0:
+        return 0, match.casefold()
+    literal = regex_literal(match)
+    return 1, re.escape(literal) if literal is not None else match
+
+
+def normalize_rule(rule: ImportedRule) -> ImportedRule:
+    """Coerce the match type and trim the pattern; raises ValueError for invalid rules"""
+    # JSON 中可能出现列表、对象或布尔值，这些不能用于查表（不可哈希或被当作 0/1）
+    valid_type = isinstance(rule.match_type, (int, str)) and not isinstance(rule.match_type, bool)
+    match_type = _MATCH_TYPES.get(rule.match_type) if valid_type else None
+    if match_type is None:
+        raise ValueError(f"unknown match_type {rule.match_type!r}")
+    if not isinstance(rule.crash_reason_id, str):
+        raise ValueError(f"crash_reason_id must be a string, not {rule.crash_reason_id!r}")
+    if rule.match is not None and not isinstance(rule.match, str):
+        raise ValueError(f"match must be a string, not {rule.match!r}")
+    match = (rule.match or "").strip()
+    if not match:
+        raise ValueError("empty match")
+    if match_type == 1:
+        try:
+            re.compile(match, re.DOTALL)
+        except re.error as e:
+            raise ValueError(f"invalid regex: {e}")
+    return ImportedRule(rule.crash_reason_id.strip(), match_type, match,
+                        [name.strip() for name in rule.contributors if name and name.strip()], rule.source)
+
+
+class RuleImporter:
+    """
+    Validates, deduplicates and commits a batch of detection rules.
+
+    Nothing is written unless the whole batch compiles together with the
+    existing rules; the writes then happen in a single database batch.
+    """
+
+    def __init__(self, database: CrashReasonDatabase, special_rules_file_path: str = "special_rules.json"):
+        self.database = database
+        self.special_rules_file_path = special_rules_file_path
+
+    def _person_id(self, name: str, report: ImportReport) -> int:
+        for person_data in self.database.persons.values():
+            if person_data["name"] == name:
+                return person_data["id"]
+        new_id = max((int(pid) for pid in self.database.persons), default=0) + 1
+        self.database.add_person(Person(id=new_id, name=name))
+        report.persons_added.append(name)
+        return new_id
+
+    def _check_compiles(self, reasons: List[CrashReason], rules: Dict[str, DetectionRule]) -> None:
+        # 在数据库的副本上编译完整的规则集，确认新规则不会破坏引擎
+        scratch = copy.copy(self.database)
+        scratch.crash_reasons = dict(self.database.crash_reasons)
+        scratch.crash_reasons.update({reason.id: reason.dict() for reason in reasons})
+        scratch.detection_rules = dict(self.database.detection_rules)
+        scratch.detection_rules.update({rule_id: rule.dict() for rule_id, rule in rules.items()})
+        scratch.detection_rule_models = dict(self.database.detection_rule_models)
+        scratch.detection_rule_models.update(rules)
+        scratch.rules_by_crash = CrashReasonDatabase.build_index(scratch.detection_rules, "crash_reason_id")
+        CompiledRuleSet(scratch, JsonHandle.read_json(self.special_rules_file_path))
+
+    def import_rules(self, rules: List[ImportedRule], reasons: Optional[List[CrashReason]] = None,
+                     promoters: Optional[Dict[str, List[str]]] = None, dry_run: bool = False) -> ImportReport:
+        """
+        Import a batch of rules.
+
+        Args:
+            rules: Rules to import
+            reasons: Crash reasons to create if they do not exist yet
+            promoters: Promoter names per crash reason ID
+            dry_run: Only validate and report
+
+        Returns:
+            What was (or would be) added and what was skipped
+        """
+        report = ImportReport()
+        new_reasons = []
+        for reason in reasons or []:
+            if reason.id not in self.database.crash_reasons and reason.id not in {r.id for r in new_reasons}:
+                new_reasons.append(reason)
+        known_reasons = set(self.database.crash_reasons) | {reason.id for reason in new_reasons}
+
+        # 已有规则按语义索引
+        by_key: Dict[Tuple[int, str], List[Tuple[str, str]]] = {}
+        for rule_id, rule_data in self.database.detection_rules.items():
+            key = semantic_key(rule_data["match_type"], rule_data["match"])
+            by_key.setdefault(key, []).append((rule_data["crash_reason_id"], rule_id))
+
+        accepted: Dict[str, DetectionRule] = {}
+        contributors: Dict[str, List[str]] = {}
+        for raw in rules:
+            try:
+                rule = normalize_rule(raw)
+                if rule.crash_reason_id not in known_reasons:
+                    raise ValueError(f"unknown crash reason {rule.crash_reason_id!r}")
+            except ValueError as e:
+                report.invalid.append((raw.source, str(e)))
+                continue
+
+            entries = by_key.setdefault(semantic_key(rule.match_type, rule.match), [])
+            same_reason = [rule_id for reason_id, rule_id in entries if reason_id == rule.crash_reason_id]
+            if same_reason:
+                report.duplicates.append((rule.source, same_reason[0]))
+                continue
+            if entries:
+                report.conflicts.append((rule.source, entries[0][1]))
+                continue
+
+            rule_id = stable_rule_id(rule.crash_reason_id, rule.match_type, rule.match)
+            accepted[rule_id] = DetectionRule(rule_id, rule.crash_reason_id, rule.match_type, rule.match)
+            contributors[rule_id] = rule.contributors
+            entries.append((rule.crash_reason_id, rule_id))
+
+        try:
+            self._check_compiles(new_reasons, accepted)
+        except Exception as e:
+            report.invalid.append(("<batch>", f"rule set failed to compile: {e}"))
+            return report
+
+        report.added = list(accepted)
+        report.reasons_added = [reason.id for reason in new_reasons]
+        if dry_run:
+            return report
+
+        with self.database.batch():
+            for reason in new_reasons:
+                self.database.add_crash_reason(reason)
+            for reason_id, names in (promoters or {}).items():
+                if reason_id in self.database.crash_reasons:
+                    for name in names:
+                        self.database.add_crash_promoter(reason_id, self._person_id(name, report))
+            for rule_id, rule in accepted.items():
+                self.database.add_detection_rule(rule)
+                for name in contributors[rule_id]:
+                    self.database.add_rule_contributor(rule_id, self._person_id(name, report))
+        report.committed = self.database.flush()
+        logger.info("导入了 %s 条规则，跳过 %s 条重复、%s 条冲突、%s 条无效规则",
+                    len(report.added), len(report.duplicates), len(report.conflicts), len(report.invalid))
+        return report
+
+
+def _as_list(data) -> List[dict]:
+    if isinstance(data, dict):
+        return [dict(item, id=item.get("id", key)) for key, item in data.items()]
+    return list(data or [])
+
+
+def _names(value) -> List[str]:
+    if not value:
+        return []
+    return [value] if isinstance(value, str) else [str(item) for item in value]
+
+
+def load_rules_file(file_path: str) -> Tuple[List[CrashReason], List[ImportedRule], Dict[str, List[str]]]:
+    """
+    Read a rule dump.
+
+    The file is either a list (or ID-keyed dict) of rules, or an object with
+    "crash_reasons" and "detection_rules". Rules use crash_reason_id (or
+    reason), match_type (0/1, "keyword"/"regex") and match (or pattern), plus
+    optional contributor names; reasons use id, name, description, priority
+    and optional promoter names.
+    """
+    data = JsonHandle.read_json(file_path)
+    if isinstance(data, dict) and ("detection_rules" in data or "crash_reasons" in data):
+        rule_items, reason_items = _as_list(data.get("detection_rules")), _as_list(data.get("crash_reasons"))
+    else:
+        rule_items, reason_items = _as_list(data), []
+
+    reasons, promoters = [], {}
+    for item in reason_items:
+        reasons.append(CrashReason(id=item["id"], name=item.get("name", item["id"]),
+                                   description=item.get("description", ""), priority=int(item.get("priority", 0))))
+        promoters[item["id"]] = _names(item.get("promoters"))
+
+    rules = []
+    for index, item in enumerate(rule_items):
+        rules.append(ImportedRule(
+            crash_reason_id=str(item.get("crash_reason_id", item.get("reason", ""))),
+            match_type=item.get("match_type", item.get("type")),
+            match=item.get("match", item.get("pattern", "")),
+            contributors=_names(item.get("contributors", item.get("contributor"))),
+            source=f"{os.path.basename(file_path)}#{item.get('id', index)}"))
+    return reasons, rules, promoters
+
+
+def load_legacy_folder(folder: str) -> Tuple[List[CrashReason], List[ImportedRule], Dict[str, List[str]]]:
+    """Read data saved by crash_database_old.py (promoter_id / contributor_id stored on the records)"""
+    persons = JsonHandle.read_json(os.path.join(folder, "persons.json"))
+    names = {str(pid): person["name"] for pid, person in persons.items()}
+
+    reasons, promoters = [], {}
+    for reason_id, item in JsonHandle.read_json(os.path.join(folder, "crash_reasons.json")).items():
+        reasons.append(CrashReason(id=item["id"], name=item["name"], description=item["description"],
+                                   priority=item["priority"]))
+        promoter = names.get(str(item.get("promoter_id")))
+        promoters[item["id"]] = [promoter] if promoter else []
+
+    rules = []
+    for rule_id, item in JsonHandle.read_json(os.path.join(folder, "detection_rules.json")).items():
+        contributor = names.get(str(item.get("contributor_id")))
+        rules.append(ImportedRule(item["crash_reason_id"], item["match_type"], item["match"],
+                                  [contributor] if contributor else [], f"legacy#{rule_id}"))
+    return reasons, rules, promoters
+
+
+if __name__ == "__main__":
+    import argparse
+    import config_reader
+    from CrashStorage import create_storage
+
+    parser = argparse.ArgumentParser(description="Bulk import detection rules into the crash database")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("file", nargs="?", help="JSON rule dump to import")
+    source.add_argument("--legacy", metavar="FOLDER", help="Migrate data saved by crash_database_old.py")
+    parser.add_argument("--contributor", help="Contributor name for rules that do not list one")
+    parser.add_argument("--dry-run", action="store_true", help="Only validate and report")
+    args = parser.parse_args()
+
+    cf = config_reader.Config()
+    folder = os.path.dirname(cf.crash_reason_database_path)
+    database = CrashReasonDatabase.in_folder(folder, create_storage(cf.database_backend, cf.sqlite_database_path))
+
+    reasons, rules, promoters = load_legacy_folder(args.legacy) if args.legacy else load_rules_file(args.file)
+    if args.contributor:
+        for rule in rules:
+            rule.contributors = rule.contributors or [args.contributor]
+
+    importer = RuleImporter(database, os.path.join(folder, "special_rules.json"))
+    print(importer.import_rules(rules, reasons, promoters, dry_run=args.dry_run).summary())
@@ -0,0 +1,159 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import JsonHandle
+from LiteralScanner import WORD_CHAR_SET
+from RuleEngine import required_literal
+
+
+@dataclass
+class Finding:
+    kind: str           # duplicate / subsumed / redundant_regex / overlap
+    rule_id: str        # 可以删除（或与其他原因重叠）的规则
+    covered_by: str     # 命中 rule_id 时必定也命中的规则
+    same_reason: bool   # 两条规则属于同一崩溃原因时 rule_id 可以安全删除
+
+    def describe(self, rules: Dict[str, dict]) -> str:
+        rule, other = rules[self.rule_id], rules[self.covered_by]
+        return (f"[{self.kind}] {self.rule_id} ({rule['crash_reason_id']}): {rule['match']!r}"
+                f" <- {self.covered_by} ({other['crash_reason_id']}): {other['match']!r}")
+
+
+def contains_literal(outer: str, inner: str, outer_has_boundaries: bool) -> bool:
+    """
+    Check that every text containing `outer` also matches the keyword `inner`.
+
+    Keywords match case-insensitively with flashtext-style word boundaries, so
+    `inner` must occur in `outer` at a position where its boundaries are
+    guaranteed: by the neighbouring characters of `outer`, or at the edges of
+    `outer` when `outer` is itself a keyword (and so has boundaries of its own).
+    """
+    outer_lower, inner_lower = outer.lower(), inner.lower()
+    if len(outer_lower) != len(outer) or len(inner_lower) != len(inner):
+        return False    # 大小写转换改变了长度，位置无法对应
+    start = outer_lower.find(inner_lower)
+    while start >= 0:
+        end = start + len(inner)
+        if start == 0:
+            left = outer_has_boundaries
+        else:
+            left = outer[start - 1] not in WORD_CHAR_SET
+        if end == len(outer):
+            right = outer_has_boundaries
+        else:
+            right = outer[end] not in WORD_CHAR_SET
+        if (left or inner[0] not in WORD_CHAR_SET) and (right or inner[-1] not in WORD_CHAR_SET):
+            return True
+        start = outer_lower.find(inner_lower, start + 1)
+    return False
+
+
+def analyze(detection_rules: Dict[str, dict]) -> List[Finding]:
+    """
+    Find rules that never add anything to the match result.
+
+    - duplicate: a keyword equal (ignoring case) to another keyword, or a regex equal to another regex
+    - subsumed: a keyword that contains another keyword, so the shorter one always matches too
+    - redundant_regex: a regex without capture groups whose required literal contains a keyword
+    - overlap: any of the above across two crash reasons; both reasons are reported, nothing is removed
+
+    Returns:
+        Findings in rule order
+    """
+    keywords = [(rule_id, rule) for rule_id, rule in detection_rules.items() if rule["match_type"] == 0]
+    regexes = [(rule_id, rule) for rule_id, rule in detection_rules.items() if rule["match_type"] == 1]
+    findings = []
+
+    def candidates(rule: dict) -> List[Tuple[str, dict]]:
+        # 优先使用同一崩溃原因的规则，这样找到的规则才可以删除
+        return sorted(representatives, key=lambda item: item[1]["crash_reason_id"] != rule["crash_reason_id"])
+
+    def add(kind: str, rule_id: str, covered_by: str):
+        same = detection_rules[rule_id]["crash_reason_id"] == detection_rules[covered_by]["crash_reason_id"]
+        findings.append(Finding(kind if same else "overlap", rule_id, covered_by, same))
+
+    # 完全相同的规则，保留每组中的第一条
+    representatives: List[Tuple[str, dict]] = []
+    first_keyword: Dict[Tuple[str, str], str] = {}
+    for rule_id, rule in keywords:
+        key = (rule["crash_reason_id"], rule["match"].lower())
+        if key in first_keyword:
+            add("duplicate", rule_id, first_keyword[key])
+        else:
+            first_keyword[key] = rule_id
+            representatives.append((rule_id, rule))
+    first_regex: Dict[Tuple[str, str], str] = {}
+    remaining_regexes = []
+    for rule_id, rule in regexes:
+        key = (rule["crash_reason_id"], rule["match"])
+        if key in first_regex:
+            add("duplicate", rule_id, first_regex[key])
+        else:
+            first_regex[key] = rule_id
+            remaining_regexes.append((rule_id, rule))
+
+    # 包含了另一条关键词的关键词；跨原因的完全相同关键词也在这里报告为重叠
+    for rule_id, rule in representatives:
+        for other_id, other in candidates(rule):
+            if other_id == rule_id:
+                continue
+            same_text = other["match"].lower() == rule["match"].lower()
+            if same_text and other_id > rule_id:
+                continue    # 跨原因的相同关键词只报告一次
+            if contains_literal(rule["match"], other["match"], True):
+                add("subsumed", rule_id, other_id)
+                break
+
+    # 正则必须包含的字面量中已经包含了某条关键词，且正则不提取任何信息
+    for rule_id, rule in remaining_regexes:
+        try:
+            if re.compile(rule["match"], re.DOTALL).groups:
+                continue
+        except re.error:
+            continue
+        literal = required_literal(rule["match"])
+        if not literal:
+            continue
+        for other_id, other in candidates(rule):
+            if contains_literal(literal, other["match"], False):
+                add("redundant_regex", rule_id, other_id)
+                break
+
+    order = {rule_id: index for index, rule_id in enumerate(detection_rules)}
+    return sorted(findings, key=lambda finding: order[finding.rule_id])
+
+
+def reduce_rules(detection_rules: Dict[str, dict], findings: Optional[List[Finding]] = None) -> Dict[str, dict]:
+    """Return the rules without those that are covered by another rule of the same crash reason"""
+    findings = analyze(detection_rules) if findings is None else findings
+    removed = {finding.rule_id for finding in findings if finding.same_reason}
+    return {rule_id: rule for rule_id, rule in detection_rules.items() if rule_id not in removed}
+
+
+def format_report(detection_rules: Dict[str, dict], findings: List[Finding]) -> str:
+    removable = [finding for finding in findings if finding.same_reason]
+    overlaps = [finding for finding in findings if not finding.same_reason]
+    lines = [f"--- Removable rules ({len(removable)} of {len(detection_rules)}) ---"]
+    lines.extend(finding.describe(detection_rules) for finding in removable)
+    lines.append("")
+    lines.append(f"--- Rules overlapping another crash reason ({len(overlaps)}) ---")
+    lines.extend(finding.describe(detection_rules) for finding in overlaps)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Find duplicate, subsumed and redundant detection rules")
+    parser.add_argument("--rules", default="detection_rules.json", help="Detection rules file to analyze")
+    parser.add_argument("--out", help="Write the reduced rule set to this file")
+    args = parser.parse_args()
+
+    rules = JsonHandle.read_json(args.rules)
+    result = analyze(rules)
+    print(format_report(rules, result))
+    if args.out:
+        reduced = reduce_rules(rules, result)
+        JsonHandle.write_json(args.out, reduced)
+        print(f"\nWrote {len(reduced)} rules to {args.out}")
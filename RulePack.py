@@ -0,0 +1,97 @@
+import hashlib
+import os
+import pickle
+import sys
+from typing import Iterable, Optional
+
+import JsonHandle
+from LogManager import get_logger
+
+logger = get_logger("pack")
+
+# 规则包格式版本，规则引擎的数据结构变化时递增
+PACK_FORMAT = 10
+_MAGIC = b"MCRPACK"
+
+
+def fingerprint(source_paths: Iterable[str], extra: str = "") -> str:
+    """
+    Hash the source files a rule pack is built from.
+
+    The pack format and the Python version are part of the hash, so a pack is
+    rebuilt after an engine or interpreter upgrade. Sources are identified by
+    their absolute path: the pickled rule set keeps the storage it was loaded
+    from, so a pack copied to another location must not be reused there.
+
+    Args:
+        source_paths: Files whose content the compiled rules depend on
+        extra: Additional build inputs, e.g. the auxiliary literals
+
+    Returns:
+        Hex digest identifying the sources
+    """
+    digest = hashlib.sha256(f"{PACK_FORMAT}:{sys.version_info[0]}.{sys.version_info[1]}:{extra}".encode("utf-8"))
+    for path in source_paths:
+        digest.update(b"\0" + os.path.abspath(path).encode("utf-8") + b"\0")
+        try:
+            with open(path, "rb") as file:
+                for chunk in iter(lambda: file.read(1 << 20), b""):
+                    digest.update(chunk)
+        except OSError:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+def write_pack(pack_path: str, payload: object, source_fingerprint: str) -> bool:
+    """
+    Serialize a compiled rule set to a pack file.
+
+    The header line carries the source fingerprint so staleness can be checked
+    without unpickling; the file is replaced atomically.
+    """
+    header = _MAGIC + f"{PACK_FORMAT}:{source_fingerprint}\n".encode("ascii")
+    try:
+        JsonHandle.write_atomic(pack_path, header + pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+        return True
+    except Exception as e:
+        logger.error("写入规则包时出错: %s", e)
+        return False
+
+
+def read_pack(pack_path: str, source_fingerprint: str) -> Optional[object]:
+    """
+    Load a pack file if it was built from the given sources.
+
+    Packs are trusted local build artifacts (they are unpickled), never load
+    one from an untrusted location.
+
+    Returns:
+        The stored payload, or None if the pack is missing, stale or unreadable
+    """
+    expected = _MAGIC + f"{PACK_FORMAT}:{source_fingerprint}\n".encode("ascii")
+    try:
+        with open(pack_path, "rb") as file:
+            if file.readline() != expected:
+                return None
+            return pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error("读取规则包时出错: %s", e)
+        return None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the precompiled rule pack used for fast startup")
+    parser.add_argument("--folder", default=None, help="Database folder; defaults to the configured one")
+    args = parser.parse_args()
+
+    import main
+
+    rule_sets = main.rule_sets_for(args.folder)
+    if rule_sets.build_pack():
+        print(f"Rule pack written to {rule_sets.pack_path}")
+    else:
+        sys.exit(1)
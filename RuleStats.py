@@ -0,0 +1,246 @@
+import atexit
+import math
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from LogManager import get_logger
+
+logger = get_logger("stats")
+
+DEFAULT_STATS_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "rule_stats.db")
+
+# 直方图每个二倍区间划分的桶数，p95 的误差约为 2^(1/4) 倍
+_BUCKETS_PER_OCTAVE = 4
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rule_stats (
+    rule_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    evaluations INTEGER NOT NULL DEFAULT 0,
+    hits INTEGER NOT NULL DEFAULT 0,
+    total_ns INTEGER NOT NULL DEFAULT 0,
+    bytes_scanned INTEGER NOT NULL DEFAULT 0,
+    histogram TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (rule_id, stage)
+)
+"""
+
+
+def _bucket(elapsed_ns: int) -> int:
+    return int(math.log2(max(elapsed_ns, 1)) * _BUCKETS_PER_OCTAVE)
+
+
+def _bucket_upper_ns(bucket: int) -> float:
+    return 2 ** ((bucket + 1) / _BUCKETS_PER_OCTAVE)
+
+
+def _encode_histogram(histogram: Dict[int, int]) -> str:
+    return ",".join(f"{bucket}:{count}" for bucket, count in sorted(histogram.items()))
+
+
+def _decode_histogram(text: str) -> Dict[int, int]:
+    histogram = {}
+    for item in text.split(",") if text else []:
+        bucket, count = item.split(":")
+        histogram[int(bucket)] = int(count)
+    return histogram
+
+
+@dataclass
+class RuleStat:
+    rule_id: str
+    stage: str
+    evaluations: int = 0
+    hits: int = 0
+    total_ns: int = 0
+    bytes_scanned: int = 0      # 以解码后日志的字符数计
+    histogram: Dict[int, int] = field(default_factory=dict)
+
+    def add(self, elapsed_ns: int, hit: bool, bytes_scanned: int) -> None:
+        self.evaluations += 1
+        self.hits += int(hit)
+        self.total_ns += elapsed_ns
+        self.bytes_scanned += bytes_scanned
+        bucket = _bucket(elapsed_ns)
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def merge(self, other: "RuleStat") -> None:
+        self.evaluations += other.evaluations
+        self.hits += other.hits
+        self.total_ns += other.total_ns
+        self.bytes_scanned += other.bytes_scanned
+        for bucket, count in other.histogram.items():
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + count
+
+    def percentile_ns(self, percentile: float) -> float:
+        """Estimate a latency percentile from the histogram"""
+        total = sum(self.histogram.values())
+        if not total:
+            return 0.0
+        threshold = total * percentile / 100
+        seen = 0
+        for bucket in sorted(self.histogram):
+            seen += self.histogram[bucket]
+            if seen >= threshold:
+                return _bucket_upper_ns(bucket)
+        return _bucket_upper_ns(max(self.histogram))
+
+    @property
+    def p95_ns(self) -> float:
+        return self.percentile_ns(95)
+
+
+class RuleStats:
+    """
+    Per-rule, per-stage evaluation counters.
+
+    Counters are collected in memory while analyses run and merged into an
+    SQLite table by flush(), so they accumulate across bot restarts. The
+    flusher thread started by start_flushing() does the writes in the
+    background, off the path that answers a request.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_STATS_PATH):
+        self.db_path = db_path
+        self._pending: Dict[Tuple[str, str], RuleStat] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def record(self, rule_id: str, stage: str, elapsed_ns: int, hit: bool, bytes_scanned: int = 0) -> None:
+        """Record one evaluation of a rule"""
+        with self._lock:
+            stat = self._pending.get((rule_id, stage))
+            if stat is None:
+                stat = self._pending[(rule_id, stage)] = RuleStat(rule_id, stage)
+            stat.add(elapsed_ns, hit, bytes_scanned)
+
+    def start_flushing(self, interval: float = 30.0) -> None:
+        """Flush the pending counters every interval seconds from a background thread, and once at exit"""
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._stop.clear()
+
+            def run():
+                while not self._stop.wait(interval):
+                    self.flush()
+
+            self._flusher = threading.Thread(target=run, name="rule-stats-flusher", daemon=True)
+            self._flusher.start()
+        atexit.register(self.stop_flushing)
+
+    def stop_flushing(self) -> None:
+        """Stop the flusher thread and write what is still pending"""
+        with self._lock:
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            self._stop.set()
+            flusher.join()
+            atexit.unregister(self.stop_flushing)
+        self.flush()
+
+    def flush(self) -> bool:
+        """Merge the pending counters into the stats database; on failure they stay pending for the next flush"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return True
+
+        try:
+            with sqlite3.connect(self.db_path, timeout=10) as conn:
+                conn.execute(_SCHEMA)
+                for (rule_id, stage), stat in pending.items():
+                    row = conn.execute("SELECT evaluations, hits, total_ns, bytes_scanned, histogram "
+                                       "FROM rule_stats WHERE rule_id = ? AND stage = ?", (rule_id, stage)).fetchone()
+                    # 合并到新对象，写入失败时 pending 中仍是未保存的增量
+                    merged = RuleStat(rule_id, stage, row[0], row[1], row[2], row[3], _decode_histogram(row[4])) \
+                        if row else RuleStat(rule_id, stage)
+                    merged.merge(stat)
+                    conn.execute("INSERT OR REPLACE INTO rule_stats "
+                                 "(rule_id, stage, evaluations, hits, total_ns, bytes_scanned, histogram) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (rule_id, stage, merged.evaluations, merged.hits, merged.total_ns,
+                                  merged.bytes_scanned, _encode_histogram(merged.histogram)))
+            return True
+        except sqlite3.Error as e:
+            logger.error("保存规则统计数据时出错: %s", e)
+            # 事务已回滚，把这批计数放回去（期间新记录的计数一并合并），下一次 flush 重试
+            with self._lock:
+                for key, stat in pending.items():
+                    newer = self._pending.get(key)
+                    if newer is not None:
+                        stat.merge(newer)
+                    self._pending[key] = stat
+            return False
+
+
+def load_stats(db_path: str = DEFAULT_STATS_PATH) -> List[RuleStat]:
+    """Read every persisted rule statistic"""
+    if not os.path.exists(db_path):
+        return []
+    try:
+        with sqlite3.connect(db_path, timeout=10) as conn:
+            conn.execute(_SCHEMA)
+            rows = conn.execute("SELECT rule_id, stage, evaluations, hits, total_ns, bytes_scanned, histogram "
+                                "FROM rule_stats").fetchall()
+    except sqlite3.Error as e:
+        logger.error("读取规则统计数据时出错: %s", e)
+        return []
+    return [RuleStat(row[0], row[1], row[2], row[3], row[4], row[5], _decode_histogram(row[6])) for row in rows]
+
+
+def slowest_rules(stats: List[RuleStat], limit: int = 20) -> List[RuleStat]:
+    """Rules sorted by total time spent, most expensive first"""
+    return sorted(stats, key=lambda stat: stat.total_ns, reverse=True)[:limit]
+
+
+def never_matched_rules(stats: List[RuleStat], rule_ids: Optional[List[str]] = None) -> List[str]:
+    """
+    Rules that never produced a hit.
+
+    Args:
+        stats: Persisted statistics
+        rule_ids: All known rule IDs; rules without any statistics are reported too
+
+    Returns:
+        Sorted list of rule IDs
+    """
+    hits: Dict[str, int] = {}
+    for stat in stats:
+        hits[stat.rule_id] = hits.get(stat.rule_id, 0) + stat.hits
+    for rule_id in rule_ids or []:
+        hits.setdefault(rule_id, 0)
+    return sorted(rule_id for rule_id, count in hits.items() if count == 0)
+
+
+def format_report(stats: List[RuleStat], rule_ids: Optional[List[str]] = None, limit: int = 20) -> str:
+    """Render the slowest and never-matching rules as plain text"""
+    lines = [f"--- Slowest rules (top {limit}) ---",
+             f"{'rule':<45} {'stage':<8} {'evals':>8} {'hits':>6} {'total ms':>10} {'p95 ms':>8} {'MB':>9}"]
+    for stat in slowest_rules(stats, limit):
+        lines.append(f"{stat.rule_id[:45]:<45} {stat.stage:<8} {stat.evaluations:>8} {stat.hits:>6} "
+                     f"{stat.total_ns / 1e6:>10.2f} {stat.p95_ns / 1e6:>8.3f} {stat.bytes_scanned / 1e6:>9.1f}")
+
+    never = never_matched_rules(stats, rule_ids)
+    lines.append("")
+    lines.append(f"--- Rules that never matched ({len(never)}) ---")
+    lines.extend(f"- {rule_id}" for rule_id in never)
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    import argparse
+    import JsonHandle
+
+    parser = argparse.ArgumentParser(description="Show per-rule hit and cost statistics")
+    parser.add_argument("--db", default=DEFAULT_STATS_PATH, help="Path to the rule stats database")
+    parser.add_argument("--rules", default="detection_rules.json", help="Detection rules file, used to list rules that were never evaluated")
+    parser.add_argument("--top", type=int, default=20, help="Number of slowest rules to show")
+    args = parser.parse_args()
+
+    known_rules = list(JsonHandle.read_json(args.rules).keys()) if os.path.exists(args.rules) else []
+    print(format_report(load_stats(args.db), known_rules, args.top))
@@ -0,0 +1,153 @@
+import re
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from LiteralScanner import literal_pattern
+from ResultRenderer import omitted_text
+from RuleEngine import MATCH_SCAN_LIMIT, regex_details, required_literal
+
+# 单条规则在样本上的耗时超过该值时给出警告（毫秒）
+RULE_TIME_BUDGET_MS = 20.0
+# 最多展示的命中数量，以及命中位置前后展示的字符数
+DISPLAY_LIMIT = 100
+CONTEXT_CHARS = 80
+
+
+@dataclass
+class TestMatch:
+    start: int                  # 在样本中的字符偏移
+    end: int
+    line: int                   # 所在行号，从 1 开始
+    context: str                # 命中所在行（过长时截取命中附近的部分）
+    context_start: int          # context 第一个字符在样本中的偏移
+    groups: List[Tuple[Optional[str], int, int]] = field(default_factory=list)  # [[n]] 的值及其位置
+
+
+@dataclass
+class RuleTestResult:
+    matches: List[TestMatch] = field(default_factory=list)
+    match_count: int = 0        # 找到的命中数，最多统计 MATCH_SCAN_LIMIT 个
+    details: List[str] = field(default_factory=list)    # 引擎报告的详情（已填充模板、去重并截断）
+    elapsed_ms: float = 0.0     # 引擎评估这条规则的耗时（多次运行的中位数）
+    prefilter: Optional[str] = None     # 正则规则的预筛选字面量
+    prefilter_hit: bool = True
+    warnings: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+def load_sample(path: str) -> str:
+    """
+    Read a log file, folder or zip the way the bot does.
+
+    Returns:
+        The combined log text the rules run on (empty if no usable log was found)
+    """
+    # 日志的收集与分类由机器人的分析器完成，用到时才导入，打开编辑器不会初始化机器人
+    import main
+    from BatchAnalyzer import bundle_folder
+
+    with bundle_folder(path) as folder:
+        analyzer = main.MinecraftCrashAnalyzer()
+        if analyzer.collect_logs(folder):
+            analyzer.prepare_logs()
+        return analyzer.log_all or ""
+
+
+def _context(text: str, start: int, end: int) -> Tuple[str, int]:
+    line_start = text.rfind("\n", 0, start) + 1
+    line_end = text.find("\n", end)
+    if line_end < 0:
+        line_end = len(text)
+    context_start = max(line_start, start - CONTEXT_CHARS)
+    context_end = min(line_end, end + CONTEXT_CHARS)
+    # 跨行的正则命中把换行显示为 ↵，保持字符位置不变
+    return text[context_start:context_end].replace("\n", "\u21b5"), context_start
+
+
+def _collect_matches(pattern: re.Pattern, text: str) -> Tuple[List[TestMatch], int]:
+    matches = []
+    count = 0
+    line, line_offset = 1, 0
+    for match in pattern.finditer(text):
+        count += 1
+        if count > MATCH_SCAN_LIMIT:
+            count -= 1
+            break
+        if len(matches) >= DISPLAY_LIMIT:
+            continue
+        # 命中按顺序出现，行号只需统计与上一个命中之间的换行
+        line += text.count("\n", line_offset, match.start())
+        line_offset = match.start()
+        context, context_start = _context(text, match.start(), match.end())
+        groups = [(match.group(index), *match.span(index)) for index in range(1, (pattern.groups or 0) + 1)]
+        matches.append(TestMatch(match.start(), match.end(), line, context, context_start, groups))
+    return matches, count
+
+
+def _median_ms(run, repeat: int) -> float:
+    samples = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter_ns()
+        run()
+        samples.append((time.perf_counter_ns() - started) / 1e6)
+    return statistics.median(samples)
+
+
+def test_rule(match_type: int, match: str, text: str, template: str = "",
+              budget_ms: float = RULE_TIME_BUDGET_MS, repeat: int = 3) -> RuleTestResult:
+    """
+    Evaluate one detection rule on a sample the way the engine does.
+
+    Args:
+        match_type: 0 for an exact (keyword) rule, 1 for a regex rule
+        match: Keyword or regex
+        text: Sample log text, see load_sample
+        template: Description of the crash reason; its [[n]] placeholders are filled from regex groups
+        budget_ms: Time above which a warning is reported
+        repeat: Number of timed runs
+
+    Returns:
+        The matches, the reported details, the time and any warnings
+    """
+    result = RuleTestResult()
+    if not match:
+        result.error = "The rule has no match pattern"
+        return result
+
+    if match_type == 0:
+        # 与引擎一致：不区分大小写，且需要单词边界
+        pattern = literal_pattern(match, ignore_case=True, word_boundary=True)
+        result.elapsed_ms = _median_ms(lambda: pattern.search(text), repeat)
+        result.matches, result.match_count = _collect_matches(pattern, text)
+        result.details = [template] if result.match_count else []
+    else:
+        try:
+            pattern = re.compile(match, re.DOTALL)
+        except re.error as e:
+            result.error = f"Invalid regex: {e}"
+            return result
+        result.prefilter = required_literal(match)
+        result.prefilter_hit = result.prefilter is None or result.prefilter in text
+        result.matches, result.match_count = _collect_matches(pattern, text)
+        result.elapsed_ms = _median_ms(lambda: regex_details(pattern, template, text), repeat)
+        kept, omitted, truncated = regex_details(pattern, template, text)
+        result.details = [detail for _, detail, _ in kept]
+        if omitted:
+            result.details.append(omitted_text(omitted, truncated))
+
+        if result.prefilter is None:
+            result.warnings.append("No literal of 3+ characters is required by this regex, "
+                                   "so it runs on every log instead of only after a prefilter hit")
+        placeholders = template.count("[[")
+        if result.match_count and not result.details and pattern.groups != placeholders:
+            result.warnings.append(f"The regex has {pattern.groups} groups but the description has "
+                                   f"{placeholders} placeholders; the engine ignores such matches")
+
+    if result.elapsed_ms > budget_ms:
+        result.warnings.append(f"Took {result.elapsed_ms:.1f} ms on this sample, "
+                               f"over the budget of {budget_ms:g} ms")
+    if result.match_count >= MATCH_SCAN_LIMIT:
+        result.warnings.append(f"Matched at least {MATCH_SCAN_LIMIT} times; the pattern is probably too broad")
+    return result
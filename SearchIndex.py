@@ -0,0 +1,181 @@
+import weakref
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from CrashDatabase import CrashReasonDatabase
+from SlotsDataclass import frozen_dataclass
+
+# 索引的最长 n-gram；更短的查询直接使用同样长度的 gram
+NGRAM = 3
+
+# 文档类型 -> 数据库中的模型表
+KINDS = {
+    "reason": "crash_reason_models",
+    "rule": "detection_rule_models",
+    "person": "person_models",
+}
+
+DocKey = Tuple[str, str]    # (文档类型, 键)
+
+
+@frozen_dataclass
+class SearchResult:
+    kind: str       # reason / rule / person
+    key: str        # 崩溃原因ID、规则ID或人员ID
+    title: str      # 名称（规则为匹配内容）
+    detail: str     # 补充信息：原因描述、规则所属原因、人员ID
+
+
+def _grams(text: str, size: int) -> Set[str]:
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _document(kind: str, model) -> Tuple[str, str, str]:
+    """(title, detail, searchable text) of a model"""
+    if kind == "reason":
+        return model.name, model.description, "\n".join((model.id, model.name, model.description))
+    if kind == "rule":
+        return model.match, model.crash_reason_id, "\n".join((model.id, model.match, model.crash_reason_id))
+    return model.name, str(model.id), "\n".join((str(model.id), model.name))
+
+
+class SearchIndex:
+    """
+    N-gram index over crash reasons, detection rules and people.
+
+    Every document is indexed by all of its 1..NGRAM-grams (lower-cased), so a
+    query is answered by intersecting posting sets and verifying the few
+    candidates. sync() follows a database by comparing its published models by
+    identity, so only records that were added, replaced or removed since the
+    last sync are re-indexed.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[DocKey]] = {}
+        self._texts: Dict[DocKey, str] = {}
+        self._documents: Dict[DocKey, Tuple[str, str]] = {}
+        self._models: Dict[DocKey, object] = {}
+        self._tables: Dict[str, dict] = {}     # 文档类型 -> 上次同步的模型表
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, kind: str, key: str, title: str, detail: str, text: str) -> None:
+        """Index a document, replacing an older version with the same key"""
+        doc = (kind, key)
+        if doc in self._texts:
+            self.remove(kind, key)
+        text = text.lower()
+        self._texts[doc] = text
+        self._documents[doc] = (title, detail)
+        for size in range(1, NGRAM + 1):
+            for gram in _grams(text, size):
+                self._postings.setdefault(gram, set()).add(doc)
+
+    def remove(self, kind: str, key: str) -> None:
+        doc = (kind, key)
+        text = self._texts.pop(doc, None)
+        if text is None:
+            return
+        del self._documents[doc]
+        self._models.pop(doc, None)
+        for size in range(1, NGRAM + 1):
+            for gram in _grams(text, size):
+                postings = self._postings.get(gram)
+                if postings is not None:
+                    postings.discard(doc)
+                    if not postings:
+                        del self._postings[gram]
+
+    def sync(self, database: CrashReasonDatabase) -> int:
+        """
+        Bring the index up to date with the latest published version of a database.
+
+        Returns:
+            Number of documents that were added, updated or removed
+        """
+        snapshot = database.snapshot() or database
+        changed = 0
+        for kind, table in KINDS.items():
+            models = getattr(snapshot, table)
+            if self._tables.get(kind) is models:
+                continue
+            # 模型是不可变对象，修改时整体替换，按身份比较即可找出变化的记录
+            for key, model in models.items():
+                doc = (kind, str(key))
+                if self._models.get(doc) is not model:
+                    title, detail, text = _document(kind, model)
+                    self.add(kind, str(key), title, detail, text)
+                    self._models[doc] = model
+                    changed += 1
+            removed = [doc for doc in self._models if doc[0] == kind and doc[1] not in models]
+            for _, key in removed:
+                self.remove(kind, key)
+            changed += len(removed)
+            self._tables[kind] = models
+        return changed
+
+    def _candidates(self, term: str) -> Set[DocKey]:
+        size = min(len(term), NGRAM)
+        postings = [self._postings.get(gram) for gram in _grams(term, size)]
+        if not postings or any(p is None for p in postings):
+            return set()
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for other in postings[1:]:
+            candidates &= other
+            if not candidates:
+                break
+        if len(term) > NGRAM:
+            # 所有 gram 都出现并不代表整个词出现，需要再确认
+            candidates = {doc for doc in candidates if term in self._texts[doc]}
+        return candidates
+
+    def search(self, query: str, kinds: Optional[Iterable[str]] = None, limit: int = 50) -> List[SearchResult]:
+        """
+        Find documents containing every whitespace-separated term of the query.
+
+        Results whose key equals the query come first, then those whose title
+        starts with or contains it, then the rest.
+        """
+        terms = query.lower().split()
+        if not terms:
+            return []
+        candidates = self._candidates(terms[0])
+        for term in terms[1:]:
+            if not candidates:
+                break
+            candidates &= self._candidates(term)
+        if kinds is not None:
+            kinds = set(kinds)
+            candidates = {doc for doc in candidates if doc[0] in kinds}
+
+        phrase = " ".join(terms)
+
+        def rank(doc: DocKey):
+            title = self._documents[doc][0].lower()
+            if doc[1].lower() == phrase:
+                score = 0
+            elif title.startswith(phrase):
+                score = 1
+            elif phrase in title:
+                score = 2
+            else:
+                score = 3
+            return score, list(KINDS).index(doc[0]), doc[1]
+
+        return [SearchResult(doc[0], doc[1], *self._documents[doc]) for doc in sorted(candidates, key=rank)[:limit]]
+
+
+# 每个数据库对象一个索引，数据库被释放时索引随之释放
+_INDEXES: "weakref.WeakKeyDictionary[CrashReasonDatabase, SearchIndex]" = weakref.WeakKeyDictionary()
+
+
+def index_for(database: CrashReasonDatabase) -> SearchIndex:
+    """Return the search index of a database, synced to its latest version"""
+    index = _INDEXES.get(database)
+    if index is None:
+        index = _INDEXES[database] = SearchIndex()
+    index.sync(database)
+    return index
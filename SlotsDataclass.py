@@ -0,0 +1,39 @@
+from dataclasses import FrozenInstanceError, dataclass, fields
+
+
+def _frozen_setattr(self, name: str, value) -> None:
+    raise FrozenInstanceError(f"cannot assign to field {name!r}")
+
+
+def _frozen_delattr(self, name: str) -> None:
+    raise FrozenInstanceError(f"cannot delete field {name!r}")
+
+
+def _getstate(self) -> list:
+    return [getattr(self, field.name) for field in fields(self)]
+
+
+def _setstate(self, state: list) -> None:
+    # 实例是冻结的，恢复时绕过 __setattr__
+    for field, value in zip(fields(self), state):
+        object.__setattr__(self, field.name, value)
+
+
+def frozen_dataclass(cls):
+    """
+    Same as @dataclass(frozen=True, slots=True), which needs Python 3.10.
+
+    The dataclass is rebuilt with __slots__ holding its fields, so instances
+    carry no __dict__. Pickling and copying go through __getstate__ and
+    __setstate__ because the frozen __setattr__ rejects the default slot
+    restore; the state layout matches the one of slots=True.
+    """
+    cls = dataclass(frozen=True)(cls)
+    names = tuple(field.name for field in fields(cls))
+    # 字段默认值已经写入生成的 __init__，类属性必须去掉才能定义同名的 slot
+    namespace = {key: value for key, value in cls.__dict__.items()
+                 if key not in names and key not in ("__dict__", "__weakref__")}
+    # 生成的 __setattr__ 通过 super(原来的类, self) 调用，对重建后的类无效，这里替换掉
+    namespace.update(__slots__=names, __setattr__=_frozen_setattr, __delattr__=_frozen_delattr,
+                     __getstate__=_getstate, __setstate__=_setstate)
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
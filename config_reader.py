@@ -18,6 +18,20 @@ cache_file_path: "cache"
 # Crash reason database file path
 crash_reason_database_path: "crash_reasons.json"
 
+# Crash database backend: "json" (one file per table) or "sqlite"
+database_backend: "json"
+
+# SQLite database file, used when database_backend is "sqlite"
+sqlite_database_path: "crash_database.db"
+
+# Log level (DEBUG, INFO, WARNING, ERROR) and optional log file
+log_level: "INFO"
+log_file: ""
+
+# Prometheus metrics endpoint (http://metrics_host:metrics_port/metrics); set metrics_port to 0 to disable
+metrics_host: "127.0.0.1"
+metrics_port: 9464
+
 # QQ number
 QQ_number: 3630124032
 
@@ -46,6 +60,12 @@ group_whitelist:
         self.ws_uri = config.get('ws_uri')
         self.crash_reason_database_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),config.get('crash_reason_database_path'))
         self.group_whitelist = config.get('group_whitelist')
+        self.database_backend = config.get('database_backend', 'json')
+        self.sqlite_database_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),config.get('sqlite_database_path', 'crash_database.db'))
+        self.log_level = config.get('log_level', 'INFO')
+        self.log_file = config.get('log_file') or None
+        self.metrics_host = config.get('metrics_host', '127.0.0.1')
+        self.metrics_port = int(config.get('metrics_port', 0) or 0)
 
 
 # Example usage
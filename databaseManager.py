@@ -1,6 +1,99 @@
+import queue
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog
-from CrashDatabase import CrashReasonDatabase, CrashReason, DetectionRule, Person
+from tkinter import ttk, messagebox, simpledialog, filedialog
+from typing import Callable, Dict, List, Optional, Sequence
+from CrashDatabase import CrashReasonDatabase, CrashReason, DetectionRule, Person, stable_rule_id
+from CrashStorage import TABLES, create_storage
+import RuleStats
+import RuleTester
+import SearchIndex
+import config_reader
+
+
+class LazyTreeview:
+    """
+    Shows an ordered list of keys in a Treeview, inserting rows one page at a time.
+
+    Only the first `loaded` keys have rows (with the key as iid); the next page is
+    inserted when the view is scrolled near the end. Rows are built by row_values,
+    so single rows can be inserted, updated or removed without a full reload.
+    """
+
+    def __init__(self, tree: ttk.Treeview, scrollbar: ttk.Scrollbar,
+                 row_values: Callable[[str], Sequence], page_size: int = 200):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_values = row_values
+        self.page_size = page_size
+        self.keys: List[str] = []
+        self.loaded = 0
+        self._pending = False
+        self.tree.configure(yscrollcommand=self._on_scroll)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # 滚动到末尾附近（或者当前页填不满窗口）时加载下一页
+        if float(last) > 0.9 and self.loaded < len(self.keys) and not self._pending:
+            self._pending = True
+            self.tree.after_idle(self.load_more)
+
+    def load_more(self):
+        self._pending = False
+        end = min(self.loaded + self.page_size, len(self.keys))
+        for key in self.keys[self.loaded:end]:
+            self.tree.insert("", tk.END, iid=key, values=self.row_values(key))
+        self.loaded = end
+
+    def set_keys(self, keys: List[str]):
+        """Replace every row, loading only the first page"""
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self.keys = list(keys)
+        self.loaded = 0
+        self.load_more()
+
+    def insert(self, key: str, index: int):
+        """Add a key at a position of the ordered list"""
+        self.keys.insert(index, key)
+        # 位置在已加载的范围内才需要插入行，否则滚动到那里时再加载
+        if index < self.loaded or self.loaded == len(self.keys) - 1:
+            self.tree.insert("", index, iid=key, values=self.row_values(key))
+            self.loaded += 1
+
+    def remove(self, key: str):
+        if key not in self.keys:
+            return
+        index = self.keys.index(key)
+        del self.keys[index]
+        if index < self.loaded:
+            self.tree.delete(key)
+            self.loaded -= 1
+
+    def reveal(self, key: str) -> bool:
+        """Load pages until the row of a key exists, then select it and scroll to it"""
+        if key not in self.keys:
+            return False
+        index = self.keys.index(key)
+        while self.loaded <= index:
+            self.load_more()
+        self.tree.selection_set(key)
+        self.tree.see(key)
+        return True
+
+    def update(self, key: str):
+        """Rebuild the row of a key if it is loaded"""
+        if self.tree.exists(key):
+            self.tree.item(key, values=self.row_values(key))
+
+    def place(self, key: str, index: int):
+        """Move a key to a new position (or add it) and rebuild its row"""
+        if key in self.keys and self.keys.index(key) == index:
+            self.update(key)
+            return
+        self.remove(key)
+        self.insert(key, index)
 
 
 class CrashDatabaseManager:
@@ -9,14 +102,22 @@ class CrashDatabaseManager:
         self.root.title("Crash Database Manager")
         self.root.geometry("900x600")
 
-        # Initialize database with default file paths
-        self.database = CrashReasonDatabase()
+        # Initialize database with the backend selected in config.yaml
+        cf = config_reader.Config()
+        self.database = CrashReasonDatabase(storage=create_storage(cf.database_backend, cf.sqlite_database_path))
+        # 保存交给后台线程，点击 OK 后界面不等待磁盘写入
+        self.writer = self.database.start_background_writer()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # 崩溃原因ID / 规则ID -> 发现者、贡献者名称，编辑时只清除受影响的项
+        self.promoter_names: Dict[str, str] = {}
+        self.contributor_names: Dict[str, str] = {}
 
         # Set up the main UI
         self._setup_ui()
 
         # Load initial data
         self.refresh_crash_reasons()
+        self.update_save_status()
 
     def _setup_ui(self):
         """Set up the main UI components"""
@@ -37,11 +138,27 @@ class CrashDatabaseManager:
         self.notebook.add(self.detection_rules_frame, text="Detection Rules")
         self._setup_detection_rules_tab()
 
-        # Status bar
+        # Create search tab
+        self.search_results: List[SearchIndex.SearchResult] = []
+        self.search_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.search_frame, text="Search")
+        self._setup_search_tab()
+
+        # Create rule statistics tab
+        self.rule_stats_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.rule_stats_frame, text="Rule Stats")
+        self._setup_rule_stats_tab()
+
+        # Status bar, with the state of the background saves on the right
+        status_frame = ttk.Frame(self.root, relief=tk.SUNKEN)
+        status_frame.grid(row=1, column=0, sticky="ew")
         self.status_var = tk.StringVar()
-        self.status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        self.status_bar.grid(row=1, column=0, sticky="ew")
+        self.status_bar = ttk.Label(status_frame, textvariable=self.status_var, anchor=tk.W)
+        self.status_bar.pack(side=tk.LEFT, fill=tk.X, expand=True)
         self.status_var.set("Ready")
+        self.save_status_var = tk.StringVar()
+        self.save_status_label = ttk.Label(status_frame, textvariable=self.save_status_var, anchor=tk.E)
+        self.save_status_label.pack(side=tk.RIGHT, padx=5)
 
     def _setup_crash_reasons_tab(self):
         """Set up the crash reasons tab"""
@@ -68,10 +185,10 @@ class CrashDatabaseManager:
         # double click to edit
         self.crash_reasons_tree.bind("<Double-1>", lambda e: self.edit_crash_reason())
 
-        # Add scrollbar to treeview
+        # Add scrollbar to treeview; rows are loaded page by page while scrolling
         scrollbar = ttk.Scrollbar(self.crash_reasons_frame, orient=tk.VERTICAL, command=self.crash_reasons_tree.yview)
-        self.crash_reasons_tree.configure(yscroll=scrollbar.set)
         scrollbar.grid(row=0, column=1, sticky="ns")
+        self.crash_reasons_view = LazyTreeview(self.crash_reasons_tree, scrollbar, self._crash_reason_row)
 
         # Button frame
         button_frame = ttk.Frame(self.crash_reasons_frame)
@@ -114,10 +231,10 @@ class CrashDatabaseManager:
         # double click to edit
         self.rules_tree.bind("<Double-1>", lambda e: self.edit_detection_rule())
 
-        # Add scrollbar to treeview
+        # Add scrollbar to treeview; rows are loaded page by page while scrolling
         scrollbar = ttk.Scrollbar(self.detection_rules_frame, orient=tk.VERTICAL, command=self.rules_tree.yview)
-        self.rules_tree.configure(yscroll=scrollbar.set)
         scrollbar.grid(row=1, column=1, sticky="ns")
+        self.rules_view = LazyTreeview(self.rules_tree, scrollbar, self._detection_rule_row)
 
         # Button frame
         button_frame = ttk.Frame(self.detection_rules_frame)
@@ -129,39 +246,208 @@ class CrashDatabaseManager:
         ttk.Button(button_frame, text="Delete Rule", command=self.delete_detection_rule).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Refresh", command=self.load_detection_rules).pack(side=tk.LEFT, padx=5)
 
-    def refresh_crash_reasons(self):
-        """Refresh the crash reasons list"""
-        # Clear existing items
-        for item in self.crash_reasons_tree.get_children():
-            self.crash_reasons_tree.delete(item)
-
-        # Get all crash reasons from the crash_reasons dictionary
-        crash_reasons = []
-        for reason_id, reason_data in self.database.crash_reasons.items():
-            crash_reason = CrashReason(
-                id=reason_data["id"],
-                name=reason_data["name"],
-                description=reason_data["description"],
-                priority=reason_data["priority"]
-            )
-            crash_reasons.append(crash_reason)
+    def _setup_search_tab(self):
+        """Set up the search tab over reasons, rules and people"""
+        self.search_frame.columnconfigure(0, weight=1)
+        self.search_frame.rowconfigure(1, weight=1)
+
+        search_bar = ttk.Frame(self.search_frame)
+        search_bar.grid(row=0, column=0, columnspan=2, sticky="ew", pady=5)
+        ttk.Label(search_bar, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_bar, textvariable=self.search_var, width=50)
+        search_entry.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        # 每次输入都查询索引，结果即时更新
+        self.search_var.trace_add("write", lambda *args: self.search())
+
+        columns = ("Kind", "ID", "Title", "Detail")
+        self.search_tree = ttk.Treeview(self.search_frame, columns=columns)
+        self.search_tree.heading("#0", text="")
+        self.search_tree.column("#0", width=0, stretch=tk.NO)
+        for column, width in zip(columns, (60, 180, 300, 300)):
+            self.search_tree.heading(column, text=column)
+            self.search_tree.column(column, width=width)
+        self.search_tree.grid(row=1, column=0, sticky="nsew")
+
+        # double click to open the result in its tab
+        self.search_tree.bind("<Double-1>", lambda e: self.open_search_result())
+
+        scrollbar = ttk.Scrollbar(self.search_frame, orient=tk.VERTICAL, command=self.search_tree.yview)
+        self.search_tree.configure(yscroll=scrollbar.set)
+        scrollbar.grid(row=1, column=1, sticky="ns")
+
+    def search(self):
+        """Show the reasons, rules and people matching the search box"""
+        children = self.search_tree.get_children()
+        if children:
+            self.search_tree.delete(*children)
+        query = self.search_var.get()
+        if not query.strip():
+            return
+        results = SearchIndex.index_for(self.database).search(query, limit=200)
+        for number, result in enumerate(results):
+            # iid 使用序号，不同类型的键可能相同
+            self.search_tree.insert("", tk.END, iid=str(number),
+                                    values=(result.kind, result.key, result.title, result.detail.replace("\n", " ")))
+        self.search_results = results
+        self.status_var.set(f"{len(results)} results for '{query.strip()}'")
+
+    def open_search_result(self):
+        """Select a reason or rule from the search results in its own tab"""
+        selection = self.search_tree.selection()
+        if not selection:
+            return
+        result = self.search_results[int(selection[0])]
+        if result.kind == "reason":
+            self.notebook.select(self.crash_reasons_frame)
+            self.crash_reasons_view.reveal(result.key)
+        elif result.kind == "rule":
+            rule = self.database.detection_rule_models.get(result.key)
+            if rule is None:
+                return
+            self.notebook.select(self.detection_rules_frame)
+            self.crash_reason_var.set(rule.crash_reason_id)
+            self.load_detection_rules()
+            self.rules_view.reveal(result.key)
+
+    def _setup_rule_stats_tab(self):
+        """Set up the rule statistics tab"""
+        self.rule_stats_frame.columnconfigure(0, weight=1)
+        self.rule_stats_frame.rowconfigure(0, weight=1)
+
+        # Create treeview for rule statistics
+        columns = ("Rule", "Stage", "Evaluations", "Hits", "Total ms", "P95 ms", "MB Scanned")
+        self.rule_stats_tree = ttk.Treeview(self.rule_stats_frame, columns=columns)
+        self.rule_stats_tree.heading("#0", text="")
+        self.rule_stats_tree.column("#0", width=0, stretch=tk.NO)
+        for column in columns:
+            self.rule_stats_tree.heading(column, text=column)
+            self.rule_stats_tree.column(column, width=300 if column == "Rule" else 80)
+        self.rule_stats_tree.grid(row=0, column=0, sticky="nsew")
 
-        # Sort by priority
-        crash_reasons.sort(key=lambda x: x.priority, reverse=True)
+        # Add scrollbar to treeview
+        scrollbar = ttk.Scrollbar(self.rule_stats_frame, orient=tk.VERTICAL, command=self.rule_stats_tree.yview)
+        self.rule_stats_tree.configure(yscroll=scrollbar.set)
+        scrollbar.grid(row=0, column=1, sticky="ns")
+
+        # Button frame
+        button_frame = ttk.Frame(self.rule_stats_frame)
+        button_frame.grid(row=1, column=0, columnspan=2, sticky="ew", pady=5)
 
-        # Add crash reasons to treeview
-        for reason in crash_reasons:
-            # Get promoter names
-            promoters = self.database.get_promoters_for_crash(reason.id)
-            promoter_names = ", ".join([p.name for p in promoters]) if promoters else "None"
+        ttk.Button(button_frame, text="Slowest", command=self.load_slowest_rules).pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Never Matched", command=self.load_never_matched_rules).pack(side=tk.LEFT, padx=5)
 
-            self.crash_reasons_tree.insert("", tk.END,
-                                           values=(reason.id, reason.name, reason.description,
-                                                   reason.priority, promoter_names))
+    def update_save_status(self):
+        """Show pending and failed background saves; polled from the main loop"""
+        pending, writing, failed = self.writer.status()
+        if failed:
+            self.save_status_var.set(f"Save failed: {', '.join(sorted(failed))} (retrying)")
+            self.save_status_label.configure(foreground="red")
+        else:
+            self.save_status_var.set(f"Saving {pending} table(s)..." if pending or writing else "All changes saved")
+            self.save_status_label.configure(foreground="")
+        self.root.after(250, self.update_save_status)
+
+    def on_close(self):
+        """Write the pending changes before closing the window"""
+        self.save_status_var.set("Saving...")
+        self.root.update_idletasks()
+        if not self.database.stop_background_writer(timeout=30):
+            _, _, failed = self.writer.status()
+            details = "\n".join(f"{table}: {error}" for table, error in sorted(failed.items())) or "Timed out"
+            if not messagebox.askyesno("Unsaved changes",
+                                       f"Some changes could not be saved:\n{details}\n\nClose anyway?"):
+                # 继续编辑：重新启用后台写入，并重新提交所有表（无法确定超时时哪些表未写入）
+                self.writer = self.database.start_background_writer()
+                snapshot = self.database.snapshot()
+                self.writer.submit({table: getattr(snapshot, table) for table in TABLES})
+                return
+        self.root.destroy()
+
+    def load_slowest_rules(self):
+        """Show the rules that cost the most time"""
+        for item in self.rule_stats_tree.get_children():
+            self.rule_stats_tree.delete(item)
+
+        stats = RuleStats.slowest_rules(RuleStats.load_stats(), limit=100)
+        for stat in stats:
+            self.rule_stats_tree.insert("", tk.END, values=(
+                stat.rule_id, stat.stage, stat.evaluations, stat.hits, f"{stat.total_ns / 1e6:.2f}",
+                f"{stat.p95_ns / 1e6:.3f}", f"{stat.bytes_scanned / 1e6:.1f}"))
+        self.status_var.set(f"Loaded statistics for {len(stats)} rules")
+
+    def load_never_matched_rules(self):
+        """Show the rules that never produced a hit"""
+        for item in self.rule_stats_tree.get_children():
+            self.rule_stats_tree.delete(item)
+
+        stats = RuleStats.load_stats()
+        by_rule = {}
+        for stat in stats:
+            by_rule.setdefault(stat.rule_id, []).append(stat)
+        never = RuleStats.never_matched_rules(stats, list(self.database.detection_rules.keys()))
+        for rule_id in never:
+            rule_stats = by_rule.get(rule_id, [])
+            evaluations = sum(stat.evaluations for stat in rule_stats)
+            total_ns = sum(stat.total_ns for stat in rule_stats)
+            stage = ", ".join(stat.stage for stat in rule_stats) or "-"
+            self.rule_stats_tree.insert("", tk.END, values=(rule_id, stage, evaluations, 0,
+                                                            f"{total_ns / 1e6:.2f}", "", ""))
+        self.status_var.set(f"{len(never)} rules never matched")
+
+    def _promoter_names(self, crash_id: str) -> str:
+        names = self.promoter_names.get(crash_id)
+        if names is None:
+            promoters = self.database.get_promoters_for_crash(crash_id)
+            names = self.promoter_names[crash_id] = ", ".join(p.name for p in promoters) if promoters else "None"
+        return names
+
+    def _contributor_names(self, rule_id: str) -> str:
+        names = self.contributor_names.get(rule_id)
+        if names is None:
+            contributors = self.database.get_contributors_for_rule(rule_id)
+            names = self.contributor_names[rule_id] = ", ".join(c.name for c in contributors) if contributors else "None"
+        return names
+
+    def _crash_reason_row(self, crash_id: str):
+        reason = self.database.get_crash_reason(crash_id)
+        return reason.id, reason.name, reason.description, reason.priority, self._promoter_names(crash_id)
+
+    def _detection_rule_row(self, rule_id: str):
+        rule = self.database.detection_rule_models[rule_id]
+        match_type = "Exact" if rule.match_type == 0 else "Regex"
+        return match_type, rule.match, self._contributor_names(rule_id)
+
+    def _crash_reason_order(self) -> List[str]:
+        # Sort by priority (stable, so equal priorities keep the database order)
+        reasons = sorted(self.database.crash_reason_models.values(), key=lambda x: x.priority, reverse=True)
+        return [reason.id for reason in reasons]
+
+    def refresh_crash_reasons(self):
+        """Reload the crash reasons list from the database"""
+        self.promoter_names.clear()
+        order = self._crash_reason_order()
+        self.crash_reasons_view.set_keys(order)
 
         # Update the combobox in detection rules tab
         self.crash_reason_combo['values'] = list(self.database.crash_reasons.keys())
-        self.status_var.set(f"Loaded {len(crash_reasons)} crash reasons")
+        self.status_var.set(f"Loaded {len(order)} crash reasons")
+
+    def _crash_reason_changed(self, crash_id: str, old_id: str = None):
+        """Update only the rows affected by editing one crash reason"""
+        self.promoter_names.pop(crash_id, None)
+        if old_id is not None and old_id != crash_id:
+            self.promoter_names.pop(old_id, None)
+            self.crash_reasons_view.remove(old_id)
+        if crash_id in self.database.crash_reason_models:
+            self.crash_reasons_view.place(crash_id, self._crash_reason_order().index(crash_id))
+        else:
+            self.crash_reasons_view.remove(crash_id)
+        if old_id != crash_id:
+            self.crash_reason_combo['values'] = list(self.database.crash_reasons.keys())
+            # 原因被删除或改名时，其规则列表也随之变化
+            if self.crash_reason_var.get() in (crash_id, old_id):
+                self.load_detection_rules()
 
     def add_crash_reason(self):
         """Add a new crash reason"""
@@ -177,15 +463,17 @@ class CrashDatabaseManager:
                 description=description,
                 priority=priority
             )
-            if self.database.add_crash_reason(crash_reason):
-                # Add promoters using their IDs directly from the selected persons
-                for pid, _ in dialog.selected_promoters:
-                    self.database.add_crash_promoter(id_val, pid)
-
-                self.refresh_crash_reasons()
-                self.status_var.set(f"Added crash reason: {id_val}")
-            else:
-                messagebox.showerror("Error", f"Failed to add crash reason with ID: {id_val}")
+            # Save the reason and its promoters in one batch
+            with self.database.batch():
+                if self.database.add_crash_reason(crash_reason):
+                    # Add promoters using their IDs directly from the selected persons
+                    for pid, _ in dialog.selected_promoters:
+                        self.database.add_crash_promoter(id_val, pid)
+
+                    self._crash_reason_changed(id_val, old_id=None)
+                    self.status_var.set(f"Added crash reason: {id_val}")
+                else:
+                    messagebox.showerror("Error", f"Failed to add crash reason with ID: {id_val}")
 
     def edit_crash_reason(self):
         selection = self.crash_reasons_tree.selection()
@@ -193,44 +481,49 @@ class CrashDatabaseManager:
             messagebox.showinfo("Information", "Please select a crash reason to edit")
             return
 
-        item = self.crash_reasons_tree.item(selection[0])
-        id_val, name, description, priority, promoters = item['values']
+        # 行的 iid 就是崩溃原因ID；从模型读取，避免 Treeview 把数字形式的值转换为 int
+        id_val = selection[0]
+        reason = self.database.get_crash_reason(id_val)
+        if reason is None:
+            messagebox.showerror("Error", f"Crash reason '{id_val}' no longer exists")
+            return
 
         dialog = CrashReasonDialog(self.root,self.database, "Edit Crash Reason",
-                                   initial_values=(id_val, name, description, priority, promoters))
+                                   initial_values=(reason.id, reason.name, reason.description, reason.priority,
+                                                   self._promoter_names(id_val)))
 
         if dialog.result:
             new_id, new_name, new_description, new_priority, new_promoter_names = dialog.result
+            # 改名前先检查新ID，避免删除原有数据后才发现无法添加
+            if new_id != id_val and new_id in self.database.crash_reasons:
+                messagebox.showerror("Error", f"Crash reason with ID '{new_id}' already exists")
+                return
+
+            # Save the reason, its rules and its promoters in one batch
+            with self.database.batch():
+                # Create and add updated crash reason; if ID changed, move the rules to the new ID and delete the old one
+                new_reason = CrashReason(id=new_id, name=new_name, description=new_description, priority=new_priority)
+                if new_id != id_val:
+                    self.database.add_crash_reason(new_reason)
+                    # 规则ID包含崩溃原因ID，移动时换用新ID；内容完全相同的重复规则随旧原因一起删除
+                    for rule in self.database.get_detection_rules_for_crash(id_val):
+                        self.database.change_detection_rule(rule.id, new_id, rule.match_type, rule.match)
+                    self.database.delete_crash_reason(id_val)
+                else:
+                    self.database.update_crash_reason(new_reason)
 
-            # If ID changed, delete old and create new
-            if new_id != id_val:
-                if id_val in self.database.crash_reasons:
-                    del self.database.crash_reasons[id_val]
-                    # Need to delete old promoter relationships
-                    for key in list(self.database.crash_promoters.keys()):
-                        if key.startswith(f"{id_val}_"):
-                            del self.database.crash_promoters[key]
-
-            # Create and add updated crash reason
-            new_reason = CrashReason(id=new_id, name=new_name, description=new_description, priority=new_priority)
-            self.database.update_crash_reason(new_reason)
-
-            # Clear old promoters
-            for key in list(self.database.crash_promoters.keys()):
-                if key.startswith(f"{new_id}_"):
-                    del self.database.crash_promoters[key]
-
-            # Add new promoters
-            for promoter_name in new_promoter_names.split(','):
-                promoter_name = promoter_name.strip()
-                if not promoter_name:
-                    continue
-                promoter_id = self._get_or_create_person(promoter_name)
-                if promoter_id:
-                    self.database.add_crash_promoter(new_id, promoter_id)
-
-            self.database.save_crash_promoters()
-            self.refresh_crash_reasons()
+                # Clear old promoters
+                self.database.clear_crash_promoters(new_id)
+
+                # Add new promoters
+                for promoter_name in new_promoter_names.split(','):
+                    promoter_name = promoter_name.strip()
+                    if not promoter_name:
+                        continue
+                    promoter_id = self._get_or_create_person(promoter_name)
+                    if promoter_id:
+                        self.database.add_crash_promoter(new_id, promoter_id)
+            self._crash_reason_changed(new_id, old_id=id_val)
             self.status_var.set(f"Updated crash reason: {new_id}")
 
     def delete_crash_reason(self):
@@ -239,41 +532,42 @@ class CrashDatabaseManager:
             messagebox.showinfo("Information", "Please select a crash reason to delete")
             return
 
-        item = self.crash_reasons_tree.item(selection[0])
-        id_val = str(item['values'][0])
+        id_val = selection[0]
 
-        if messagebox.askyesno("Confirm", f"Are you sure you want to delete crash reason '{id_val}'?"):
+        rule_count = len(self.database.rules_by_crash.get(id_val, ()))
+        question = f"Are you sure you want to delete crash reason '{id_val}'?"
+        if rule_count:
+            question += f"\n\nIts {rule_count} detection rule(s) will be deleted too."
+        if messagebox.askyesno("Confirm", question):
             if id_val in self.database.crash_reasons:
-                del self.database.crash_reasons[id_val]
-                self.database.save_crash_reasons()
-                self.refresh_crash_reasons()
+                self.database.delete_crash_reason(id_val)
+                self._crash_reason_changed(id_val)
                 self.status_var.set(f"Deleted crash reason: {id_val}")
             else:
                 messagebox.showerror("Error", f"Failed to delete crash reason with ID: {id_val}")
 
     def load_detection_rules(self):
         """Load detection rules for the selected crash reason"""
-        # Clear existing items
-        for item in self.rules_tree.get_children():
-            self.rules_tree.delete(item)
-
+        self.contributor_names.clear()
         selected_reason = self.crash_reason_var.get()
         if not selected_reason:
+            self.rules_view.set_keys([])
             return
 
-        # Get detection rules for the selected crash reason
-        detection_rules = self.database.get_detection_rules_for_crash(selected_reason)
+        # Rows are keyed by rule ID and built when they are scrolled into view
+        rule_ids = list(self.database.rules_by_crash.get(selected_reason, ()))
+        self.rules_view.set_keys(rule_ids)
 
-        # Add detection rules to treeview
-        for i, rule in enumerate(detection_rules):
-            match_type = "Exact" if rule.match_type == 0 else "Regex"
-            contributors = self.database.get_contributors_for_rule(rule.id)
-            contributor_names = ", ".join([c.name for c in contributors]) if contributors else "None"
+        self.status_var.set(f"Loaded {len(rule_ids)} detection rules for {selected_reason}")
 
-            self.rules_tree.insert("", tk.END, iid=str(i),
-                                   values=(match_type, rule.match, contributor_names))
-
-        self.status_var.set(f"Loaded {len(detection_rules)} detection rules for {selected_reason}")
+    def _detection_rule_changed(self, rule_id: str):
+        """Update only the row of one edited, added or deleted rule"""
+        self.contributor_names.pop(rule_id, None)
+        rule_ids = list(self.database.rules_by_crash.get(self.crash_reason_var.get(), ()))
+        if rule_id in rule_ids:
+            self.rules_view.place(rule_id, rule_ids.index(rule_id))
+        else:
+            self.rules_view.remove(rule_id)
 
     def add_detection_rule(self):
         """Add a new detection rule"""
@@ -283,12 +577,13 @@ class CrashDatabaseManager:
             return
 
         # Create a dialog for adding a new detection rule
-        dialog = DetectionRuleDialog(self.root,self.database, "Add Detection Rule")
+        dialog = DetectionRuleDialog(self.root,self.database, "Add Detection Rule",
+                                     template=self.database.crash_reasons[selected_reason]["description"])
         if dialog.result:
             match_type, match, contributor_names = dialog.result
 
-            # Create a unique ID for the detection rule
-            rule_id = f"rule_{selected_reason}_{len(self.database.detection_rules) + 1}"
+            # Derive the ID from the rule content, so the same rule always gets the same ID
+            rule_id = stable_rule_id(selected_reason, match_type, match)
 
             # Create and add the new rule
             rule = DetectionRule(
@@ -298,15 +593,17 @@ class CrashDatabaseManager:
                 match=match
             )
 
-            if self.database.add_detection_rule(rule):
-                # Add contributors using their IDs directly from the selected persons
-                for pid, _ in dialog.selected_contributors:
-                    self.database.add_rule_contributor(rule_id, pid)
+            # Save the rule and its contributors in one batch
+            with self.database.batch():
+                if self.database.add_detection_rule(rule):
+                    # Add contributors using their IDs directly from the selected persons
+                    for pid, _ in dialog.selected_contributors:
+                        self.database.add_rule_contributor(rule_id, pid)
 
-                self.load_detection_rules()
-                self.status_var.set(f"Added detection rule to {selected_reason}")
-            else:
-                messagebox.showerror("Error", "Failed to add detection rule")
+                    self._detection_rule_changed(rule_id)
+                    self.status_var.set(f"Added detection rule to {selected_reason}")
+                else:
+                    messagebox.showerror("Error", "Failed to add detection rule")
 
     def _get_or_create_person(self, name):
         """Find a person by name or create a new one if not found"""
@@ -331,58 +628,53 @@ class CrashDatabaseManager:
             messagebox.showinfo("Information", "Please select a crash reason and a detection rule")
             return
 
-        # Get the selected rule index
-        rule_index = int(selection[0])
-
-        # Get rules for this crash reason
-        rules = self.database.get_detection_rules_for_crash(selected_reason)
-        if rule_index >= len(rules):
+        # The row iid is the rule ID
+        rule = self.database.detection_rule_models.get(selection[0])
+        if rule is None:
             messagebox.showerror("Error", "Invalid rule selection")
             return
 
-        # Get the actual rule object
-        rule = rules[rule_index]
-
         # Get contributor names
-        contributors = self.database.get_contributors_for_rule(rule.id)
-        contributor_names = ", ".join([c.name for c in contributors]) if contributors else ""
-
-        # Match type string
-        match_type_str = "Exact" if rule.match_type == 0 else "Regex"
+        contributor_names = self._contributor_names(rule.id)
+        if contributor_names == "None":
+            contributor_names = ""
 
         # Display the edit dialog
         dialog = DetectionRuleDialog(self.root,self.database, "Edit Detection Rule",
-                                     initial_values=(rule.match_type, rule.match, contributor_names))
+                                     initial_values=(rule.match_type, rule.match, contributor_names),
+                                     template=self.database.crash_reasons[selected_reason]["description"])
 
         if dialog.result:
             new_match_type, new_match, new_contributor_names = dialog.result
 
             # Update rule in the database
             if rule.id in self.database.detection_rules:
-                # Update the rule properties
-                rule_data = self.database.detection_rules[rule.id]
-                rule_data["match_type"] = new_match_type
-                rule_data["match"] = new_match
-
-                # Save changes
-                self.database.save_detection_rules()
-
-                # Clear old contributors
-                for key in list(self.database.rule_contributors.keys()):
-                    if key.startswith(f"{rule.id}_"):
-                        del self.database.rule_contributors[key]
-
-                # Add new contributors
-                for contributor_name in new_contributor_names.split(','):
-                    contributor_name = contributor_name.strip()
-                    if not contributor_name:
-                        continue
-                    contributor_id = self._get_or_create_person(contributor_name)
-                    if contributor_id:
-                        self.database.add_rule_contributor(rule.id, contributor_id)
-
-                self.database.save_rule_contributors()
-                self.load_detection_rules()
+                # 规则ID由内容派生，先确认修改后的内容不会与另一条规则重复
+                new_id = stable_rule_id(rule.crash_reason_id, new_match_type, new_match)
+                if new_id != rule.id and new_id in self.database.detection_rules:
+                    messagebox.showerror("Error", f"Detection rule '{new_id}' already matches the same content")
+                    return
+
+                # Save the rule and its contributors in one batch
+                with self.database.batch():
+                    # Change the match; the rule is re-keyed when its content changed
+                    new_id = self.database.change_detection_rule(rule.id, rule.crash_reason_id,
+                                                                 new_match_type, new_match)
+
+                    # Clear old contributors
+                    self.database.clear_rule_contributors(new_id)
+
+                    # Add new contributors
+                    for contributor_name in new_contributor_names.split(','):
+                        contributor_name = contributor_name.strip()
+                        if not contributor_name:
+                            continue
+                        contributor_id = self._get_or_create_person(contributor_name)
+                        if contributor_id:
+                            self.database.add_rule_contributor(new_id, contributor_id)
+                if new_id != rule.id:
+                    self._detection_rule_changed(rule.id)
+                self._detection_rule_changed(new_id)
                 self.status_var.set(f"Updated detection rule for {selected_reason}")
 
     def delete_detection_rule(self):
@@ -394,23 +686,13 @@ class CrashDatabaseManager:
 
         # Confirm deletion
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this detection rule?"):
-            # Get the selected rule index
-            rule_index = int(selection[0])
-
-            # Get rules for this crash reason
-            rules = self.database.get_detection_rules_for_crash(selected_reason)
-            if rule_index >= len(rules):
-                messagebox.showerror("Error", "Invalid rule selection")
-                return
-
-            # Get the rule ID to delete
-            rule_id = rules[rule_index].id
+            # The row iid is the rule ID
+            rule_id = selection[0]
 
             # Delete the rule from the database
             if rule_id in self.database.detection_rules:
-                del self.database.detection_rules[rule_id]
-                self.database.save_detection_rules()
-                self.load_detection_rules()
+                self.database.delete_detection_rule(rule_id)
+                self._detection_rule_changed(rule_id)
                 self.status_var.set(f"Deleted detection rule from {selected_reason}")
 
 
@@ -523,11 +805,13 @@ class CrashReasonDialog:
 class DetectionRuleDialog:
     """Dialog for adding/editing detection rules"""
 
-    def __init__(self, parent, database: CrashReasonDatabase, title, initial_values=None):
+    def __init__(self, parent, database: CrashReasonDatabase, title, initial_values=None, template=""):
         self.result = None
         self.parent = parent
         self.selected_contributors = []
         self.database = database
+        # 崩溃原因的描述，测试正则规则时用于填充 [[n]]
+        self.template = template
 
         # Create dialog window
         self.dialog = tk.Toplevel(parent)
@@ -582,11 +866,17 @@ class DetectionRuleDialog:
         button_frame.grid(row=3, column=0, columnspan=2, pady=10)
 
         ttk.Button(button_frame, text="OK", command=self.ok).pack(side=tk.LEFT, padx=10)
+        ttk.Button(button_frame, text="Test...", command=self.test_rule).pack(side=tk.LEFT, padx=10)
         ttk.Button(button_frame, text="Cancel", command=self.cancel).pack(side=tk.LEFT, padx=10)
 
         # Wait for the dialog to be closed
         self.dialog.wait_window()
 
+    def test_rule(self):
+        """Open the tester for the rule as currently entered"""
+        RuleTesterWindow(self.dialog, lambda: (self.match_type_var.get(), self.match_text.get("1.0", "end-1c").strip()),
+                         self.template)
+
     def select_contributors(self):
         """Open dialog to select contributors"""
         selector = PersonSelectorDialog(self.parent,self.database, "Select Contributors", multi_select=True)
@@ -617,6 +907,172 @@ class DetectionRuleDialog:
         self.dialog.destroy()
 
 
+class RuleTesterWindow:
+    """
+    Runs the rule being edited against a sample log and shows matches and timing.
+
+    The sample is loaded and the rule evaluated on a worker thread; the result is
+    handed back through a queue polled from the Tk main loop.
+    """
+
+    def __init__(self, parent, get_rule: Callable[[], tuple], template: str = ""):
+        self.parent = parent
+        self.get_rule = get_rule
+        self.template = template
+        self.results: "queue.Queue[tuple]" = queue.Queue()
+        self.running = False
+        # 样本按路径缓存，修改规则后重新测试无需再次读取
+        self.sample_path: Optional[str] = None
+        self.sample_text = ""
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("Rule Tester")
+        self.window.geometry("800x500")
+        self.window.transient(parent)
+        self.window.grab_set()
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(1, weight=1)
+
+        # Sample and budget selection
+        top_frame = ttk.Frame(self.window)
+        top_frame.grid(row=0, column=0, columnspan=2, sticky="ew", padx=10, pady=5)
+        ttk.Label(top_frame, text="Sample:").pack(side=tk.LEFT)
+        self.path_var = tk.StringVar()
+        ttk.Entry(top_frame, textvariable=self.path_var, width=50).pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
+        ttk.Button(top_frame, text="File...", command=self.choose_file).pack(side=tk.LEFT)
+        ttk.Button(top_frame, text="Folder...", command=self.choose_folder).pack(side=tk.LEFT, padx=5)
+        ttk.Label(top_frame, text="Budget ms:").pack(side=tk.LEFT)
+        self.budget_var = tk.DoubleVar(value=RuleTester.RULE_TIME_BUDGET_MS)
+        ttk.Spinbox(top_frame, from_=1, to=10000, width=6, textvariable=self.budget_var).pack(side=tk.LEFT, padx=5)
+        self.run_button = ttk.Button(top_frame, text="Run", command=self.run)
+        self.run_button.pack(side=tk.LEFT)
+
+        # Result view; matches and [[n]] values are highlighted with tags
+        self.output = tk.Text(self.window, wrap=tk.NONE, state=tk.DISABLED)
+        self.output.grid(row=1, column=0, sticky="nsew", padx=(10, 0))
+        self.output.tag_configure("match", background="#ffe066")
+        self.output.tag_configure("group", background="#8ce99a")
+        self.output.tag_configure("warning", foreground="#c92a2a")
+        self.output.tag_configure("heading", font=("TkDefaultFont", 10, "bold"))
+        scrollbar = ttk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.output.yview)
+        self.output.configure(yscrollcommand=scrollbar.set)
+        scrollbar.grid(row=1, column=1, sticky="ns", padx=(0, 10))
+
+        self.status_var = tk.StringVar(value="Choose a log file, folder or zip and press Run")
+        ttk.Label(self.window, textvariable=self.status_var, anchor=tk.W).grid(
+            row=2, column=0, columnspan=2, sticky="ew", padx=10, pady=5)
+
+    def choose_file(self):
+        path = filedialog.askopenfilename(parent=self.window, title="Choose a log or zip",
+                                          filetypes=[("Logs and zips", "*.log *.txt *.zip"), ("All files", "*")])
+        if path:
+            self.path_var.set(path)
+
+    def choose_folder(self):
+        path = filedialog.askdirectory(parent=self.window, title="Choose a crash log folder")
+        if path:
+            self.path_var.set(path)
+
+    def run(self):
+        """Start a test run on the worker thread"""
+        if self.running:
+            return
+        path = self.path_var.get().strip()
+        match_type, match = self.get_rule()
+        if not path:
+            messagebox.showinfo("Information", "Please choose a sample first", parent=self.window)
+            return
+        try:
+            budget = float(self.budget_var.get())
+        except (tk.TclError, ValueError):
+            budget = RuleTester.RULE_TIME_BUDGET_MS
+
+        self.running = True
+        self.run_button.state(["disabled"])
+        self.status_var.set("Loading sample..." if path != self.sample_path else "Testing rule...")
+        threading.Thread(target=self._work, args=(path, match_type, match, budget), daemon=True).start()
+        self.window.after(50, self._poll)
+
+    def _work(self, path, match_type, match, budget):
+        # 工作线程中不访问任何 Tk 对象
+        try:
+            if path != self.sample_path:
+                self.sample_text = RuleTester.load_sample(path)
+                self.sample_path = path
+            result = RuleTester.test_rule(match_type, match, self.sample_text, self.template, budget)
+            self.results.put((result, len(self.sample_text), None))
+        except Exception as e:
+            self.results.put((None, 0, repr(e)))
+
+    def _poll(self):
+        try:
+            result, sample_size, error = self.results.get_nowait()
+        except queue.Empty:
+            if self.window.winfo_exists():
+                self.window.after(50, self._poll)
+            return
+        self.running = False
+        if not self.window.winfo_exists():
+            return
+        self.run_button.state(["!disabled"])
+        if error:
+            self.status_var.set(f"Test failed: {error}")
+            return
+        self.show(result, sample_size)
+
+    def show(self, result: RuleTester.RuleTestResult, sample_size: int):
+        """Render a test result into the output view"""
+        self.output.configure(state=tk.NORMAL)
+        self.output.delete("1.0", tk.END)
+        if result.error:
+            self.output.insert(tk.END, result.error + "\n", "warning")
+        else:
+            for warning in result.warnings:
+                self.output.insert(tk.END, f"Warning: {warning}\n", "warning")
+            if result.prefilter is not None:
+                found = "found" if result.prefilter_hit else "not found, the regex is skipped"
+                self.output.insert(tk.END, f"Prefilter literal: {result.prefilter!r} ({found})\n")
+
+            self.output.insert(tk.END, "\nReported details\n", "heading")
+            for detail in result.details or ["(none)"]:
+                self.output.insert(tk.END, f"  {detail}\n")
+
+            shown = len(result.matches)
+            self.output.insert(tk.END, f"\nMatches ({result.match_count}, showing {shown})\n", "heading")
+            for number, match in enumerate(result.matches, start=1):
+                prefix = f"#{number} line {match.line}: "
+                line_start = self.output.index(tk.END + "-1c")
+                self.output.insert(tk.END, prefix + match.context + "\n")
+                base = len(prefix) - match.context_start
+                self._tag(line_start, base + match.start, base + match.end, "match")
+                for value, start, end in match.groups:
+                    if value is not None:
+                        self._tag(line_start, base + start, base + end, "group")
+                if match.groups:
+                    values = ", ".join(f"[[{index}]]={value!r}" for index, (value, _, _) in enumerate(match.groups, 1))
+                    self.output.insert(tk.END, f"    {values}\n")
+        self.output.configure(state=tk.DISABLED)
+        self.status_var.set(f"{result.match_count} matches in {result.elapsed_ms:.2f} ms "
+                            f"on {sample_size / 1e6:.1f} M characters")
+
+    def _tag(self, line_start: str, start: int, end: int, tag: str):
+        # 只标记截取范围内的部分
+        length = len(self.output.get(line_start, f"{line_start} lineend"))
+        start, end = max(0, min(start, length)), max(0, min(end, length))
+        if end > start:
+            self.output.tag_add(tag, f"{line_start}+{start}c", f"{line_start}+{end}c")
+
+    def close(self):
+        self.window.grab_release()
+        self.window.destroy()
+        # 测试窗口关闭后把输入焦点还给规则对话框
+        try:
+            self.parent.grab_set()
+        except tk.TclError:
+            pass
+
+
 class PersonSelectorDialog:
     """Dialog for selecting or creating persons"""
 
@@ -643,6 +1099,8 @@ class PersonSelectorDialog:
         self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=30)
         self.search_entry.pack(side=tk.LEFT, padx=5)
         ttk.Button(search_frame, text="Search", command=self.search).pack(side=tk.LEFT)
+        # 输入时即时搜索
+        self.search_var.trace_add("write", lambda *args: self.search())
 
         # Persons listbox with scrollbar
         self.listbox_frame = ttk.Frame(self.dialog)
@@ -683,20 +1141,23 @@ class PersonSelectorDialog:
             self.persons_data.append(person_data)
 
     def search(self):
-        """Search for persons based on the search term"""
-        search_term = self.search_var.get().strip().lower()
+        """Search for persons by ID or name using the search index"""
+        search_term = self.search_var.get().strip()
+        if not search_term:
+            self.load_persons()
+            return
         self.persons_listbox.delete(0, tk.END)
         self.persons_data = []
 
         if not self.database:
             return
 
-        for person_id, person_data in self.database.persons.items():
-            if (search_term in str(person_data['id']).lower() or
-                    search_term in person_data['name'].lower()):
-                person_str = f"{person_data['id']}: {person_data['name']}"
-                self.persons_listbox.insert(tk.END, person_str)
-                self.persons_data.append(person_data)
+        results = SearchIndex.index_for(self.database).search(search_term, kinds=("person",), limit=len(self.database.persons))
+        for result in results:
+            person_data = self.database.persons[result.key]
+            person_str = f"{person_data['id']}: {person_data['name']}"
+            self.persons_listbox.insert(tk.END, person_str)
+            self.persons_data.append(person_data)
 
     def select(self):
         """Handle the selection of persons"""
@@ -1,16 +1,26 @@
 import logging
 import os
 import re
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime as dt
 from enum import Enum
-from typing import List, Optional, Union, Dict
-from flashtext import KeywordProcessor
+from typing import List, Optional, Union, Dict, Tuple
 
-from CrashDatabase import CrashReasonDatabase
+from AnalysisResult import AnalysisResult, FiredRule, ReasonResult
+from LiteralScanner import LiteralHits
+from LogManager import get_logger, setup_logging
+import Metrics
+from RuleEngine import RuleMatch, RuleSetManager
+from RuleStats import RuleStats
+import RuleEngine
 
 import config_reader
 cf = config_reader.Config()
 
+logger = get_logger("main")
+
 class Special_CrashReason(Enum):
     # Mod issues
     JAVA_TOO_HIGH = ("Java版本过高","PCL Loader")
@@ -52,7 +62,56 @@ class Special_CrashReason(Enum):
 
 
 def class_java_mapping(class_version: int) -> int:
-    return class_version - 44
+    return RuleEngine.class_java_mapping(class_version)
+
+
+# 堆栈分析前用于判断是否安装了加载器的字面量，与规则一起在一次扫描中完成
+LOADER_LITERALS = {f"loader:{loader}": loader for loader in ("forge", "fabric", "quilt", "liteloader")}
+
+# 规则数据所在的文件夹，即配置中 crash_reason_database_path 所在的文件夹
+DATABASE_FOLDER = os.path.dirname(cf.crash_reason_database_path)
+
+
+def _database_folder(path: Optional[str]) -> str:
+    # 既接受数据文件夹，也接受其中某个 JSON 文件的路径（如 crash_reason_database_path）
+    if not path:
+        return DATABASE_FOLDER
+    path = os.path.abspath(path)
+    return os.path.dirname(path) if os.path.splitext(path)[1] == ".json" else path
+
+
+def _create_rule_sets(folder: str) -> RuleSetManager:
+    return RuleSetManager.in_folder(folder, cf.database_backend, cf.sqlite_database_path, LOADER_LITERALS)
+
+
+# 进程内共享的规则集，规则文件变化时自动切换到新版本
+RULE_SETS = _create_rule_sets(DATABASE_FOLDER)
+_RULE_SETS_BY_FOLDER: Dict[str, RuleSetManager] = {DATABASE_FOLDER: RULE_SETS}
+_RULE_SETS_LOCK = threading.Lock()
+
+
+def rule_sets_for(path: Optional[str] = None) -> RuleSetManager:
+    """
+    Return the shared rule set manager for a database folder.
+
+    Each folder is loaded once per process; later calls reuse the same
+    snapshot until its files change.
+
+    Args:
+        path: Database folder or one of its JSON files; None for the configured database
+
+    Returns:
+        The RuleSetManager of that folder
+    """
+    folder = _database_folder(path)
+    with _RULE_SETS_LOCK:
+        rule_sets = _RULE_SETS_BY_FOLDER.get(folder)
+        if rule_sets is None:
+            rule_sets = _RULE_SETS_BY_FOLDER[folder] = _create_rule_sets(folder)
+        return rule_sets
+
+# 进程内共享的规则命中与耗时统计，analyze_folder 第一次调用时启动后台线程定期写入 rule_stats.db
+RULE_STATS = RuleStats()
 
 
 class FileType:
@@ -64,16 +123,32 @@ class FileType:
 
 
 class MinecraftCrashAnalyzer:
-    def __init__(self, folder_path: str = None):
+    def __init__(self, folder_path: str = None, rule_sets: Optional[RuleSetManager] = None):
+        """
+        Args:
+            folder_path: Database folder or one of its JSON files; None for the configured database
+            rule_sets: Shared rule set manager to use instead of the one for folder_path
+        """
         self.analyzed_files = []
         self.log_mc = None
         self.log_mc_debug = None
         self.log_hs = None
         self.log_crash = None
         self.log_all = None
+        self.literal_hits: Optional[LiteralHits] = None
         self.crash_reasons = {}
-        self.crashdb = CrashReasonDatabase()
-        self.keyword_processor = KeywordProcessor()
+        # 崩溃原因 -> (超出上限未列出的详情条数, 是否提前停止扫描)
+        self.omitted_details: Dict[object, Tuple[int, bool]] = {}
+        # 结构化结果所需的信息：使用的文件、各文件在 log_all 中的起始位置、命中的规则和各阶段耗时
+        self.used_files: Dict[str, str] = {}
+        self.log_segments: List[Tuple[int, str]] = []
+        self.fired_rules: List[RuleMatch] = []
+        self.timings: Dict[str, float] = {}
+        self.bytes_read = 0
+        # 整个分析过程固定使用同一个规则集版本，数据只在文件变化时重新加载
+        self.rules = (rule_sets or rule_sets_for(folder_path)).current()
+        self.crashdb = self.rules.database
+        self.stats = RULE_STATS
 
     def collect_logs(self, folder_path: str) -> bool:
         """
@@ -85,12 +160,13 @@ class MinecraftCrashAnalyzer:
         Returns:
             True if any files were found, False otherwise
         """
-        print(f"Collecting logs from: {folder_path}")
+        logger.info("Collecting logs from: %s", folder_path)
         self.analyzed_files = []
+        self.bytes_read = 0
 
         # Check if folder exists
         if not os.path.exists(folder_path):
-            print(f"Folder {folder_path} does not exist")
+            logger.warning("Folder %s does not exist", folder_path)
             return False
 
         # Find all potential log files
@@ -106,18 +182,19 @@ class MinecraftCrashAnalyzer:
                 # Check if file was modified recently (within last 30 minutes)
                 mod_time = os.path.getmtime(file_path)
                 recent_files.append(file_path)
-                print(f"Found recent log file: {file}")
+                logger.debug("Found recent log file: %s", file)
 
         # Read files content
         for file_path in recent_files:
             try:
                 with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                     content = f.read()
+                    self.bytes_read += os.path.getsize(file_path)
                     if content:
                         self.analyzed_files.append((file_path, content.splitlines()))
-                        print(f"Added {file_path} for analysis")
+                        logger.debug("Added %s for analysis", file_path)
             except Exception as e:
-                print(f"Error reading file {file_path}: {e}")
+                logger.error("Error reading file %s: %s", file_path, e)
 
         return len(self.analyzed_files) > 0
 
@@ -128,12 +205,13 @@ class MinecraftCrashAnalyzer:
         Returns:
             Number of useful log files found
         """
-        print("Preparing logs for analysis")
+        logger.info("Preparing logs for analysis")
         # Reset log variables
         self.log_mc = None
         self.log_mc_debug = None
         self.log_hs = None
         self.log_crash = None
+        self.used_files = {}
 
         # Categorize files
         categorized_files = {}
@@ -164,7 +242,7 @@ class MinecraftCrashAnalyzer:
                 if file_type not in categorized_files:
                     categorized_files[file_type] = []
                 categorized_files[file_type].append((file_path, content))
-                print(f"Categorized {file_path} as {file_type}")
+                logger.debug("Categorized %s as %s", file_path, file_type)
 
         # Process each file type
         file_count = 0
@@ -174,47 +252,51 @@ class MinecraftCrashAnalyzer:
             # Use the newest crash report
             file_path, content = categorized_files[FileType.CRASH_REPORT][0]
             self.log_crash = "\n".join(content)
+            self.used_files[FileType.CRASH_REPORT] = file_path
             file_count += 1
-            print(f"Using crash report: {file_path}")
+            logger.debug("Using crash report: %s", file_path)
 
         # Process Minecraft logs
         if FileType.MINECRAFT_LOG in categorized_files:
             # Use the newest Minecraft log
             file_path, content = categorized_files[FileType.MINECRAFT_LOG][0]
             self.log_mc = "\n".join(content)
+            self.used_files[FileType.MINECRAFT_LOG] = file_path
             file_count += 1
-            print(f"Using Minecraft log: {file_path}")
+            logger.debug("Using Minecraft log: %s", file_path)
 
         # Process debug logs
         if FileType.DEBUG_LOG in categorized_files:
             # Use the newest debug log
             file_path, content = categorized_files[FileType.DEBUG_LOG][0]
             self.log_mc_debug = "\n".join(content)
+            self.used_files[FileType.DEBUG_LOG] = file_path
             file_count += 1
-            print(f"Using debug log: {file_path}")
+            logger.debug("Using debug log: %s", file_path)
 
         # Process JVM error logs
         if FileType.HS_ERR in categorized_files:
             # Use the newest hs_err log
             file_path, content = categorized_files[FileType.HS_ERR][0]
             self.log_hs = "\n".join(content)
+            self.used_files[FileType.HS_ERR] = file_path
             file_count += 1
-            print(f"Using JVM error log: {file_path}")
+            logger.debug("Using JVM error log: %s", file_path)
 
-        # Combine all logs for full-text search
+        # Combine all logs for full-text search, remembering where each file starts
         all_logs = []
-        if self.log_crash:
-            all_logs.append(self.log_crash)
-        if self.log_mc:
-            all_logs.append(self.log_mc)
-        if self.log_mc_debug:
-            all_logs.append(self.log_mc_debug)
-        if self.log_hs:
-            all_logs.append(self.log_hs)
+        self.log_segments = []
+        start = 0
+        for file_type, text in ((FileType.CRASH_REPORT, self.log_crash), (FileType.MINECRAFT_LOG, self.log_mc),
+                                (FileType.DEBUG_LOG, self.log_mc_debug), (FileType.HS_ERR, self.log_hs)):
+            if text:
+                self.log_segments.append((start, file_type))
+                all_logs.append(text)
+                start += len(text) + 1
 
         self.log_all = "\n".join(all_logs)
 
-        print(f"Log preparation complete. Found {file_count} useful files for analysis.")
+        logger.info("Log preparation complete. Found %s useful files for analysis.", file_count)
         return file_count
 
     def append_keyword_reason(self, reason: str, details: Union[str, List[str]] = None) -> None:
@@ -250,7 +332,7 @@ class MinecraftCrashAnalyzer:
         else:
             self.crash_reasons[reason] = details if details else []
 
-        print(f"Found crash reason: {reason.value} {details if details else ''}")
+        logger.info("Found crash reason: %s %s", reason.value, details if details else '')
 
     def analyze(self) -> str:
         """
@@ -259,45 +341,56 @@ class MinecraftCrashAnalyzer:
         Returns:
             Analysis result as a user-friendly string
         """
-        print("Starting crash analysis")
+        logger.info("Starting crash analysis")
         self.crash_reasons = {}
+        self.omitted_details = {}
+        self.fired_rules = []
+        self.timings = {}
 
         # Check if we have any files to analyze
         if not self.log_all:
             self.append_special_reason(Special_CrashReason.NO_ANALYSIS_FILES)
             return self.get_analysis_result()
 
+        # Single pass over the log for every literal of every rule
+        with self.timed("scan"):
+            self.literal_hits = self.rules.scan(self.log_all, self.stats)
+
         # Step 1: High priority log matching
-        self.analyze_crit1()
+        with self.timed("crit1"):
+            self.analyze_crit1()
         if self.crash_reasons:
             return self.get_analysis_result()
 
         # Step 2: Keyword matching
-        self.analyze_with_keyword()
+        with self.timed("keyword"):
+            self.analyze_with_keyword()
         if self.crash_reasons:
             return self.get_analysis_result()
 
         # Step 3: Regex matching
-        self.analyze_with_all_regex()
+        with self.timed("regex"):
+            self.analyze_with_all_regex()
         if self.crash_reasons:
             return self.get_analysis_result()
 
         # Step 4: Stack trace analysis
-        if any(loader in self.log_all.lower() for loader in ["forge", "fabric", "quilt", "liteloader"]):
-            stack_trace = self.extract_stack_trace()
-            if stack_trace:
-                keywords = self.analyze_stack_keyword(stack_trace)
-                if keywords:
-                    mod_names = self.analyze_mod_name(keywords)
-                    if mod_names:
-                        self.append_special_reason(Special_CrashReason.MOD_SUSPECTED, mod_names)
-                        return self.get_analysis_result()
-                    else:
-                        self.append_special_reason(Special_CrashReason.STACK_KEYWORD_FOUND, keywords)
-                        return self.get_analysis_result()
+        if self.literal_hits.any(*LOADER_LITERALS):
+            with self.timed("stack"):
+                stack_trace = self.extract_stack_trace()
+                keywords = self.analyze_stack_keyword(stack_trace) if stack_trace else None
+                mod_names = self.analyze_mod_name(keywords) if keywords else None
+            if keywords:
+                if mod_names:
+                    self.append_special_reason(Special_CrashReason.MOD_SUSPECTED, mod_names)
+                    return self.get_analysis_result()
+                else:
+                    self.append_special_reason(Special_CrashReason.STACK_KEYWORD_FOUND, keywords)
+                    return self.get_analysis_result()
 
         # Step 4: Low priority log matching
-        self.analyze_crit3()
+        with self.timed("crit3"):
+            self.analyze_crit3()
 
         # If no reasons found, return unknown
         if not self.crash_reasons:
@@ -322,278 +415,73 @@ class MinecraftCrashAnalyzer:
 
         return None
 
-    def build_keyword_dictionary(self):
-        """
-        Build a dictionary of keywords from crash database for keyword matching.
-        Sets up the keyword processor with these keywords.
-
-        Returns:
-            Dictionary mapping keywords to crash reason IDs
-        """
+    @contextmanager
+    def timed(self, stage: str):
+        """Add the time spent in the block to the timings of an analysis stage"""
+        started = time.perf_counter()
         try:
-            # Clear existing keywords
-            self.keyword_processor.remove_keywords_from_dict(self.keyword_processor.get_all_keywords())
-
-            keyword_dict = {}
-
-            # Process all crash reasons
-            for reason_id in self.crashdb.crash_reasons:
-                # Get detection rules for this crash reason
-                rules = self.crashdb.get_detection_rules_for_crash(reason_id)
-
-                # Add exact match patterns to keyword processor
-                for rule in rules:
-                    if rule.match_type == 0:  # Exact match
-                        self.keyword_processor.add_keyword(rule.match, reason_id)
-                        keyword_dict[rule.match] = reason_id
-
-
-            return keyword_dict
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings[stage] = self.timings.get(stage, 0.0) + elapsed * 1000
+            Metrics.STAGE_SECONDS.observe(elapsed, stage=stage)
+
+    def append_rule_matches(self, matches: List[RuleMatch]) -> None:
+        """Record the matches reported by the rule engine"""
+        self.fired_rules.extend(matches)
+        for match in matches:
+            if match.special:
+                self.append_special_reason(Special_CrashReason[match.reason], match.details)
+                self.count_omitted(Special_CrashReason[match.reason], match)
+            else:
+                self.append_regex_reason(match.reason, match.details)
+                self.count_omitted(match.reason, match)
 
-        except Exception as e:
-            print(f"Error building keyword dictionary: {e}")
-            return {}
+    def count_omitted(self, reason, match: RuleMatch) -> None:
+        """Add the details a capped rule left out to the totals of its reason"""
+        if match.omitted:
+            omitted, truncated = self.omitted_details.get(reason, (0, False))
+            self.omitted_details[reason] = (omitted + match.omitted, truncated or match.truncated)
 
     def analyze_with_keyword(self):
         """
         Analyze logs for keywords defined in the crash database and identify matching crash reasons.
-        Uses flashtext's KeywordProcessor for efficient multi-keyword matching.
+        The keywords are part of the compiled rule set, so their presence is already known from the
+        single literal scan done at the start of analyze().
         """
         try:
-            # First build the keyword dictionary
-            if not self.build_keyword_dictionary():
-                return
-
-            # Now perform the analysis if we have logs to analyze
-            if self.log_all:
-                keywords_found = set(self.keyword_processor.extract_keywords(self.log_all))
-
-                # Record found crash reasons
-                for keyword in keywords_found:
-                    crash_item = self.crashdb.get_crash_reason(keyword)
-                    if crash_item:
-                        self.append_keyword_reason(crash_item.id, self.crashdb.get_crash_reason(crash_item.id).description)
-                        self.log(f"[Keyword] Found matching crash reason: {crash_item.id} - {crash_item.name}")
+            for match in self.rules.run_keywords(self.literal_hits, self.stats):
+                self.fired_rules.append(match)
+                self.append_keyword_reason(match.reason, match.details)
+                self.log("[Keyword] Found matching crash reason: %s - %s", match.reason, match.rule_id)
 
         except Exception as e:
-            self.log(f"[ERROR] Keyword analysis failed: {str(e)}")
+            self.log("Keyword analysis failed: %s", e, level=logging.ERROR)
 
     def analyze_with_all_regex(self):
         """
         Analyze text using regex patterns and template to generate formatted results.
+        Regex rules whose required literal was not found by the literal scan are skipped.
         """
-        # Get all crash reasons
-        crash_items = []
-        for reason_id, reason_data in self.crashdb.crash_reasons.items():
-            crash_reason = self.crashdb.get_crash_reason(reason_id)
-            if crash_reason:
-                rules = self.crashdb.get_detection_rules_for_crash(reason_id)
-                if rules:
-                    for rule in rules:
-                        if rule.match_type == 1:  # Only include regex rules
-                            crash_items.append({
-                                "reason": crash_reason,
-                                "rule": rule
-                            })
-
-        # Process each regex rule
-        for item in crash_items:
-            reason = item["reason"]
-            rule = item["rule"]
-            results = self.analyze_with_regex(rule.match, reason.description)
-            if results:
-                for result in results:
-                    self.append_regex_reason(reason.id, result)
-
-
-    def analyze_with_regex(self, pattern: str, template: str) -> List[str]:
-        """
-        Analyze text using regex patterns and template to generate formatted results.
-
-        Args:
-            pattern: regex pattern to extract values
-            template: Template string with placeholders like [[1]], [[2]]
-
-        Returns:
-            List of formatted strings where placeholders are replaced with extracted values
-        """
-        results = []
-        for match in re.finditer(pattern, self.log_all, re.DOTALL):
-            all_matched = True
-            values = []
-            for i in range(1, len(match.groups()) + 1):
-                value = match.group(i)
-                if value is None:
-                    all_matched = False
-                    break
-                values.append(value)
-
-            # Check if all groups matched and the number of values matches the number of placeholders
-            if all_matched and len(values) == template.count("[["):
-
-                result = template
-                for i, value in enumerate(values):
-                    result = result.replace(f"[[{i + 1}]]", value)
-                results.append(result)
-        return results
+        for match in self.rules.run_regex(self.log_all, self.literal_hits, self.stats):
+            self.fired_rules.append(match)
+            self.append_regex_reason(match.reason, match.details)
+            self.count_omitted(match.reason, match)
 
     def analyze_crit1(self):
-        """High priority log matching for critical issues"""
-        # Check Forge Suggestion
-        # 寻找所有的“Suspected Mod: ”，获取这一行的下一行的一整行，如有重复则剔除
-        if "Suspected Mod: " in self.log_all:
-            suspected_mods = []
-            raw_suspected_mods: List[str] = re.findall(r"Suspected Mod: \s*(.*?)\n", self.log_all, re.DOTALL)
-            # 汉化
-            for i, text in enumerate(raw_suspected_mods):
-                text = "第" + str(i + 1) + "个: " + text
-                text = text.replace(", Version: ", "模组，其在游戏中的版本号为: ")
-                suspected_mods.append(text)
-            if suspected_mods:
-                self.append_special_reason(Special_CrashReason.MOD_SUSPECTED, list(set(suspected_mods)))
-                return
-
-        # Java版本错误：
-        if "Class file major version" in self.log_all:
-            major_version = re.search(r"Class file major version (\d+)", self.log_all)
-            if major_version:
-                mapped_major_version = class_java_mapping(int(major_version.group(1)))
-                now_version = re.search(r"supports class version (\d+)", self.log_all)
-                mapped_now_version = class_java_mapping(int(now_version.group(1)))
-                if mapped_major_version > mapped_now_version:
-                    self.append_special_reason(Special_CrashReason.JAVA_TOO_HIGH,
-                                       "需要的Java版本: " + str(mapped_major_version) + "，当前Java版本: " + str(
-                                           mapped_now_version))
-                    return
-                else:
-                    self.append_special_reason(Special_CrashReason.JAVA_VERSION_ERROR,
-                                       "需要的Java版本: " + str(mapped_major_version) + "，当前Java版本: " + str(
-                                           mapped_now_version))
-                    return
-
-
-
-        # Check for incompatible mods
-        # TODO
-
-        # Check for specific mod causing crashes
-
-
-        # Check for block/entity errors
-        # if self.log_crash:
-        #     if "\tBlock location: World: " in self.log_crash:
-        #         block_type = re.search(r"(?<=\tBlock: Block\{)[^\}]+", self.log_crash)
-        #         block_location = re.search(r"(?<=\tBlock location: World: )\([^\)]+\)", self.log_crash)
-        #         block_info = []
-        #         if block_type:
-        #             block_info.append(block_type.group())
-        #         if block_location:
-        #             block_info.append(block_location.group())
-        #         self.append_special_reason(Special_CrashReason.BLOCK_ERROR, " ".join(block_info) if block_info else None)
-        #         return
-        #
-        #     if "\tEntity's Exact location: " in self.log_crash:
-        #         entity_type = re.search(r"(?<=\tEntity Type: )[^\n]+(?= \()", self.log_crash)
-        #         entity_location = re.search(r"(?<=\tEntity's Exact location: )[^\n]+", self.log_crash)
-        #         entity_info = []
-        #         if entity_type:
-        #             entity_info.append(entity_type.group())
-        #         if entity_location:
-        #             entity_info.append("(" + entity_location.group().strip() + ")")
-        #         self.append_special_reason(Special_CrashReason.ENTITY_ERROR, " ".join(entity_info) if entity_info else None)
-        #         return
-
-        # Check for mod requirements missing
-
-        if "Missing or unsupported mandatory dependencies:" in self.log_all:
-            missing_mods_notice = re.findall(r"Missing or unsupported mandatory dependencies:\n((?:\tMod ID:.*\n?)+)",
-                                             self.log_all)
-            if missing_mods_notice:
-                mod_entries = re.findall(
-                    r"\tMod ID: '(.+?)', Requested by: '(.+?)', Expected range: '(.+?)', Actual version: '(.+?)'",
-                    missing_mods_notice[0])
-                last_mod_id = None
-                merged_mods = []
-                for mod_id, requested_by, expected_range, actual_version in mod_entries:
-                    if actual_version == '[MISSING]':
-                        self.append_special_reason(Special_CrashReason.MOD_MISSING,
-                                           f"需要安装'{mod_id}'前置模组（请求自: '{requested_by}'）")
-                    else:
-                        self.append_special_reason(Special_CrashReason.MOD_MISSING,
-                                           f"需要更换 '{mod_id}'前置模组版本（请求自: '{requested_by}'），需要的版本：'{expected_range}'，当前版本: '{actual_version}'")
-            else:
-                print("未找到任何缺失的模组依赖信息。")
+        """High priority log matching for critical issues, driven by the crit1 special rules"""
+        self.append_rule_matches(self.rules.run_special("crit1", self.log_all, self.literal_hits, self.stats))
 
     def analyze_crit3(self):
-        """Low priority log matching"""
-        # Check for Mixin errors
-
-        if "Mixin prepare failed " in self.log_all or \
-                "Mixin apply failed " in self.log_all or \
-                "MixinApplyError" in self.log_all or \
-                "MixinTransformerError" in self.log_all or \
-                "mixin.injection.throwables." in self.log_all or \
-                ".json] FAILED during " in self.log_all:
-            # Mod name matching
-            mod_name = re.search(r"(?<=from mod )[^.\/ ]+(?=\] from)", self.log_all)
-            if not mod_name:
-                mod_name = re.search(r"(?<=for mod )[^.\/ ]+(?= failed)", self.log_all)
-            if mod_name:
-                self.append_special_reason(Special_CrashReason.MOD_MIXIN_FAILED,
-                                           self.try_analyze_mod_name(mod_name.group().strip()))
-                return
-            # JSON name matching
-            json_names = re.findall(r"(?<=^[^\t]+[ \[{(]{1})[^ \[{(]+\.[^ ]+(?=\.json)", self.log_all,
-                                      re.MULTILINE)
-            for json_name in json_names:
-                self.append_special_reason(Special_CrashReason.MOD_MIXIN_FAILED,
-                                           self.try_analyze_mod_name(json_name.replace("mixins", "mixin").replace(".mixin", "")
-                                                             .replace("mixin.", "")))
-                return
-            # No explicit match
-            self.append_special_reason(Special_CrashReason.MOD_MIXIN_FAILED)
+        """Low priority log matching, driven by the crit3 special rules"""
+        matches = self.rules.run_special("crit3", self.log_all, self.literal_hits, self.stats)
+        self.append_rule_matches(matches)
+        if any(match.rule_id in self.rules.stop_rules for match in matches):
             return
 
-
-
-        # Specific pattern matching for various issues
-        patterns = [
-            (Special_CrashReason.FABRIC_ERROR, ["Fabric has crashed!", "Fabric has detected a mod loading error"]),
-            (Special_CrashReason.FORGE_ERROR, ["Forge mod loading errors have been detected"]),
-            (Special_CrashReason.MOD_INIT_FAILED, ["Failed to initialize mod", "Failed to create mod instance"])
-        ]
-
-        for reason, search_patterns in patterns:
-            for pattern in search_patterns:
-                if self.log_all and pattern in self.log_all:
-                    self.append_special_reason(reason)
-                    pattern = r"Failed to create mod instance\..*?\njava\.lang\.NoClassDefFoundError: ([^/]+/[^/]+/[^/]+)"
-                    match = re.search(pattern, self.log_all)
-                    if match:
-                        missing_mod = match.group(1)
-                        self.append_special_reason(Special_CrashReason.FORGE_ERROR,
-                            f"检测到文件 '{missing_mod}'不存在，这可能是一个模组，请检查是否已安装该前置模组，或双方模组版本是否最新")
-
-
-                    break
-
-        # Look for Fabric solution
-        fabric_solution_patterns = [
-            r"(?<=A potential solution has been determined:\n)((\t)+ - [^\n]+\n)+",
-            r"(?<=A potential solution has been determined, this may resolve your problem:\n)((\t)+ - [^\n]+\n)+"
-        ]
-
-        for pattern in fabric_solution_patterns:
-            solution_match = re.search(pattern, self.log_all)
-            if solution_match:
-                solution_lines = re.findall(r"(?<=\t+)[^\n]+", solution_match.group())
-                if solution_lines:
-                    self.append_special_reason(Special_CrashReason.FABRIC_SOLUTION, solution_lines)
-                    return
-
         # If very short output with no useful information
-        if not (self.log_crash or "at net." in self.log_mc or "INFO]" in self.log_mc) and self.log_mc and len(
-                self.log_mc) < 100:
+        if self.log_mc and len(self.log_mc) < 100 and not (
+                self.log_crash or "at net." in self.log_mc or "INFO]" in self.log_mc):
             self.append_special_reason(Special_CrashReason.UNKNOWN)
             return
 
@@ -663,7 +551,7 @@ class MinecraftCrashAnalyzer:
                                                                                         line))):
                     mod_name_lines.append(line)
 
-            self.log(f"[Crash] Found {len(mod_name_lines)} possible mod item lines in crash report")
+            self.log("[Crash] Found %s possible mod item lines in crash report", len(mod_name_lines))
 
             # Find lines matching keywords
             hint_lines = []
@@ -678,9 +566,9 @@ class MinecraftCrashAnalyzer:
                     break
 
             hint_lines = list(dict.fromkeys(hint_lines))  # Remove duplicates while preserving order
-            self.log(f"[Crash] Found {len(hint_lines)} possible crash mod matching lines in crash report")
+            self.log("[Crash] Found %s possible crash mod matching lines in crash report", len(hint_lines))
             for mod_line in hint_lines:
-                self.log(f"[Crash]  - {mod_line}")
+                self.log("[Crash]  - %s", mod_line, level=logging.DEBUG)
 
             # Extract .jar filenames
             for line in hint_lines:
@@ -702,7 +590,7 @@ class MinecraftCrashAnalyzer:
         if self.log_mc_debug:
             # Forge format: Found valid mod file ModName-1.20.jar with {modid} mods
             mod_name_lines = re.findall(r"valid mod file .*", self.log_mc_debug, re.MULTILINE)
-            self.log(f"[Crash] Found {len(mod_name_lines)} possible mod item lines in debug info")
+            self.log("[Crash] Found %s possible mod item lines in debug info", len(mod_name_lines))
 
             # Find match with keywords
             hint_lines = []
@@ -712,9 +600,9 @@ class MinecraftCrashAnalyzer:
                         hint_lines.append(mod_string)
 
             hint_lines = list(dict.fromkeys(hint_lines))
-            self.log(f"[Crash] Found {len(hint_lines)} possible crash mod matching lines in debug info")
+            self.log("[Crash] Found %s possible crash mod matching lines in debug info", len(hint_lines))
             for mod_line in hint_lines:
-                self.log(f"[Crash]  - {mod_line}")
+                self.log("[Crash]  - %s", mod_line, level=logging.DEBUG)
 
             # Extract mod filenames
             for line in hint_lines:
@@ -729,9 +617,9 @@ class MinecraftCrashAnalyzer:
         if not mod_file_names:
             return None
         else:
-            self.log(f"[Crash] Found {len(mod_file_names)} possible crash mod filenames")
+            self.log("[Crash] Found %s possible crash mod filenames", len(mod_file_names))
             for mod_filename in mod_file_names:
-                self.log(f"[Crash]  - {mod_filename}")
+                self.log("[Crash]  - %s", mod_filename, level=logging.DEBUG)
             return mod_file_names
 
     def get_analysis_result(self) -> str:
@@ -741,134 +629,46 @@ class MinecraftCrashAnalyzer:
         Returns:
             A formatted string explaining the crash reasons
         """
-        if not self.crash_reasons:
-            return "无法确定崩溃原因，请检查完整日志获取更多信息。"
-
-        results = []
-
-        for reason, details in self.crash_reasons.items():
-            if reason in (self.crashdb.crash_reasons.keys()):
-                crash_data = self.crashdb.get_crash_with_rules(reason)
-                if crash_data:
-                    crash_reason = crash_data["crash_reason"]
+        with self.timed("render"):
+            return self.rules.renderer.render(self.crash_reasons, self.omitted_details)
 
-                    formatted_reason = f"崩溃原因：{crash_reason.name}"
-                    if details:
-                        formatted_reason += " -" + details[0].replace("\\n", "\n")
-
-                    results.append(formatted_reason)
-
-            if reason == Special_CrashReason.MOD_MISSING:
-                if details:
-                    DETAIL = '\n'.join(details)
-                    results.append(f"缺少以下依赖Mod:\n{DETAIL}\n\n请安装以上缺失的Mod。")
-                else:
-                    results.append("缺少某些依赖Mod，导致游戏崩溃。\n\n请确保安装了所有必需的Mod。")
-
-            elif reason == Special_CrashReason.MOD_DUPLICATE:
-                if details:
-                    results.append(
-                        f"以下Mod被重复安装:\n{', '.join(details)}\n\n请删除重复的Mod文件，每个Mod只保留一个版本。")
-                else:
-                    results.append("某些Mod被重复安装，导致游戏崩溃。\n\n请检查mods文件夹，确保每个Mod只有一个版本。")
-
-            elif reason == Special_CrashReason.MOD_SUSPECTED:
-                if details:
-                    results.append(
-                        f"以下Mod可能导致了游戏崩溃:\n{', '.join(details)}\n\n尝试暂时移除以上的{len(details)}个Mod，看看是否可以解决问题。")
-                else:
-                    results.append(
-                        "某些Mod可能导致了游戏崩溃，但无法确定具体是哪个Mod。\n\n尝试暂时移除部分Mod，看看是否可以解决问题。")
-
-            elif reason == Special_CrashReason.MOD_CONFIRMED:
-                if details:
-                    results.append(f"以下Mod导致了游戏崩溃:\n{', '.join(details)}\n\n请更新或移除这些Mod。")
-                else:
-                    results.append("某个Mod导致了游戏崩溃。\n\n请检查并更新你的Mod。")
-
-            elif reason == Special_CrashReason.MOD_INIT_FAILED:
-                if details:
-                    results.append(f"以下Mod初始化失败:\n{', '.join(details)}\n\n请尝试更新或重新安装这些Mod。")
-                else:
-                    results.append("某些Mod初始化失败，导致游戏崩溃。\n\n请检查并更新你的Mod。")
-
-            elif reason == Special_CrashReason.MOD_MIXIN_FAILED:
-                results.append(
-                    "Mod的Mixin注入失败，导致游戏崩溃。\n\n这通常是由于Mod间的冲突导致的，请尝试更新或移除最近安装的Mod。")
-
-            elif reason == Special_CrashReason.FABRIC_ERROR:
-                if details and len(details) == 1:
-                    results.append(
-                        f"Fabric提供了以下错误信息:\n{details[0]}\n\n请根据上述信息进行对应处理，如果看不懂英文可以使用翻译软件。")
-                else:
-                    results.append(
-                        "Fabric可能已经提供了错误信息，请根据错误报告中的日志信息进行对应处理，如果看不懂英文可以使用翻译软件。")
-
-            elif reason == Special_CrashReason.FABRIC_SOLUTION:
-                if details and len(details) == 1:
-                    results.append(
-                        f"Fabric提供了以下解决方案:\n{details[0]}\n\n请根据上述信息进行对应处理，如果看不懂英文可以使用翻译软件。")
-                else:
-                    results.append(
-                        "Fabric可能已经提供了解决方案，请根据错误报告中的日志信息进行对应处理，如果看不懂英文可以使用翻译软件。")
-
-            elif reason == Special_CrashReason.FORGE_ERROR:
-                if details and len(details) == 1:
-                    results.append(
-                        f"Forge提供了以下错误信息:\n{details[0]}\n\n请根据上述信息进行对应处理，如果看不懂英文可以使用翻译软件。")
-                else:
-                    results.append(
-                        "Forge可能已经提供了错误信息，请根据错误报告中的日志信息进行对应处理，如果看不懂英文可以使用翻译软件。")
-
-            elif reason == Special_CrashReason.MIXIN_BOOTSTRAP_MISSING:
-                results.append(
-                    "MixinBootstrap缺失，导致游戏崩溃。\n\n这通常是由于Mod配置错误导致的，请重新安装Forge或Fabric。")
-
-            elif reason == Special_CrashReason.BLOCK_ERROR:
-                if details:
-                    results.append(
-                        f"特定方块导致崩溃:\n{details}\n\n请尝试进入游戏世界的其他区域，或者使用MCEdit等工具删除这个位置的方块。\n更多请查阅https://www.bilibili.com/opus/807799450495877206")
-                else:
-                    results.append(
-                        "特定方块导致游戏崩溃。\n\n请尝试进入游戏世界的其他区域，或者使用MCEdit等工具编辑存档。")
-
-            elif reason == Special_CrashReason.ENTITY_ERROR:
-                if details:
-                    results.append(
-                        f"特定实体导致崩溃:\n{details}\n\n请尝试进入游戏世界的其他区域，或者使用MCEdit等工具删除这个实体。")
-                else:
-                    results.append(
-                        "特定实体导致游戏崩溃。\n\n请尝试进入游戏世界的其他区域，或者使用MCEdit等工具编辑存档。")
-
-            elif reason == Special_CrashReason.FILE_VALIDATION_ERROR:
-                results.append(
-                    "部分文件或内容校验失败，导致游戏出现了问题。\n\n请尝试删除游戏（包括Mod）并重新下载，或尝试在重新下载时使用VPN。")
-
-            elif reason == Special_CrashReason.MANUAL_DEBUG_CRASH:
-                results.append("这是一个手动触发的调试崩溃，不是真正的游戏错误。")
-
-            elif reason == Special_CrashReason.STACK_KEYWORD_FOUND:
-                if details:
-                    results.append(
-                        f"堆栈分析发现潜在问题关键字:\n{', '.join(details)}\n\n这些关键字可能表示相关的Mod或组件出现了问题。")
-                else:
-                    results.append("堆栈分析发现了一些潜在的问题，但无法确定具体原因。")
-
-            elif reason == Special_CrashReason.NO_ANALYSIS_FILES:
-                results.append("你的游戏出现了一些问题，但未能找到相关记录文件，因此无法进行分析。")
-
-            elif reason == Special_CrashReason.UNKNOWN:
-                results.append("未能确定崩溃的具体原因，请查看完整的崩溃日志了解更多信息。")
-
-        # Join all results with newlines between them
-        final_result = "\n\n此外，".join(results)
-
-        # Add help message for seeking assistance
-        if any(reason in [Special_CrashReason.FORGE_INCOMPLETE, Special_CrashReason.FABRIC_ERROR, Special_CrashReason.MOD_MISSING,
-                          Special_CrashReason.NO_ANALYSIS_FILES] for reason in self.crash_reasons):
-            final_result += "\n\n如果要寻求帮助，请把错误报告文件发给对方，而不是发送这个窗口的照片或者截图。"
+    def analyze_result(self) -> AnalysisResult:
+        """
+        Analyze the prepared logs and return the structured result
 
-        return final_result
+        Returns:
+            The result with reasons, fired rules, used files, stage timings and the rule set version
+        """
+        text = self.analyze()
+        renderer = self.rules.renderer
+        return AnalysisResult(
+            text=text,
+            reasons=[self._reason_result(reason, details) for reason, details in self.crash_reasons.items()],
+            fired_rules=[self._fired_rule(match) for match in self.fired_rules],
+            files=dict(self.used_files),
+            timings_ms={stage: round(ms, 3) for stage, ms in self.timings.items()},
+            rule_set_version=self.rules.version,
+            contributors=renderer.contributors(self.crash_reasons),
+        )
+
+    def _reason_result(self, reason, details: List[str]) -> ReasonResult:
+        omitted, truncated = self.omitted_details.get(reason, (0, False))
+        return ReasonResult(id=reason if isinstance(reason, str) else reason.name,
+                            name=self.rules.renderer.reason_name(reason),
+                            special=not isinstance(reason, str),
+                            details=tuple(details), omitted=omitted, truncated=truncated)
+
+    def _fired_rule(self, match: RuleMatch) -> FiredRule:
+        # 命中位置是 log_all 中的字符偏移，换算为所在文件中的字节偏移
+        if match.offset < 0:
+            return FiredRule(match.rule_id, match.reason, None)
+        start, file_type = 0, None
+        for segment_start, segment_type in self.log_segments:
+            if segment_start > match.offset:
+                break
+            start, file_type = segment_start, segment_type
+        return FiredRule(match.rule_id, match.reason, file_type,
+                         len(self.log_all[start:match.offset].encode("utf-8")))
 
     def try_analyze_mod_name(self, text: str) -> List[str]:
         """
@@ -880,24 +680,11 @@ class MinecraftCrashAnalyzer:
         Returns:
             List of extracted mod names
         """
-        if not text:
-            return []
+        return RuleEngine.try_analyze_mod_name(text)
 
-        # Remove common prefixes/suffixes
-        text = re.sub(r'(mods\.|com\.|org\.|net\.|io\.)', '', text)
-
-        # Extract the most likely mod name part
-        parts = text.split('.')
-        if len(parts) > 1:
-            # Try to get the most meaningful part
-            candidates = [p for p in parts if len(p) > 2 and not p.isdigit()]
-            if candidates:
-                return [candidates[0]]
-
-        return [text]
-
-    def log(self, param):
-        print(param)
+    def log(self, msg: str, *args, level: int = logging.INFO):
+        """Log an analysis step; arguments are only formatted if the level is enabled"""
+        logger.log(level, msg, *args)
 
 
 class LogLevel(Enum):
@@ -907,92 +694,60 @@ class LogLevel(Enum):
     DEBUG = 3
     FEEDBACK = 4
 
-def start_analyzer(logs_folder):
+def analyze_folder(logs_folder: str) -> AnalysisResult:
     """
-    Start the crash analyzer and return an instance.
+    Analyze the logs in a folder and return the structured result.
+
+    A folder without usable logs yields a result with the NO_ANALYSIS_FILES reason.
     """
-    result = "No analysis performed."
-    # Initialize the crash analyzer
     analyzer = MinecraftCrashAnalyzer(cf.crash_reason_database_path)
-    if analyzer.collect_logs(logs_folder):
-        # Prepare logs for analysis
-        analyzer.prepare_logs()
-        # Perform crash analysis
-        result = analyzer.analyze()
-
-    if not result or not analyzer.crash_reasons:
-        return "NULL"
-    if Special_CrashReason.UNKNOWN in analyzer.crash_reasons.keys() or Special_CrashReason.NO_ANALYSIS_FILES in analyzer.crash_reasons.keys():
-        return "NULL"
-
-    contributors = []
-    for reason, details in analyzer.crash_reasons.items():
-        if isinstance(reason, str):
-            # Use the new method to get promoters
-            promoters = analyzer.crashdb.get_promoters_for_crash(reason)
-            if promoters:
-                contributors.extend([p.name for p in promoters])
-        elif isinstance(reason, Special_CrashReason):
-            contributors.append(reason.value[1])
-
-    contributors_str = ", ".join(list(set(contributors)))
-
-    analyzer_result_message = "--- Analysis Result ---" + "\n" + result + "\n" + "--- Detected Crash Reasons ---" + "\n" + \
-        "\n".join([f"- {reason}: {analyzer.crash_reasons[reason].name}" for reason, details in analyzer.crash_reasons.items()]) + \
-        "\n\n" + "--- Analysis Contributor ---" + "\n" + \
-        f"This analysis item(s) was contributed by: {contributors_str}"
-
+    with Metrics.timer("collect"):
+        collected = analyzer.collect_logs(logs_folder)
+    Metrics.BYTES.inc(analyzer.bytes_read, source="logs")
+    if collected:
+        with Metrics.timer("prepare"):
+            analyzer.prepare_logs()
+    result = analyzer.analyze_result()
+    # 统计数据由后台线程定期写入，退出时再写一次，不在回复路径上等待磁盘
+    RULE_STATS.start_flushing()
+
+    Metrics.JOBS.inc(outcome="conclusive" if result.conclusive else "inconclusive")
+    for reason in result.reasons:
+        Metrics.CRASH_REASONS.inc(reason=reason.id)
+    return result
+
+
+def start_analyzer(logs_folder, json_output: bool = False):
+    """
+    Analyze a folder and return the reply of the bot.
 
+    Args:
+        logs_folder: Folder containing the logs
+        json_output: Return the result as one line of JSON instead of text
 
-    return analyzer_result_message
+    Returns:
+        The JSON line, or the text report; "NULL" in text mode when no crash reason was identified
+    """
+    result = analyze_folder(logs_folder)
+    if json_output:
+        return result.to_json()
+    if not result.conclusive:
+        return "NULL"
+    return result.report()
 
 if __name__ == "__main__":
-    # Example usage of MinecraftCrashAnalyzer
-    import sys
-
-    # Check if a folder path is provided as a command-line argument
-    if len(sys.argv) < 2:
-        print("Usage: python main.py <path_to_logs_folder>")
-        sys.exit(1)
-
-    logs_folder = sys.argv[1]
-
-    # Initialize the crash analyzer
-    analyzer = MinecraftCrashAnalyzer(cf.crash_reason_database_path)
-
-    # Collect logs from the specified folder
-    if analyzer.collect_logs(logs_folder):
-        # Prepare logs for analysis
-        analyzer.prepare_logs()
-
-        # Perform crash analysis
-        result = analyzer.analyze()
-
-        # Print the analysis result
-        print("\n--- Analysis Result ---")
-        print(result)
-
-        # Print detected crash reasons
-        print("\n--- Detected Crash Reasons ---")
-        for reason, details in analyzer.crash_reasons.items():
-            if type(reason) is str:
-                print(f"- {reason}: {analyzer.crashdb.get_crash_reason(reason).name}")
-            else:
-                print(f"- {reason.value[0]}: {analyzer.crash_reasons[reason].name}")
-
-        print("\n--- Analysis Contributor ---")
-        contributors = []
-        for reason, details in analyzer.crash_reasons.items():
-            if isinstance(reason, str):
-                # Use the new method to get promoters
-                promoters = analyzer.crashdb.get_promoters_for_crash(reason)
-                if promoters:
-                    contributors.extend([p.name for p in promoters])
-            elif isinstance(reason, Special_CrashReason):
-                contributors.append(reason.value[1])
-
-        contributors = list(set(contributors))
-        print(f"This analysis item(s) was contributed by: {', '.join(contributors)}")
-
-    else:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Analyze Minecraft crash logs")
+    parser.add_argument("logs_folder", help="Folder containing the crash logs")
+    parser.add_argument("--json", action="store_true", help="Print the result as one line of JSON")
+    args = parser.parse_args()
+
+    setup_logging(cf.log_level, cf.log_file)
+    result = analyze_folder(args.logs_folder)
+    if args.json:
+        print(result.to_json())
+    elif not result.files:
         print("No valid logs found in the specified folder.")
+    else:
+        print(result.report())
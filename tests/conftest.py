@@ -0,0 +1,33 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 模块位于仓库根目录，测试从 tests/ 目录直接导入；配置中的数据路径相对于仓库根目录
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from CrashDatabase import CrashReasonDatabase  # noqa: E402
+from CrashStorage import TABLES  # noqa: E402
+
+
+@pytest.fixture
+def make_database(tmp_path):
+    """Create a JSON crash database in a temporary folder from {table: {key: record}}"""
+    def make(**tables) -> CrashReasonDatabase:
+        for table in TABLES:
+            with open(tmp_path / f"{table}.json", "w", encoding="utf-8") as file:
+                json.dump(tables.get(table, {}), file, ensure_ascii=False)
+        return CrashReasonDatabase.in_folder(str(tmp_path))
+    return make
+
+
+def reason(reason_id: str, priority: int = 0, description: str = "") -> dict:
+    return {"id": reason_id, "name": reason_id, "description": description or reason_id, "priority": priority}
+
+
+def rule(rule_id: str, reason_id: str, match: str, match_type: int = 0, terminal: bool = False) -> dict:
+    return {"id": rule_id, "crash_reason_id": reason_id, "match_type": match_type, "match": match, "terminal": terminal}
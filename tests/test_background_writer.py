@@ -0,0 +1,121 @@
+import json
+import threading
+import time
+
+import pytest
+
+from CrashDatabase import CrashReason, CrashReasonDatabase
+from CrashStorage import BackgroundWriter, CrashStorage
+
+
+class MemoryStorage(CrashStorage):
+    """Records every save_many call; the first `failures` calls raise"""
+
+    def __init__(self, failures=0, gate=None):
+        self.failures = failures
+        self.gate = gate
+        self.calls = []
+        self.tables = {}
+
+    def save_many(self, tables):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        self.calls.append(dict(tables))
+        self.tables.update(tables)
+
+
+@pytest.fixture
+def writers():
+    created = []
+
+    def make(storage, **options):
+        writer = BackgroundWriter(storage, **options)
+        created.append(writer)
+        return writer
+
+    yield make
+    for writer in created:
+        writer.close(timeout=5)
+
+
+def test_submissions_are_coalesced(writers):
+    storage = MemoryStorage()
+    writer = writers(storage, delay=10, max_delay=10)
+    writer.submit({"persons": {"1": "a"}})
+    writer.submit({"persons": {"1": "b"}, "crash_reasons": {}})
+    writer.submit({})
+    assert writer.status() == (2, False, {})
+    assert writer.flush(timeout=5)
+    assert storage.calls == [{"persons": {"1": "b"}, "crash_reasons": {}}]
+    assert writer.status() == (0, False, {})
+
+
+def test_debounced_write_without_flush(writers):
+    storage = MemoryStorage()
+    writer = writers(storage, delay=0.01)
+    writer.submit({"persons": {}})
+    deadline = time.monotonic() + 5
+    while not storage.calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert storage.calls == [{"persons": {}}]
+
+
+def test_failed_write_is_retried(writers):
+    storage = MemoryStorage(failures=1)
+    writer = writers(storage, delay=10, max_delay=10, retry_delay=10)
+    writer.submit({"persons": {"1": "a"}})
+    # 第一次写入失败，flush 不等待重试
+    assert not writer.flush(timeout=5)
+    pending, _, failed = writer.status()
+    assert pending == 1 and failed == {"persons": "disk full"}
+
+    # 再次 flush 时立即重试，不等待 retry_delay
+    assert writer.flush(timeout=5)
+    assert storage.tables == {"persons": {"1": "a"}}
+    assert writer.status() == (0, False, {})
+
+
+def test_newer_data_wins_over_failed_write(writers):
+    gate = threading.Event()
+    storage = MemoryStorage(failures=1, gate=gate)
+    writer = writers(storage, delay=0, retry_delay=0.05)
+    writer.submit({"persons": {"1": "old"}})
+    deadline = time.monotonic() + 5
+    while not writer.status()[1] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # 写入进行中提交的新数据不会被失败的旧数据覆盖
+    writer.submit({"persons": {"1": "new"}})
+    gate.set()
+    writer.flush(timeout=5)
+    assert writer.flush(timeout=5)
+    assert storage.tables == {"persons": {"1": "new"}}
+
+
+def test_close_writes_pending_and_rejects_submissions():
+    storage = MemoryStorage()
+    writer = BackgroundWriter(storage, delay=10, max_delay=10)
+    writer.submit({"persons": {}})
+    assert writer.close(timeout=5)
+    assert storage.calls == [{"persons": {}}]
+    assert not writer._thread.is_alive()
+    with pytest.raises(RuntimeError):
+        writer.submit({"persons": {}})
+
+
+def test_database_background_writer(make_database, tmp_path):
+    database = make_database()
+    writer = database.start_background_writer(delay=10)
+    assert database.start_background_writer() is writer
+    assert database.add_crash_reason(CrashReason("OOM", "Out of memory", "", 0))
+    assert writer.status()[0] >= 1
+    assert database.flush()
+    with open(tmp_path / "crash_reasons.json", encoding="utf-8") as file:
+        assert "OOM" in json.load(file)
+
+    assert database.add_crash_reason(CrashReason("GL", "OpenGL", "", 0))
+    assert database.stop_background_writer(timeout=5)
+    assert database.writer is None
+    assert "GL" in CrashReasonDatabase.in_folder(str(tmp_path)).crash_reasons
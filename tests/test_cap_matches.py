@@ -0,0 +1,96 @@
+import re
+
+import pytest
+
+import main
+import RuleEngine
+from ResultRenderer import ResultRenderer
+from RuleEngine import MATCH_LIMIT, cap_matches, regex_details
+
+
+def items(details):
+    return [(None, detail, offset) for offset, detail in enumerate(details)]
+
+
+def test_keeps_everything_below_the_limit():
+    assert cap_matches(items(["a", "b"]), 5) == (items(["a", "b"]), 0, False)
+
+
+def test_duplicates_are_dropped_and_first_offset_kept():
+    kept, _, _ = cap_matches(items(["a", "b", "a", "b", "c"]), 5)
+    assert kept == [(None, "a", 0), (None, "b", 1), (None, "c", 4)]
+
+
+def test_duplicates_are_kept_when_not_unique():
+    assert len(cap_matches(items(["a", "a", "a"]), 5, unique=False)[0]) == 3
+
+
+def test_matches_beyond_the_limit_are_counted():
+    kept, omitted, truncated = cap_matches(items([str(n) for n in range(10)]), 3)
+    # 只保留真实的匹配项，摘要由渲染器生成
+    assert kept == items(["0", "1", "2"])
+    assert (omitted, truncated) == (7, False)
+
+
+def test_none_items_are_skipped():
+    assert cap_matches([None, (None, "a", 3), None], 5) == ([(None, "a", 3)], 0, False)
+
+
+def test_scanning_stops_at_the_scan_limit(monkeypatch):
+    monkeypatch.setattr(RuleEngine, "MATCH_SCAN_LIMIT", 50)
+    consumed = []
+
+    def generate():
+        for n in range(1000):
+            consumed.append(n)
+            yield None, str(n), n
+
+    kept, omitted, truncated = cap_matches(generate(), 3)
+    assert len(consumed) == 51
+    assert len(kept) == 3 and (omitted, truncated) == (47, True)
+
+
+def test_regex_details_dedupes_repeated_lines():
+    text = "Missing mod foo\n" * 500 + "Missing mod bar\n"
+    kept, omitted, _ = regex_details(re.compile(r"Missing mod (\w+)"), "mod [[1]]", text)
+    assert [detail for _, detail, _ in kept] == ["mod foo", "mod bar"] and omitted == 0
+
+
+def test_regex_details_caps_distinct_matches():
+    text = "".join(f"Missing mod m{n}\n" for n in range(MATCH_LIMIT + 5))
+    kept, omitted, _ = regex_details(re.compile(r"Missing mod (\w+)"), "mod [[1]]", text)
+    assert len(kept) == MATCH_LIMIT and omitted == 5
+
+
+@pytest.fixture
+def suspected_result(tmp_path):
+    # 超过上限的可疑Mod
+    lines = "".join(f"Suspected Mod: mod{n}, Version: 1.0\n" for n in range(MATCH_LIMIT + 5))
+    (tmp_path / "crash-2024.txt").write_text("---- Minecraft Crash Report ----\n" + lines + "\tat net.x\n", encoding="utf-8")
+    analyzer = main.MinecraftCrashAnalyzer()
+    analyzer.collect_logs(str(tmp_path))
+    analyzer.prepare_logs()
+    return analyzer.analyze_result()
+
+
+def test_capped_special_reason_text(suspected_result):
+    text = suspected_result.text
+    # {count} 只统计列出的Mod，摘要单独成行
+    assert f"尝试暂时移除以上的{MATCH_LIMIT}个Mod" in text
+    assert text.count("模组，其在游戏中的版本号为") == MATCH_LIMIT
+    assert "\n……以及另外 5 项\n" in text
+
+
+def test_capped_special_reason_json(suspected_result):
+    reason, = [reason for reason in suspected_result.to_dict()["reasons"] if reason["id"] == "MOD_SUSPECTED"]
+    assert len(reason["details"]) == MATCH_LIMIT
+    assert not any("以及另外" in detail for detail in reason["details"])
+    assert (reason["omitted"], reason["truncated"]) == (5, False)
+
+
+def test_renderer_summary_for_truncated_scan(make_database):
+    renderer = ResultRenderer(make_database())
+    reasons = {main.Special_CrashReason.MOD_DUPLICATE: ["a.jar", "b.jar"]}
+    text = renderer.render(reasons, {main.Special_CrashReason.MOD_DUPLICATE: (7, True)})
+    assert "a.jar, b.jar\n……以及另外至少 7 项\n" in text
+    assert "以及另外" not in renderer.render(reasons)
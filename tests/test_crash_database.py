@@ -0,0 +1,80 @@
+from conftest import reason, rule
+from CrashDatabase import CrashReasonDatabase, DetectionRule, stable_rule_id
+
+
+def make(make_database):
+    return make_database(
+        crash_reasons={"OOM": reason("OOM"), "GL": reason("GL")},
+        detection_rules={"r1": rule("r1", "OOM", "Java heap space"), "r2": rule("r2", "OOM", "Out of memory"),
+                         "r3": rule("r3", "GL", "OpenGL error")},
+        persons={"1": {"id": 1, "name": "Alice"}},
+        crash_promoters={"OOM_1": {"crash_reason_id": "OOM", "person_id": 1}},
+        rule_contributors={"r1_1": {"rule_id": "r1", "person_id": 1}, "r3_1": {"rule_id": "r3", "person_id": 1}})
+
+
+def test_delete_crash_reason_cascades_to_rules(make_database, tmp_path):
+    database = make(make_database)
+    before = database.snapshot()
+    version = database.version
+
+    assert database.delete_crash_reason("OOM")
+    assert list(database.detection_rules) == ["r3"]
+    assert list(database.detection_rule_models) == ["r3"]
+    assert "OOM" not in database.rules_by_crash
+    assert list(database.rule_contributors) == ["r3_1"] and "r1" not in database.contributors_by_rule
+    assert database.crash_promoters == {} and "OOM" not in database.promoters_by_crash
+    # 一次删除只发布一个新版本，旧快照不受影响
+    assert database.version == version + 1
+    assert database.snapshot().detection_rules.keys() == {"r3"}
+    assert before.detection_rules.keys() == {"r1", "r2", "r3"}
+    assert [r.id for r in before.get_detection_rules_for_crash("OOM")] == ["r1", "r2"]
+
+    reloaded = CrashReasonDatabase.in_folder(str(tmp_path))
+    assert set(reloaded.detection_rules) == {"r3"} and set(reloaded.rule_contributors) == {"r3_1"}
+    assert reloaded.crash_promoters == {}
+
+
+def test_delete_inside_batch_saves_once(make_database, tmp_path, monkeypatch):
+    database = make(make_database)
+    saved = []
+    monkeypatch.setattr(database.storage, "save_many", lambda tables: saved.append(sorted(tables)))
+    monkeypatch.setattr(database.storage, "save", lambda table, data: saved.append([table]))
+    with database.batch():
+        assert database.delete_crash_reason("OOM")
+        assert saved == []
+    assert saved == [["crash_promoters", "crash_reasons", "detection_rules", "rule_contributors"]]
+
+
+def test_change_detection_rule_rekeys_by_content(make_database, tmp_path):
+    database = make(make_database)
+    new_id = database.change_detection_rule("r1", "OOM", 0, "Java heap space exhausted")
+    assert new_id == stable_rule_id("OOM", 0, "Java heap space exhausted")
+    # 在原因中的位置不变，贡献者随规则转移
+    assert list(database.rules_by_crash["OOM"]) == [new_id, "r2"]
+    assert list(database.detection_rules) == [new_id, "r2", "r3"]
+    assert database.detection_rules[new_id]["id"] == new_id
+    assert [person.name for person in database.get_contributors_for_rule(new_id)] == ["Alice"]
+    assert "r1" not in database.contributors_by_rule
+
+    # 旧内容可以重新添加，不再与修改后的规则冲突
+    old = DetectionRule(stable_rule_id("OOM", 0, "Java heap space"), "OOM", 0, "Java heap space")
+    assert database.add_detection_rule(old)
+    assert set(CrashReasonDatabase.in_folder(str(tmp_path)).detection_rules) == {new_id, "r2", "r3", old.id}
+
+
+def test_change_detection_rule_refuses_duplicate_content(make_database):
+    database = make(make_database)
+    first = database.change_detection_rule("r1", "OOM", 1, "heap")
+    assert database.change_detection_rule("r2", "OOM", 1, "heap") is None
+    assert set(database.rules_by_crash["OOM"]) == {first, "r2"}
+    # 内容不变时保留原来的ID
+    assert database.change_detection_rule("r2", "OOM", 0, "Out of memory") == "r2"
+
+
+def test_change_detection_rule_moves_between_reasons(make_database):
+    database = make(make_database)
+    new_id = database.change_detection_rule("r3", "OOM", 0, "OpenGL error")
+    assert new_id == stable_rule_id("OOM", 0, "OpenGL error")
+    assert "GL" not in database.rules_by_crash
+    assert list(database.rules_by_crash["OOM"]) == ["r1", "r2", new_id]
+    assert database.change_detection_rule(new_id, "NOPE", 0, "x") is None
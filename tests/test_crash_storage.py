@@ -0,0 +1,38 @@
+import json
+
+from CrashStorage import JsonStorage, SqliteStorage, TABLES, import_json
+
+from conftest import reason, rule
+
+
+def json_storage(folder) -> JsonStorage:
+    return JsonStorage({table: str(folder / f"{table}.json") for table in TABLES})
+
+
+def test_json_sqlite_json_round_trip_keeps_nulls(tmp_path):
+    # match 显式为 null 的规则、缺少 match 的规则和带额外字段的规则
+    no_match = rule("r2", "R", None, match_type=4)
+    missing = rule("r3", "R", "x")
+    del missing["match"]
+    tables = {
+        "persons": {"1": {"id": 1, "name": None}},
+        "crash_reasons": {"R": reason("R")},
+        "detection_rules": {"r1": rule("r1", "R", "boom"), "r2": no_match, "r3": missing},
+    }
+    source_dir, target_dir = tmp_path / "source", tmp_path / "target"
+    source_dir.mkdir()
+    target_dir.mkdir()
+    for table in TABLES:
+        (source_dir / f"{table}.json").write_text(json.dumps(tables.get(table, {})), encoding="utf-8")
+
+    sqlite = SqliteStorage(str(tmp_path / "crash.db"))
+    import_json(json_storage(source_dir), sqlite)
+    target = json_storage(target_dir)
+    for table in TABLES:
+        target.save(table, SqliteStorage(str(tmp_path / "crash.db")).load(table))
+
+    for table in TABLES:
+        assert target.load(table) == tables.get(table, {})
+    assert target.load("detection_rules")["r2"]["match"] is None
+    assert "match" not in target.load("detection_rules")["r3"]
+    sqlite.close()
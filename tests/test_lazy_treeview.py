@@ -0,0 +1,132 @@
+import pytest
+
+tk = pytest.importorskip("tkinter")
+
+from databaseManager import LazyTreeview
+
+
+class FakeTree:
+    # 只实现 LazyTreeview 用到的 Treeview 方法，测试不需要显示器
+    def __init__(self):
+        self.rows = []
+        self.values = {}
+        self.idle = []
+        self.selected = None
+        self.seen = None
+
+    def configure(self, **options):
+        pass
+
+    def after_idle(self, callback):
+        self.idle.append(callback)
+
+    def insert(self, parent, index, iid, values):
+        assert iid not in self.values
+        self.rows.insert(len(self.rows) if index == tk.END else index, iid)
+        self.values[iid] = values
+
+    def delete(self, *iids):
+        for iid in iids:
+            self.rows.remove(iid)
+            del self.values[iid]
+
+    def get_children(self):
+        return tuple(self.rows)
+
+    def exists(self, iid):
+        return iid in self.values
+
+    def item(self, iid, values):
+        self.values[iid] = values
+
+    def selection_set(self, iid):
+        self.selected = iid
+
+    def see(self, iid):
+        self.seen = iid
+
+
+class FakeScrollbar:
+    def set(self, first, last):
+        self.position = (first, last)
+
+
+@pytest.fixture
+def view():
+    labels = {}
+    lazy = LazyTreeview(FakeTree(), FakeScrollbar(), lambda key: (key, labels.get(key, "")), page_size=3)
+    lazy.labels = labels
+    return lazy
+
+
+def keys(count):
+    return [f"k{i}" for i in range(count)]
+
+
+def test_set_keys_loads_first_page(view):
+    view.set_keys(keys(7))
+    assert view.tree.rows == ["k0", "k1", "k2"]
+    view.set_keys(["a", "b"])
+    assert view.tree.rows == ["a", "b"] and view.loaded == 2
+
+
+def test_scrolling_near_end_loads_next_page_once(view):
+    view.set_keys(keys(7))
+    view._on_scroll("0.0", "0.5")
+    assert view.tree.idle == []
+    view._on_scroll("0.5", "1.0")
+    view._on_scroll("0.5", "1.0")
+    assert len(view.tree.idle) == 1
+    view.tree.idle.pop()()
+    assert view.tree.rows == keys(6)
+    view._on_scroll("0.5", "1.0")
+    view.tree.idle.pop()()
+    assert view.tree.rows == keys(7)
+    # 全部加载后不再排队
+    view._on_scroll("0.5", "1.0")
+    assert view.tree.idle == []
+
+
+def test_insert_only_adds_rows_inside_loaded_range(view):
+    view.set_keys(keys(5))
+    view.insert("new", 1)
+    assert view.tree.rows == ["k0", "new", "k1", "k2"]
+    view.insert("late", 5)
+    assert "late" not in view.tree.rows
+    assert view.keys[5] == "late"
+
+
+def test_insert_appends_when_everything_is_loaded(view):
+    view.set_keys(keys(2))
+    view.insert("new", 2)
+    assert view.tree.rows == ["k0", "k1", "new"] and view.loaded == 3
+
+
+def test_remove(view):
+    view.set_keys(keys(5))
+    view.remove("k1")
+    view.remove("k4")
+    view.remove("missing")
+    assert view.keys == ["k0", "k2", "k3"]
+    assert view.tree.rows == ["k0", "k2"] and view.loaded == 2
+
+
+def test_reveal_loads_pages_until_key(view):
+    view.set_keys(keys(10))
+    assert view.reveal("k7")
+    assert view.tree.rows == keys(9)
+    assert view.tree.selected == view.tree.seen == "k7"
+    assert not view.reveal("missing")
+
+
+def test_place_updates_or_moves(view):
+    view.set_keys(keys(5))
+    view.labels["k1"] = "edited"
+    view.place("k1", 1)
+    assert view.tree.values["k1"] == ("k1", "edited")
+    view.place("k2", 0)
+    assert view.keys[:3] == ["k2", "k0", "k1"]
+    assert view.tree.rows == ["k2", "k0", "k1"]
+    # 新键放在未加载的位置时只记录顺序
+    view.place("k9", 5)
+    assert view.keys[5] == "k9" and not view.tree.exists("k9")
@@ -0,0 +1,49 @@
+import pickle
+
+from LiteralScanner import LiteralScanner, literal_pattern
+
+
+def scanner(*literals):
+    result = LiteralScanner()
+    for key, literal, ignore_case, word_boundary in literals:
+        result.add(key, literal, ignore_case, word_boundary)
+    result.compile()
+    return result
+
+
+def test_first_offsets_and_case():
+    literals = scanner(("loader", "Forge", True, False), ("exact", "Forge", False, False), ("miss", "fabric", False, False))
+    hits = literals.scan("using forge 1.20, later Forge")
+    assert hits.found() == ["loader", "exact"]
+    assert hits.offset("loader") == 6 and hits.offset("exact") == 24
+    assert hits.offset("miss") is None and "miss" not in hits
+
+
+def test_overlapping_literals_at_same_position():
+    literals = scanner(("short", "Out", False, False), ("long", "OutOfMemory", False, False),
+                       ("inner", "Memory", False, False), ("same", "out", True, False))
+    hits = literals.scan("java.lang.OutOfMemoryError")
+    assert [hits.offset(key) for key in ("short", "long", "inner", "same")] == [10, 10, 15, 10]
+
+
+def test_word_boundaries():
+    literals = scanner(("word", "gl error", True, True), ("symbol", ".jar", True, True))
+    assert literals.scan("xgl error gl errors").found() == []
+    hits = literals.scan("GL ERROR in mod.JAR!")
+    assert hits.offset("word") == 0 and hits.offset("symbol") == 15
+
+
+def test_matches_literal_pattern():
+    text = "Caused by: MixinApplyError ... mixinapplyerror_x MIXINAPPLYERROR."
+    literals = scanner(("a", "mixinapplyerror", True, True), ("b", "ApplyError", False, False))
+    hits = literals.scan(text)
+    assert hits.offset("a") == literal_pattern("mixinapplyerror", True, True).search(text).start()
+    assert hits.offset("b") == literal_pattern("ApplyError").search(text).start()
+
+
+def test_pickled_scanner_keeps_only_full_pattern():
+    literals = scanner(("a", "alpha", False, False), ("b", "beta", False, False))
+    literals.scan("alpha")
+    restored = pickle.loads(pickle.dumps(literals))
+    assert list(restored._patterns) == [0b11]
+    assert restored.scan("beta alpha").found() == ["a", "b"]
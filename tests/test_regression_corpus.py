@@ -0,0 +1,15 @@
+import json
+import os
+
+from conftest import ROOT
+from RegressionCorpus import EXPECTED_FILE_NAME, run_corpus
+
+CORPUS = os.path.join(ROOT, "regression_corpus")
+
+
+def test_corpus_output_is_unchanged():
+    with open(os.path.join(CORPUS, EXPECTED_FILE_NAME), "r", encoding="utf-8") as file:
+        expected = json.load(file)
+    outputs, _ = run_corpus(CORPUS)
+    # 与 RegressionCorpus.py check 一样经过 JSON 往返再比较
+    assert json.loads(json.dumps(outputs, ensure_ascii=False)) == expected
@@ -0,0 +1,45 @@
+import re
+
+import pytest
+
+from RuleEngine import required_literal
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    (r"Caught exception from (\S+)", "Caught exception from "),
+    (r"\tBlock location: World: \(", "\tBlock location: World: ("),
+    (r"abc\d{1000}", "abc"),
+    (r"Abcd{2}", "Abc"),
+    (r"x{10,20}y", None),
+    (r"abc{,3}d", None),
+    (r"x{3,}yz", None),
+    (r"foo{bar", "foo{bar"),
+    (r"\x41BCD", "ABCD"),
+    (r"ABCD", "ABCD"),
+    (r"\U00000041BCD", "ABCD"),
+    (r"\N{LATIN SMALL LETTER A}bcd", "abcd"),
+    (r"\101bcd", "Abcd"),
+    (r"(ab)\1xyz", "xyz"),
+    (r"(\w+)\1{2}", None),
+    (r"ab\.cd", "ab.cd"),
+    (r"(?i)abcdef", None),
+    (r"abc|def", None),
+    (r"(abc|def)ghi", "ghi"),
+    (r"[abc]{2}", None),
+])
+def test_required_literal(pattern, expected):
+    assert required_literal(pattern) == expected
+
+
+@pytest.mark.parametrize("pattern, text", [
+    (r"x{10,20}y", "x" * 15 + "y"),
+    (r"abc\d{1000}", "abc" + "1" * 1000),
+    (r"\x41BCD", "ABCD"),
+    (r"\101bcd", "Abcd"),
+    (r"Found duplicate mods:\s+(\S+)", "Found duplicate mods:\n  foo"),
+])
+def test_literal_is_part_of_every_match(pattern, text):
+    # 预筛选字面量不在匹配中时，规则永远不会触发
+    assert re.search(pattern, text, re.DOTALL)
+    literal = required_literal(pattern)
+    assert literal is None or literal in text
@@ -0,0 +1,104 @@
+import pytest
+
+from conftest import reason, rule
+from CrashDatabase import CrashReason, CrashReasonDatabase, stable_rule_id
+from RuleImporter import ImportedRule, RuleImporter, semantic_key
+
+
+@pytest.mark.parametrize("a, b", [
+    ((0, "OpenGL Error"), (0, "opengl error")),
+    ((1, r"Found duplicate mods\:"), (1, "Found duplicate mods:")),
+    ((1, r"a\tb"), (1, "a\tb")),
+    ((1, r"\x41\u0042"), (1, "AB")),        # 与引擎的预筛选使用同一套转义解析
+    ((1, r"a{b"), (1, r"a\{b")),            # 不构成量词的 { 是普通字符
+])
+def test_semantic_key_equal(a, b):
+    assert semantic_key(*a) == semantic_key(*b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ((0, "abc"), (1, "abc")),               # 关键词需要单词边界，与同样内容的正则不同
+    ((1, "Abc"), (1, "abc")),               # 正则区分大小写
+    ((1, r"a.c"), (1, r"a\.c")),
+    ((1, r"\d+"), (1, r"\d*")),
+    ((1, r"a{2}"), (1, r"a\{2\}")),
+])
+def test_semantic_key_different(a, b):
+    assert semantic_key(*a) != semantic_key(*b)
+
+
+@pytest.fixture
+def importer(make_database, tmp_path):
+    database = make_database(
+        crash_reasons={"OOM": reason("OOM"), "GL": reason("GL")},
+        detection_rules={"r1": rule("r1", "OOM", "Java heap space"),
+                         "r2": rule("r2", "GL", r"OpenGL error (\d+)", match_type=1)},
+        persons={"1": {"id": 1, "name": "Alice"}})
+    return RuleImporter(database, str(tmp_path / "special_rules.json"))
+
+
+def test_import_adds_rules_with_stable_ids(importer):
+    report = importer.import_rules([ImportedRule("OOM", "keyword", "  Out of memory  ", ["Alice", "Bob"], "a")])
+    rule_id = stable_rule_id("OOM", 0, "Out of memory")
+    assert report.added == [rule_id]
+    assert report.committed
+    database = importer.database
+    assert database.detection_rules[rule_id]["match"] == "Out of memory"
+    assert sorted(person.name for person in database.get_contributors_for_rule(rule_id)) == ["Alice", "Bob"]
+    assert report.persons_added == ["Bob"]
+
+
+def test_import_is_saved(importer, tmp_path):
+    report = importer.import_rules([ImportedRule("GL", 1, r"GL_INVALID_(\w+)", [], "a")])
+    reloaded = CrashReasonDatabase.in_folder(str(tmp_path))
+    assert set(report.added) <= set(reloaded.detection_rules)
+
+
+def test_duplicates_and_conflicts_are_skipped(importer):
+    report = importer.import_rules([
+        ImportedRule("OOM", 0, "JAVA HEAP SPACE", [], "same reason"),
+        ImportedRule("GL", 0, "java heap space", [], "other reason"),
+        ImportedRule("OOM", "exact", "Unable to allocate", [], "new"),
+        ImportedRule("OOM", "exact", "unable to allocate", [], "repeated in batch"),
+    ])
+    assert report.duplicates == [("same reason", "r1"), ("repeated in batch", report.added[0])]
+    assert report.conflicts == [("other reason", "r1")]
+    assert len(report.added) == 1
+
+
+def test_reimport_adds_nothing(importer):
+    rules = [ImportedRule("OOM", 0, "Out of memory", [], "a"), ImportedRule("GL", 1, r"GL_(\w+)", [], "b")]
+    first = importer.import_rules(rules)
+    second = importer.import_rules(rules)
+    assert len(first.added) == 2
+    assert second.added == []
+    assert sorted(rule_id for _, rule_id in second.duplicates) == sorted(first.added)
+
+
+def test_invalid_rules_are_reported(importer):
+    report = importer.import_rules([
+        ImportedRule("OOM", 1, "broken (", [], "regex"),
+        ImportedRule("OOM", 0, "   ", [], "empty"),
+        ImportedRule("OOM", "fuzzy", "x", [], "type"),
+        ImportedRule("NOPE", 0, "x", [], "reason"),
+        ImportedRule("OOM", [1], "x", [], "list type"),
+        ImportedRule("OOM", {"type": 1}, "x", [], "dict type"),
+        ImportedRule("OOM", True, "x", [], "bool type"),
+        ImportedRule("OOM", 0, ["x"], [], "list match"),
+    ])
+    assert [source for source, _ in report.invalid] == ["regex", "empty", "type", "reason", "list type",
+                                                        "dict type", "bool type", "list match"]
+    assert report.added == []
+
+
+def test_new_reasons_and_dry_run(importer):
+    new_reason = CrashReason("DISK", "Disk full", "No space left", 0)
+    rules = [ImportedRule("DISK", 0, "No space left on device", ["Carol"], "a")]
+    report = importer.import_rules(rules, [new_reason], {"DISK": ["Carol"]}, dry_run=True)
+    assert report.reasons_added == ["DISK"] and len(report.added) == 1
+    assert not report.committed
+    assert "DISK" not in importer.database.crash_reasons
+
+    report = importer.import_rules(rules, [new_reason], {"DISK": ["Carol"]})
+    assert report.committed
+    assert [person.name for person in importer.database.get_promoters_for_crash("DISK")] == ["Carol"]
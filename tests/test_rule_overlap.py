@@ -0,0 +1,70 @@
+from conftest import reason, rule
+from RuleEngine import CompiledRuleSet
+from RuleOverlap import analyze, contains_literal, reduce_rules
+
+RULES = {
+    "oom_1": rule("oom_1", "OOM", "Java heap space"),
+    "oom_2": rule("oom_2", "OOM", "java HEAP space"),
+    "oom_3": rule("oom_3", "OOM", "java.lang.OutOfMemoryError: Java heap space"),
+    "oom_4": rule("oom_4", "OOM", r"OutOfMemoryError: Java heap space\n.*at", match_type=1),
+    "oom_5": rule("oom_5", "OOM", r"OutOfMemoryError: Java heap space \((\w+)\)", match_type=1),
+    "gl_1": rule("gl_1", "GL", "OpenGL Error"),
+    "gl_2": rule("gl_2", "GL", "heap space"),
+    "heap_1": rule("heap_1", "GL", "heaps"),
+}
+
+
+def kinds(findings):
+    return {(finding.kind, finding.rule_id, finding.covered_by) for finding in findings}
+
+
+def test_contains_literal_respects_word_boundaries():
+    assert contains_literal("Java heap space", "heap space", True)
+    assert not contains_literal("Java heaps space", "heap", True)
+    # 外层字面量两端的边界只有在它本身是关键词时才有保证
+    assert contains_literal("heap", "heap", True)
+    assert not contains_literal("heap", "heap", False)
+
+
+def test_regex_literal_needs_a_guaranteed_boundary():
+    # space 后面可以是任意字符（例如 spaces），关键词 Java heap space 不一定命中
+    assert not analyze({"k": rule("k", "A", "Java heap space"),
+                        "r": rule("r", "A", r"OutOfMemoryError: Java heap space.*at", match_type=1)})
+
+
+def test_findings():
+    found = kinds(analyze(RULES))
+    assert ("duplicate", "oom_2", "oom_1") in found
+    assert ("subsumed", "oom_3", "oom_1") in found
+    assert ("redundant_regex", "oom_4", "oom_1") in found
+    # 提取了信息的正则不是多余的
+    assert not any(rule_id == "oom_5" for _, rule_id, _ in found)
+    # Java heap space 包含了另一个原因的关键词 heap space，只报告为重叠
+    assert ("overlap", "oom_1", "gl_2") in found
+    assert not any(rule_id == "heap_1" for _, rule_id, _ in found)
+
+
+def test_cross_reason_findings_are_not_removed():
+    findings = analyze({"a": rule("a", "A", "Java heap space"), "b": rule("b", "B", "heap space")})
+    assert [(finding.kind, finding.same_reason) for finding in findings] == [("overlap", False)]
+    assert set(reduce_rules({"a": rule("a", "A", "Java heap space"), "b": rule("b", "B", "heap space")})) == {"a", "b"}
+
+
+def test_reduction_keeps_the_reported_reasons(make_database):
+    reduced = reduce_rules(RULES)
+    assert set(RULES) - set(reduced) == {"oom_2", "oom_3", "oom_4"}
+    reasons = {"OOM": reason("OOM", description="[[1]]"), "GL": reason("GL")}
+    logs = [
+        "java.lang.OutOfMemoryError: Java heap space\n\tat foo",
+        "java.lang.OutOfMemoryError: Java heap space (Render)",
+        "JAVA HEAP SPACE",
+        "heaps of OpenGL Error",
+        "nothing here",
+    ]
+    results = []
+    for rules in (RULES, reduced):
+        rule_set = CompiledRuleSet(make_database(crash_reasons=reasons, detection_rules=rules), {})
+        results.append([sorted({match.reason for match in rule_set.run_keywords(rule_set.scan(log))} |
+                               {match.reason for match in rule_set.run_regex(log, rule_set.scan(log))})
+                        for log in logs])
+    assert results[0] == results[1]
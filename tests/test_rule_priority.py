@@ -0,0 +1,36 @@
+from conftest import reason, rule
+from RuleEngine import CompiledRuleSet
+
+LOG = "first: Alpha failed\nsecond: Beta failed\nthird: Gamma failed\n"
+
+
+def compile_rules(make_database, terminal: bool) -> CompiledRuleSet:
+    database = make_database(
+        crash_reasons={"LOW": reason("LOW", 0), "HIGH": reason("HIGH", 2), "MID": reason("MID", 1, "[[1]] failed")},
+        detection_rules={
+            "r_low": rule("r_low", "LOW", "Gamma failed"),
+            "r_high": rule("r_high", "HIGH", "Alpha failed", terminal=terminal),
+            "r_mid": rule("r_mid", "MID", "Beta failed"),
+            "r_mid_regex": rule("r_mid_regex", "MID", r"second: (\w+) failed", match_type=1),
+        })
+    return CompiledRuleSet(database, {})
+
+
+def test_rules_are_additive_by_default(make_database):
+    rule_set = compile_rules(make_database, terminal=False)
+    hits = rule_set.scan(LOG)
+    # 结果按数据库中崩溃原因的顺序输出，与评估顺序无关
+    assert [match.reason for match in rule_set.run_keywords(hits)] == ["LOW", "HIGH", "MID"]
+    assert [match.rule_id for match in rule_set.run_regex(LOG, hits)] == ["r_mid_regex"]
+
+
+def test_terminal_rule_skips_lower_priorities(make_database):
+    rule_set = compile_rules(make_database, terminal=True)
+    hits = rule_set.scan(LOG)
+    assert [match.reason for match in rule_set.run_keywords(hits)] == ["HIGH"]
+
+
+def test_terminal_rule_without_hit_changes_nothing(make_database):
+    rule_set = compile_rules(make_database, terminal=True)
+    log = LOG.replace("Alpha", "Delta")
+    assert [match.reason for match in rule_set.run_keywords(rule_set.scan(log))] == ["LOW", "MID"]
@@ -0,0 +1,55 @@
+import sqlite3
+
+from RuleStats import RuleStats, load_stats
+
+
+def totals(db_path):
+    return {(stat.rule_id, stat.stage): (stat.evaluations, stat.hits, stat.total_ns) for stat in load_stats(db_path)}
+
+
+def test_flush_accumulates(tmp_path):
+    db_path = str(tmp_path / "stats.db")
+    stats = RuleStats(db_path)
+    stats.record("r1", "regex", 100, True, 10)
+    assert stats.flush()
+    stats.record("r1", "regex", 300, False, 10)
+    stats.record("r2", "keyword", 5, False)
+    assert stats.flush()
+    assert stats.flush()    # 没有待写入的数据
+    assert totals(db_path) == {("r1", "regex"): (2, 1, 400), ("r2", "keyword"): (1, 0, 5)}
+
+
+def test_failed_flush_keeps_counters(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "stats.db")
+    stats = RuleStats(db_path)
+    stats.record("r1", "regex", 100, True)
+    assert stats.flush()
+
+    stats.record("r1", "regex", 200, True)
+    connect = sqlite3.connect
+
+    class FailingConnection:
+        # 读取正常，写入时失败
+        def __init__(self, *args, **kwargs):
+            self.conn = connect(*args, **kwargs)
+
+        def __enter__(self):
+            self.conn.__enter__()
+            return self
+
+        def __exit__(self, *exc):
+            return self.conn.__exit__(*exc)
+
+        def execute(self, sql, *args):
+            if sql.startswith("INSERT"):
+                raise sqlite3.OperationalError("database is locked")
+            return self.conn.execute(sql, *args)
+
+    monkeypatch.setattr(sqlite3, "connect", FailingConnection)
+    assert not stats.flush()
+    stats.record("r1", "regex", 400, False)
+    monkeypatch.setattr(sqlite3, "connect", connect)
+
+    # 失败的那批计数和之后记录的计数都在下一次 flush 中写入，已保存的部分不会重复计算
+    assert stats.flush()
+    assert totals(db_path) == {("r1", "regex"): (3, 2, 700)}
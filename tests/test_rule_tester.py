@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+import RuleTester
+from RuleEngine import RuleSetManager
+
+from conftest import ROOT, reason, rule
+
+
+def test_import_does_not_initialize_the_bot():
+    # 规则编辑器导入 RuleTester 时不应读取机器人配置或创建规则集
+    code = "import sys, RuleTester; print('main' in sys.modules, 'config_reader' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["False", "False"]
+
+
+def test_load_sample_reads_a_folder(tmp_path):
+    (tmp_path / "latest.log").write_text("line one\nline two\n", encoding="utf-8")
+    assert "line two" in RuleTester.load_sample(str(tmp_path))
+
+
+def test_rule_sets_in_folder(make_database, tmp_path):
+    make_database(crash_reasons={"R": reason("R")}, detection_rules={"r1": rule("r1", "R", "boom")})
+    (tmp_path / "special_rules.json").write_text("{}", encoding="utf-8")
+    rule_sets = RuleSetManager.in_folder(str(tmp_path))
+    assert rule_sets.pack_path == os.path.join(str(tmp_path), "rules.pack")
+    assert rule_sets.current().database.detection_rules.keys() == {"r1"}
@@ -0,0 +1,78 @@
+import pytest
+
+from conftest import reason, rule
+from CrashDatabase import CrashReason, Person
+from SearchIndex import SearchIndex, index_for
+
+
+@pytest.fixture
+def database(make_database):
+    return make_database(
+        crash_reasons={"OOM": {**reason("OOM"), "name": "Out of memory", "description": "Java heap space"},
+                       "GL": {**reason("GL"), "name": "OpenGL error", "description": "Driver crash"}},
+        detection_rules={"r1": rule("r1", "OOM", "java.lang.OutOfMemoryError"),
+                         "r2": rule("r2", "GL", "GL_OUT_OF_MEMORY")},
+        persons={"1": {"id": 1, "name": "Alice"}})
+
+
+def keys(results):
+    return [(result.kind, result.key) for result in results]
+
+
+def test_sync_counts_changes(database):
+    index = SearchIndex()
+    assert index.sync(database) == 5
+    assert len(index) == 5
+    # 没有变化时不重新索引
+    assert index.sync(database) == 0
+
+    database.update_crash_reason(CrashReason("GL", "Graphics driver", "Driver crash", 0))
+    database.add_person(Person(2, "Bob"))
+    assert index.sync(database) == 2
+    assert keys(index.search("graphics")) == [("reason", "GL")]
+    assert index.search("opengl") == []
+
+    database.delete_detection_rule("r2")
+    assert index.sync(database) == 1
+    assert len(index) == 5
+    assert index.search("gl_out") == []
+
+
+def test_search_requires_every_term(database):
+    index = index_for(database)
+    assert keys(index.search("out memory")) == [("reason", "OOM"), ("rule", "r1"), ("rule", "r2")]
+    assert keys(index.search("heap out")) == [("reason", "OOM")]
+    assert index.search("heap driver") == []
+    assert index.search("   ") == []
+
+
+def test_search_ranking():
+    index = SearchIndex()
+    index.add("rule", "a", "Crash in mixin", "", "crash in mixin")
+    index.add("reason", "b", "Other", "", "mentions mixin")
+    index.add("person", "mixin", "Someone", "", "mixin")
+    index.add("rule", "c", "Mixin apply failed", "", "mixin apply failed")
+    index.add("reason", "d", "Mixin", "", "mixin")
+    # 键完全相同优先，其次是名称开头、名称包含，最后是其他字段命中；同一级按类型和键排序
+    assert keys(index.search("MIXIN")) == [("person", "mixin"), ("reason", "d"), ("rule", "c"),
+                                           ("rule", "a"), ("reason", "b")]
+
+
+def test_search_result_fields(database):
+    result, = index_for(database).search("alice")
+    assert (result.kind, result.key, result.title, result.detail) == ("person", "1", "Alice", "1")
+    result, = index_for(database).search("r1")
+    assert (result.title, result.detail) == ("java.lang.OutOfMemoryError", "OOM")
+
+
+def test_search_kinds_and_limit(database):
+    index = index_for(database)
+    assert keys(index.search("memory", kinds=["reason"])) == [("reason", "OOM")]
+    assert len(index.search("e", limit=2)) == 2
+
+
+def test_index_for_reuses_and_syncs(database):
+    index = index_for(database)
+    assert index_for(database) is index
+    database.add_crash_reason(CrashReason("DISK", "Disk full", "No space left", 0))
+    assert keys(index_for(database).search("disk")) == [("reason", "DISK")]
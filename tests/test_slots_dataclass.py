@@ -0,0 +1,38 @@
+import copy
+import dataclasses
+import pickle
+
+import pytest
+
+from CrashDatabase import DetectionRule
+from SlotsDataclass import frozen_dataclass
+
+
+@frozen_dataclass
+class Point:
+    x: int
+    y: int = 0
+
+    def total(self) -> int:
+        return self.x + self.y
+
+
+def test_instances_have_slots_and_defaults():
+    point = Point(1)
+    assert Point.__slots__ == ("x", "y") and not hasattr(point, "__dict__")
+    assert (point.y, point.total()) == (0, 1)
+    assert [field.name for field in dataclasses.fields(Point)] == ["x", "y"]
+
+
+def test_instances_stay_frozen():
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        Point(1).x = 2
+    with pytest.raises(AttributeError):
+        Point(1).z = 2
+
+
+def test_pickle_copy_and_replace():
+    rule = DetectionRule("r1", "R", 1, "boom", terminal=True)
+    assert pickle.loads(pickle.dumps(rule)) == rule
+    assert copy.deepcopy(rule) == rule and hash(copy.copy(rule)) == hash(rule)
+    assert dataclasses.replace(rule, match="bang").match == "bang"